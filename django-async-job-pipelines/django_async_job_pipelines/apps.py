@@ -13,8 +13,9 @@ class DjangoAsyncJobPipelinesConfig(AppConfig):
         be found once the job needs to run.
         For each Django app checks if the app has a `jobs` module.
         If yes, then it checks all attributes in that `jobs` module to find subclasses of `BaseJob`.
+        The classes themselves are kept in the registry, so running a job doesn't import anything.
         """
-        from .job import BaseJob
+        from .job import BaseJob, SyncBaseJob
         from .pipeline import BasePipeline
         from .registry import job_registery, pipeline_registery
 
@@ -27,14 +28,17 @@ class DjangoAsyncJobPipelinesConfig(AppConfig):
                     jobs_module
                 ):  # get all attributes (as string) of `jobs` module
                     obj = getattr(jobs_module, obj)  # turn string to the object itself
-                    if obj is BaseJob:  # we don't want to register the `BaseJob` class
+                    if obj in (
+                        BaseJob,
+                        SyncBaseJob,
+                    ):  # we don't want to register the base classes
                         continue
                     if (
                         type(obj) is type
                     ):  # assert `obj` is a class and not a `dict` or some other builtin
                         if issubclass(obj, BaseJob):
                             job_registery.add(
-                                obj.__name__, app.name
+                                obj.__name__, app.name, obj
                             )  # register subclasses of `BaseJob`
             except ModuleNotFoundError:
                 pass
@@ -59,7 +63,7 @@ class DjangoAsyncJobPipelinesConfig(AppConfig):
                     ):  # assert `obj` is a class and not a `dict` or some other builtin
                         if issubclass(obj, BasePipeline):
                             pipeline_registery.add(
-                                obj.__name__, app.name
+                                obj.__name__, app.name, obj
                             )  # register subclasses of `BasePipeline`
             except ModuleNotFoundError:
                 pass
@@ -0,0 +1,73 @@
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+def exponential_backoff(
+    attempt: int,
+    base_seconds: float,
+    max_seconds: float,
+    multiplier: float = 2.0,
+    jitter: float = 0.0,
+) -> float:
+    """
+    Returns `base_seconds * multiplier ** attempt` capped at `max_seconds`.
+    `jitter` is the fraction of the delay which is randomized, e.g. `0.1` returns
+    a delay within 10% of the computed one, so processes backing off at the same time
+    don't retry in lockstep.
+    """
+    delay = min(base_seconds * multiplier**attempt, max_seconds)
+    if jitter:
+        delay *= 1 + random.uniform(-jitter, jitter)
+    return delay
+
+
+@dataclass
+class IdlePoller:
+    """
+    Waits between database queries which found nothing to do.
+    Every consecutive idle poll waits longer (up to `max_seconds`) and
+    `reset` is called once a query finds something, so the next wait is `min_seconds` again.
+    `wake` also interrupts the current wait, e.g. when we know new work was just created.
+    """
+
+    min_seconds: float
+    max_seconds: float
+    multiplier: float = 2.0
+    jitter: float = 0.1
+    num_idle_polls: int = 0
+    _woken: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def reset(self):
+        self.num_idle_polls = 0
+
+    def wake(self):
+        self.reset()
+        self._woken.set()
+
+    def next_wait_seconds(self) -> float:
+        wait_seconds = exponential_backoff(
+            self.num_idle_polls,
+            base_seconds=self.min_seconds,
+            max_seconds=self.max_seconds,
+            multiplier=self.multiplier,
+            jitter=self.jitter,
+        )
+        # stop counting once the ceiling is reached, so the exponent doesn't overflow
+        if self.min_seconds * self.multiplier**self.num_idle_polls < self.max_seconds:
+            self.num_idle_polls += 1
+        return wait_seconds
+
+    async def wait(self, max_seconds: Optional[float] = None):
+        """Waits for the next backoff interval, or `max_seconds` if that's sooner."""
+        wait_seconds = self.next_wait_seconds()
+        if max_seconds is not None:
+            wait_seconds = max(min(wait_seconds, max_seconds), 0)
+        try:
+            async with asyncio.timeout(wait_seconds):
+                await self._woken.wait()
+        except TimeoutError:
+            pass
+        finally:
+            self._woken.clear()
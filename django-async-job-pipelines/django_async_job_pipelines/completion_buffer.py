@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django_async_job_pipelines.models import JobDBModel
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Completion:
+    """A job which finished running and should be marked as "done" or "failed" in db."""
+
+    pk: int
+    status: str
+    outputs: Optional[dict] = None
+    error: Optional[str] = None
+    # the pipeline the job is part of, so it's counted in the pipeline's counters
+    pipeline_id: Optional[int] = None
+    # how many flushes failed to write it, see `CompletionBuffer.max_write_attempts`
+    num_failed_writes: int = 0
+
+
+@dataclass
+class CompletionBuffer:
+    """
+    Write-behind buffer for job completions. Instead of one `UPDATE` per finished job,
+    completions are written to db in bulk once `max_size` of them are buffered or
+    every `flush_interval_seconds`, whichever comes first.
+    `on_flush` is called with the PKs of the jobs written to db.
+    A completion which failed to be written `max_write_attempts` times is dropped, and `on_drop`
+    is called with the PKs of the dropped jobs, which are left "in progress" until their lease expires.
+    """
+
+    max_size: int
+    flush_interval_seconds: float
+    on_flush: Optional[Callable[[list[int]], None]] = None
+    max_write_attempts: int = 3
+    on_drop: Optional[Callable[[list[int]], None]] = None
+    completions: list[Completion] = field(default_factory=list)
+
+    async def add(self, completion: Completion):
+        """
+        Buffers `completion`, flushing the buffer once full. A failed flush is logged and
+        its completions stay buffered for the next flush, so it doesn't fail the job being added.
+        """
+        self.completions.append(completion)
+        if len(self.completions) >= self.max_size:
+            await self.flush_logging_errors()
+
+    async def flush(self):
+        """
+        Writes the buffered completions with one bulk statement. Since that's all or nothing, if it fails
+        they're written one at a time, so one completion which can't be written, e.g. with outputs
+        which can't be serialized, doesn't hold up the others. Completions which failed are buffered
+        for the next flush, or dropped once they failed `max_write_attempts` times.
+        Raises the last error if any completion wasn't written.
+        """
+        if not self.completions:
+            return
+        # swap the buffer before writing, so completions added meanwhile go into the next flush
+        completions, self.completions = self.completions, []
+        try:
+            await JobDBModel.abulk_complete(completions)
+        except Exception:
+            if len(completions) == 1:
+                self.failed_to_write(completions)
+                raise
+        else:
+            self.written(completions)
+            return
+
+        failed, error = [], None
+        for completion in completions:
+            try:
+                await JobDBModel.abulk_complete([completion])
+            except Exception as e:
+                failed.append(completion)
+                error = e
+            else:
+                self.written([completion])
+        if failed:
+            self.failed_to_write(failed)
+            raise error
+
+    def written(self, completions: list[Completion]):
+        if self.on_flush:
+            self.on_flush([c.pk for c in completions])
+
+    def failed_to_write(self, completions: list[Completion]):
+        to_retry, dropped = [], []
+        for completion in completions:
+            completion.num_failed_writes += 1
+            if completion.num_failed_writes < self.max_write_attempts:
+                to_retry.append(completion)
+            else:
+                dropped.append(completion)
+        self.completions = to_retry + self.completions
+        if dropped:
+            pks = [c.pk for c in dropped]
+            _logger.error(
+                f"Dropped completions of jobs {pks} after {self.max_write_attempts} failed writes"
+            )
+            if self.on_drop:
+                self.on_drop(pks)
+
+    async def flush_logging_errors(self):
+        try:
+            await self.flush()
+        except Exception:
+            _logger.exception(
+                f"Failed to write buffered completions, {len(self.completions)} are left for the next flush"
+            )
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self.flush_logging_errors()
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+
+@dataclass
+class DBStats:
+    """How long db queries waited for a thread to run them and how long they ran."""
+
+    num_calls: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    total_run_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, wait_seconds: float, run_seconds: float):
+        with self._lock:
+            self.num_calls += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            self.total_run_seconds += run_seconds
+
+    @property
+    def avg_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.num_calls if self.num_calls else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.num_calls} db calls, waited {self.total_wait_seconds:.3f}s in total "
+            f"(avg {self.avg_wait_seconds * 1000:.3f}ms, max {self.max_wait_seconds * 1000:.3f}ms), "
+            f"ran {self.total_run_seconds:.3f}s in total"
+        )
+
+
+def can_update_returning(conn) -> bool:
+    """
+    Whether the database of `conn` runs `UPDATE ... RETURNING`. Django has no feature flag for it,
+    `can_return_columns_from_insert` is about `INSERT` and is also set on MariaDB, which can't.
+    """
+    if conn.vendor == "postgresql":
+        return True
+    if conn.vendor == "sqlite":
+        return conn.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def close_broken_connections():
+    """Like Django does at the start of a request, but keeps healthy connections open however old they are."""
+    for conn in connections.all(initialized_only=True):
+        if conn.errors_occurred:
+            if conn.is_usable():
+                conn.errors_occurred = False
+            else:
+                conn.close()
+
+
+def init_job_process():
+    """
+    Initializer of the job runner's process pool. Pool processes are spawned, not forked from the
+    multithreaded job runner, so Django is set up again in them. Any db connection the process would
+    have inherited is dropped without being closed, so the job runner's connections are left alone.
+    """
+    import django
+
+    django.setup()
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+
+
+@dataclass
+class DBExecutor:
+    """
+    Runs the job runner's db queries.
+    With `max_num_threads` set, queries run in a pool of that many threads, each keeping its own
+    db connection open, instead of queueing up behind the single thread `sync_to_async` uses.
+    Otherwise they run with `sync_to_async` as in the rest of the package.
+    Either way `stats` shows how long queries waited for a thread.
+    """
+
+    max_num_threads: int = 0
+    stats: DBStats = field(default_factory=DBStats)
+    pool: Optional[ThreadPoolExecutor] = None
+    thread_connections: list = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.max_num_threads > 0:
+            self.pool = ThreadPoolExecutor(
+                max_workers=self.max_num_threads,
+                thread_name_prefix="job-runner-db",
+                initializer=self.register_thread_connections,
+            )
+
+    def register_thread_connections(self):
+        # connections are per thread, keep them so `shutdown` can close them
+        self.thread_connections.extend(connections.all())
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        queued_at = time.perf_counter()
+
+        def call():
+            started_at = time.perf_counter()
+            try:
+                if self.pool is not None:
+                    close_broken_connections()
+                return func(*args, **kwargs)
+            finally:
+                self.stats.record(
+                    started_at - queued_at, time.perf_counter() - started_at
+                )
+
+        if self.pool is None:
+            return await sync_to_async(call)()
+        return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+
+    def shutdown(self):
+        if self.pool is None:
+            return
+        self.pool.shutdown(wait=True)
+        for conn in self.thread_connections:
+            # the threads are gone, so closing from this thread is safe
+            conn.inc_thread_sharing()
+            try:
+                conn.close()
+            finally:
+                conn.dec_thread_sharing()
+        self.thread_connections.clear()
+
+
+current_db_executor: ContextVar[Optional[DBExecutor]] = ContextVar(
+    "current_db_executor", default=None
+)
+
+
+async def run_in_db_thread(func: Callable, *args, **kwargs) -> Any:
+    """
+    Runs `func`, a sync function making db queries, with the db executor of the job runner
+    calling it. Outside job runners this is `sync_to_async`.
+    """
+    executor = current_db_executor.get()
+    if executor is None:
+        return await sync_to_async(func)(*args, **kwargs)
+    return await executor.run(func, *args, **kwargs)
@@ -1,15 +1,50 @@
 from dataclasses import asdict
+from datetime import datetime, timedelta
+from enum import StrEnum
 from typing import Any, Iterable, Optional
 
+from django.utils import timezone
+
+from .backoff import exponential_backoff
 from .registry import job_registery
 
 
+class Execution(StrEnum):
+    """Where the job runner runs the `run` method of a job."""
+
+    EVENT_LOOP = "event_loop"  # awaited on the job runner's event loop
+    THREAD = "thread"  # in a thread of the job runner's thread pool
+    PROCESS = "process"  # in a process of the job runner's process pool
+
+
 class BaseJob:
     """
     `inputs`, `outputs`, and `next_job_inputs` are dataclasses instances
     and/or they provide a `asdict` method for custom behavior.
+    `queue` is the name of the queue jobs of this class are put in. Job runners
+    can be limited to consuming jobs from some queues only.
+    `execution` is where the job runner runs `run`, see `Execution`.
+    CPU-bound jobs should run in a process, so they don't block the other jobs of the job runner.
+    Under `Execution.PROCESS` only `inputs` and `outputs` are sent to the process, and
+    `outputs` and `next_job_inputs` are sent back, so they must be picklable.
+    Setting `run_every` makes the job periodic, the `schedule_jobs` command creates one every `run_every`.
+    Periodic jobs taking inputs get an `Inputs()` instance, so all its fields need defaults.
+    A job raising an exception is retried up to `max_retries` times, each retry waiting exponentially
+    longer, from `retry_backoff_seconds` up to `max_retry_backoff_seconds`, see `retry_delay_seconds`.
+    At most `max_concurrency` jobs of the class run at the same time across all job runners,
+    and at most `max_jobs_per_second` of them are claimed per second, see `JobRateLimitDBModel`.
     """
 
+    queue: str = "default"
+    execution: str = Execution.EVENT_LOOP
+    run_every: Optional[timedelta] = None
+    max_retries: int = 0
+    retry_backoff_seconds: float = 1.0
+    max_retry_backoff_seconds: float = 300.0
+    retry_backoff_jitter: float = 0.1
+    max_concurrency: Optional[int] = None
+    max_jobs_per_second: Optional[float] = None
+
     def __init__(
         self,
         status: Optional[str] = "",
@@ -125,8 +160,59 @@ class BaseJob:
     def name(self) -> str:
         return type(self).__name__
 
+    def retry_delay_seconds(self, attempt: int) -> float:
+        """How long to wait before retrying the job after its `attempt`th attempt, counting from 1, failed."""
+        return exponential_backoff(
+            attempt - 1,
+            base_seconds=self.retry_backoff_seconds,
+            max_seconds=self.max_retry_backoff_seconds,
+            jitter=self.retry_backoff_jitter,
+        )
+
 
-def create_new(job) -> "JobDBModel":
+class SyncBaseJob(BaseJob):
+    """
+    Base class for jobs whose `run` is a plain (blocking) function, e.g. jobs wrapping blocking libraries.
+    The job runner runs them in its thread pool (`--max_num_threads`), which is separate from the thread
+    running the job runner's db queries, so blocking jobs don't hold up the other jobs.
+    `execution` can also be `Execution.PROCESS`, but not `Execution.EVENT_LOOP`.
+    """
+
+    execution: str = Execution.THREAD
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.execution == Execution.EVENT_LOOP:
+            raise TypeError(
+                f"`{cls.__name__}` has a blocking `run` method so it can't run on the event loop!"
+            )
+
+    def run(self):
+        raise NotImplementedError()
+
+
+def get_run_at(
+    run_at: Optional[datetime] = None, delay: Optional[timedelta] = None
+) -> Optional[datetime]:
+    if run_at is not None and delay is not None:
+        raise ValueError("Either `run_at` or `delay` can be given, not both!")
+    if delay is not None:
+        return timezone.now() + delay
+    return run_at
+
+
+def create_new(
+    job,
+    priority: int = 0,
+    idempotency_key: Optional[str] = None,
+    run_at: Optional[datetime] = None,
+    delay: Optional[timedelta] = None,
+) -> "JobDBModel":
+    """
+    `priority` orders claiming jobs, jobs with lower values are run first.
+    If a job with the given `idempotency_key` exists, no job is created and the existing one is returned.
+    The job isn't run before `run_at`, or before `delay` from now.
+    """
     from .models import JobDBModel
 
     if job.name not in job_registery.job_class_to_name_map:
@@ -140,11 +226,27 @@ def create_new(job) -> "JobDBModel":
             "`inputs` parameter missing but `Inputs` class is given for this job."
         )
 
-    j = JobDBModel.create_new_in_db(job)
+    j = JobDBModel.create_new_in_db(
+        job,
+        priority=priority,
+        idempotency_key=idempotency_key,
+        run_at=get_run_at(run_at, delay),
+    )
     return j
 
 
-async def acreate_new(job) -> "JobDBModel":
+async def acreate_new(
+    job,
+    priority: int = 0,
+    idempotency_key: Optional[str] = None,
+    run_at: Optional[datetime] = None,
+    delay: Optional[timedelta] = None,
+) -> "JobDBModel":
+    """
+    `priority` orders claiming jobs, jobs with lower values are run first.
+    If a job with the given `idempotency_key` exists, no job is created and the existing one is returned.
+    The job isn't run before `run_at`, or before `delay` from now.
+    """
     from .models import JobDBModel
 
     if job.name not in job_registery.job_class_to_name_map:
@@ -158,24 +260,48 @@ async def acreate_new(job) -> "JobDBModel":
             "`inputs` parameter missing but `Inputs` class is given for this job."
         )
 
-    j = await JobDBModel.acreate_new_in_db(job)
+    j = await JobDBModel.acreate_new_in_db(
+        job,
+        priority=priority,
+        idempotency_key=idempotency_key,
+        run_at=get_run_at(run_at, delay),
+    )
     return j
 
 
-async def abulk_create_new(jobs: Iterable[BaseJob]):
+async def abulk_create_new(
+    jobs: Iterable[BaseJob],
+    priority: int = 0,
+    idempotency_keys: Optional[Iterable[Optional[str]]] = None,
+    run_at: Optional[datetime] = None,
+    delay: Optional[timedelta] = None,
+) -> list["JobDBModel"]:
+    """
+    `idempotency_keys` are the keys of `jobs` in the same order, `None` for jobs without one.
+    Jobs whose key is taken, by an existing job or an earlier job in `jobs`, aren't created.
+    The jobs aren't run before `run_at`, or before `delay` from now.
+    Returns the created job rows, or the existing ones for taken keys.
+    """
     from .models import JobDBModel
 
+    jobs = list(jobs)
+
     for job in jobs:
         if hasattr(job, "Inputs") and not job.inputs:
             raise ValueError(
                 "`inputs` parameter missing but `Inputs` class is given for this job."
             )
 
-    await JobDBModel.abulk_create_new_in_db(jobs)
+    return await JobDBModel.abulk_create_new_in_db(
+        jobs,
+        priority=priority,
+        idempotency_keys=idempotency_keys,
+        run_at=get_run_at(run_at, delay),
+    )
 
 
 def create_not_ready(
-    job: BaseJob, previous_job: Optional["JobDBModel"] = None
+    job: BaseJob, previous_job: Optional["JobDBModel"] = None, priority: int = 0
 ) -> "JobDBModel":
     from .models import JobDBModel
 
@@ -185,4 +311,42 @@ def create_not_ready(
             of the "BaseJob" class and located in a `jobs.py` of a registered Django app.'
         )
 
-    return JobDBModel.create_not_ready_in_db(job, previous_job)
+    return JobDBModel.create_not_ready_in_db(job, previous_job, priority=priority)
+
+
+def create_join(
+    job: BaseJob, previous_jobs_ids: Iterable[int], priority: int = 0
+) -> "JobDBModel":
+    """
+    Creates `job` to run once all jobs with the given IDs are done, e.g. a `JoinPreviousJobs` job
+    gathering their outputs. `priority` orders claiming jobs, jobs with lower values are run first.
+    """
+    from .models import JobDBModel
+
+    if job.name not in job_registery.job_class_to_name_map:
+        raise ValueError(
+            f'Job with name "{job.name}" was not found. It should be a subclass \
+            of the "BaseJob" class and located in a `jobs.py` of a registered Django app.'
+        )
+
+    return JobDBModel.create_join_in_db(job, previous_jobs_ids, priority=priority)
+
+
+async def acreate_join(
+    job: BaseJob, previous_jobs_ids: Iterable[int], priority: int = 0
+) -> "JobDBModel":
+    """
+    Creates `job` to run once all jobs with the given IDs are done, e.g. a `JoinPreviousJobs` job
+    gathering their outputs. `priority` orders claiming jobs, jobs with lower values are run first.
+    """
+    from .models import JobDBModel
+
+    if job.name not in job_registery.job_class_to_name_map:
+        raise ValueError(
+            f'Job with name "{job.name}" was not found. It should be a subclass \
+            of the "BaseJob" class and located in a `jobs.py` of a registered Django app.'
+        )
+
+    return await JobDBModel.acreate_join_in_db(
+        job, previous_jobs_ids, priority=priority
+    )
@@ -1,12 +1,31 @@
 import asyncio
+import inspect
+import itertools
 import logging
+import multiprocessing
 import os
+import signal
+import time
 import traceback
-from dataclasses import dataclass
-from typing import Optional
-
-from django_async_job_pipelines.job import BaseJob
-from django_async_job_pipelines.models import JobDBModel
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Iterator, Optional
+
+from django.utils import timezone
+
+from django_async_job_pipelines.backoff import IdlePoller
+from django_async_job_pipelines.completion_buffer import Completion, CompletionBuffer
+from django_async_job_pipelines.db import (
+    DBExecutor,
+    current_db_executor,
+    init_job_process,
+)
+from django_async_job_pipelines.job import BaseJob, Execution
+from django_async_job_pipelines.models import JobDBModel, JobRateLimitDBModel
+from django_async_job_pipelines.notifications import NewJobsListener
+from django_async_job_pipelines.registry import job_registery
 
 
 def logs_filename():
@@ -40,6 +59,25 @@ class Logger:
 _logger = Logger()
 
 
+def run_job_sync(job: BaseJob):
+    """Runs a job outside the job runner's event loop, `run` gets its own event loop if it's `async`."""
+    result = job.run()
+    if inspect.isawaitable(result):
+        asyncio.run(result)
+
+
+def run_job_in_process(
+    job_class: type[BaseJob], inputs: Any, outputs: Any
+) -> tuple[Any, Any]:
+    """
+    Runs a job in a process of the job runner's process pool.
+    Returns the job's outputs and next job inputs, so the job runner can persist them.
+    """
+    job = job_class.create(inputs=inputs, outputs=outputs, check_inputs=False)
+    run_job_sync(job)
+    return job.outputs, job.next_job_inputs
+
+
 @dataclass
 class Runner:
     max_num_workers: int
@@ -47,20 +85,76 @@ class Runner:
     num_jobs_to_run: int = 0
     total_jobs_enqueued: int = 0
     total_jobs_processed: int = 0
-    get_job_to_process_timeout: float = 0.4
+    # deprecated, claims aren't timed out anymore since the job runner backs off between them
+    get_job_to_process_timeout: Optional[float] = None
     get_job_from_queue_timeout: float = 0.1
     wait_seconds_between_queries: float = 0.2
+    max_wait_seconds_between_queries: float = 5.0
+    backoff_multiplier: float = 2.0
+    backoff_jitter: float = 0.1
+    idle_poller: Optional[IdlePoller] = None
+    next_run_at: Optional[datetime] = None
+    next_run_at_expires: float = 0.0
     job_queue: Optional[asyncio.Queue] = None
     exclude_jobs: Optional[list[str]] = None
+    queues: Optional[dict[str, int]] = None
+    queue_schedule: Optional[Iterator[str]] = None
+    batch_claim: bool = False
+    listen_for_new_jobs: bool = False
+    slow_poll_seconds: float = 5.0
+    new_jobs_listener: Optional[NewJobsListener] = None
+    lease_seconds: float = 60.0
+    reclaim_interval_seconds: float = 5.0
+    max_attempts: Optional[int] = None
+    claimed_jobs: set[int] = field(default_factory=set)
+    completion_batch_size: int = 0
+    completion_flush_interval_seconds: float = 0.05
+    completion_buffer: Optional[CompletionBuffer] = None
+    max_num_threads: int = 10
+    max_num_db_threads: int = 0
+    db_executor: Optional[DBExecutor] = None
+    max_num_processes: Optional[int] = None
+    thread_pool: Optional[ThreadPoolExecutor] = None
+    process_pool: Optional[ProcessPoolExecutor] = None
+    drain_on_sigterm: bool = False
+    stop_event: asyncio.Event = field(default_factory=asyncio.Event)
+    claiming_stopped: bool = False
 
     def __post_init__(self):
         """
         This job queue controls the maximum number of concurrent jobs to be run
         using `asyncio.Queue`.
         """
+        if self.get_job_to_process_timeout is not None:
+            warnings.warn(
+                "`get_job_to_process_timeout` is unused, the job runner backs off between claims "
+                "as set by `wait_seconds_between_queries` and `max_wait_seconds_between_queries`.",
+                DeprecationWarning,
+                stacklevel=3,
+            )
         self.job_queue = asyncio.Queue(maxsize=self.max_num_workers)
-        if self.get_job_to_process_timeout <= self.wait_seconds_between_queries:
-            self.get_job_to_process_timeout = self.wait_seconds_between_queries + 0.2
+        self.idle_poller = IdlePoller(
+            min_seconds=self.wait_seconds_between_queries,
+            max_seconds=self.max_wait_seconds_between_queries,
+            multiplier=self.backoff_multiplier,
+            jitter=self.backoff_jitter,
+        )
+        self.db_executor = DBExecutor(max_num_threads=self.max_num_db_threads)
+        if self.completion_batch_size > 0:
+            self.completion_buffer = CompletionBuffer(
+                max_size=self.completion_batch_size,
+                flush_interval_seconds=self.completion_flush_interval_seconds,
+                on_flush=self.claimed_jobs.difference_update,
+                # stop extending their leases, so other job runners reclaim and run them again
+                on_drop=self.claimed_jobs.difference_update,
+            )
+        if self.queues:
+            if any(weight < 1 for weight in self.queues.values()):
+                raise ValueError("Queue weights must be greater than zero!")
+            # weighted round-robin, e.g. {"a": 2, "b": 1} claims from a, a, b, a, a, b, ...
+            self.queue_schedule = itertools.cycle(
+                [queue for queue, weight in self.queues.items() for _ in range(weight)]
+            )
 
     async def add_jobs_to_queue(self):
         """
@@ -75,41 +169,116 @@ class Runner:
             if self.total_jobs_enqueued > self.num_jobs_to_run:
                 return
 
-        # TODO What if this return no PKs?
-        # TODO Do manual/autoamted QA for this
-        while True:
+        assert self.job_queue
+        assert self.idle_poller
+        while not self.stop_event.is_set():
             if self.num_jobs_to_run > 0:
-                if self.total_jobs_enqueued == self.num_jobs_to_run:
+                if self.total_jobs_enqueued >= self.num_jobs_to_run:
                     _logger.info("No more enqueues since enough have been enqueued")
                     return
-            _logger.info(f"Total jobs enqueued {self.total_jobs_enqueued}")
-            _logger.info("Going to get job for processing")
 
-            try:
-                async with asyncio.timeout(self.get_job_to_process_timeout):
-                    if self.exclude_jobs:
-                        pk: int = await JobDBModel.aget_job_for_processing(
-                            exclude=self.exclude_jobs,
-                            wait_seconds_between_queries=self.wait_seconds_between_queries,
-                        )
-                    else:
-                        pk: int = await JobDBModel.aget_job_for_processing(
-                            wait_seconds_between_queries=self.wait_seconds_between_queries
-                        )
-            except TimeoutError:
-                _logger.info("Getting jobs for processing timed out")
+            limit = self.num_jobs_to_claim() if self.batch_claim else 1
+            _logger.info(f"Going to claim up to {limit} jobs for processing")
+            pks = await self.claim_jobs(limit)
+            if not pks:
+                await self.wait_for_new_jobs()
                 continue
+            self.idle_poller.reset()
+            self.next_run_at_expires = 0.0
 
-            if not pk:
-                continue
-
-            assert self.job_queue
-            _logger.info(f"Waiting to enqueue job with pk {pk}")
-            await self.job_queue.put(pk)
-            self.total_jobs_enqueued += 1
+            self.claimed_jobs.update(pks)
+            for pk in pks:
+                await self.job_queue.put(pk)
+                self.total_jobs_enqueued += 1
             _logger.info(
-                f"Added job with pk {pk} to job queue, total jobs enqueued: {self.total_jobs_enqueued}"
+                f"Added {len(pks)} jobs to job queue, total jobs enqueued: {self.total_jobs_enqueued}"
             )
+        _logger.info("Stopped claiming jobs")
+        self.claiming_stopped = True
+
+    def num_jobs_to_claim(self) -> int:
+        """
+        The number of free slots in the job queue, capped by the number of jobs
+        left to run if there's a limit on it. It's never smaller than one, so when the
+        queue is full we claim one job and wait for a free slot as we do with
+        single job claims.
+        """
+        assert self.job_queue
+        num_jobs = self.job_queue.maxsize - self.job_queue.qsize()
+        if self.num_jobs_to_run > 0:
+            num_jobs = min(num_jobs, self.num_jobs_to_run - self.total_jobs_enqueued)
+        return max(num_jobs, 1)
+
+    async def claim_jobs(self, limit: int) -> list[int]:
+        """
+        If this runner is subscribed to queues, it claims from the queue which is next
+        in the weighted round-robin schedule. If that queue has no jobs it tries the other
+        subscribed queues before giving up, so an empty queue doesn't leave workers idle.
+        """
+        if not self.queues:
+            return await JobDBModel.aclaim_jobs_for_processing(
+                limit, exclude=self.exclude_jobs, lease_seconds=self.lease_seconds
+            )
+
+        assert self.queue_schedule
+        scheduled_queue = next(self.queue_schedule)
+        for queue in [
+            scheduled_queue,
+            *(q for q in self.queues if q != scheduled_queue),
+        ]:
+            pks = await JobDBModel.aclaim_jobs_for_processing(
+                limit,
+                exclude=self.exclude_jobs,
+                queue=queue,
+                lease_seconds=self.lease_seconds,
+            )
+            if pks:
+                return pks
+        return []
+
+    async def wait_for_new_jobs(self):
+        """
+        Called when there are no jobs to claim. If this runner listens for new jobs
+        notifications it waits for one, and polls every `slow_poll_seconds` in case a
+        notification was missed. Otherwise it backs off exponentially, starting at
+        `wait_seconds_between_queries` up to `max_wait_seconds_between_queries`, until
+        a claim succeeds.
+        Either way it doesn't wait past the time the next delayed job can be claimed.
+        """
+        next_run_at = await self.next_delayed_job_run_at()
+        seconds_until_next_run_at = None
+        if next_run_at is not None:
+            seconds_until_next_run_at = (next_run_at - timezone.now()).total_seconds()
+        if self.new_jobs_listener:
+            timeout = self.slow_poll_seconds
+            if seconds_until_next_run_at is not None:
+                timeout = max(min(timeout, seconds_until_next_run_at), 0)
+            await self.new_jobs_listener.wait(timeout)
+        else:
+            assert self.idle_poller
+            await self.idle_poller.wait(seconds_until_next_run_at)
+
+    async def next_delayed_job_run_at(self) -> Optional[datetime]:
+        """
+        The `run_at` of the next delayed job this runner can claim. It's cached for the longest
+        wait between queries, so backing off doesn't query it before every claim, and fetched
+        again once a claim succeeds or the cached time is reached. Delayed jobs created meanwhile
+        are picked up as late as with the longest wait.
+        """
+        now = time.monotonic()
+        if now >= self.next_run_at_expires or (
+            self.next_run_at is not None and self.next_run_at <= timezone.now()
+        ):
+            self.next_run_at = await JobDBModel.anext_run_at(
+                self.exclude_jobs, list(self.queues) if self.queues else None
+            )
+            cache_seconds = (
+                self.slow_poll_seconds
+                if self.new_jobs_listener
+                else self.max_wait_seconds_between_queries
+            )
+            self.next_run_at_expires = now + cache_seconds
+        return self.next_run_at
 
     async def worker(self):
         """This is where we run jobs, and start the next jobs."""
@@ -130,6 +299,11 @@ class Runner:
                     pk = await self.job_queue.get()
             except TimeoutError:
                 _logger.info("Timeout while waiting to get job")
+                if self.claiming_stopped and self.job_queue.empty():
+                    _logger.info(
+                        "Stopping, so exiting worker since the queue is drained."
+                    )
+                    return
                 continue
 
             _logger.info(f"Got pk {pk} to process.")
@@ -140,49 +314,243 @@ class Runner:
                 _logger.exception(
                     f"Exception occured while getting job with pk {pk} from database."
                 )
+                self.claimed_jobs.discard(pk)
                 self.job_queue.task_done()
                 continue
 
             try:
                 _logger.info(f"Running job with pk {pk}")
-                await job.run()  # run the job
-                if job.previous_job:  # this means this job is part of a pipeline
-                    next_job_inputs = job.next_job_inputs_asdict()
-                    assert job.db_model
-
-                    if isinstance(next_job_inputs, list):
-                        # makes the next jobs to be run in parallel
-                        for next_j_inputs in next_job_inputs:
-                            await JobDBModel.ainit_next_job(job.db_model, next_j_inputs)
-                    else:
-                        await JobDBModel.ainit_next_job(
-                            job.db_model,
-                            next_job_inputs,
-                        )
+                await self.run_job(job)
                 output_serialized = job.outputs_asdict()
                 _logger.info(f"Successfully ran job with pk {pk}")
-                await JobDBModel.aupdate_in_progress_to_done_by_id(
-                    pk, output_serialized
-                )
-                _logger.info(f"Updated to 'done' job with pk {pk}")
-                self.job_queue.task_done()
-                self.total_jobs_processed += 1
+                next_jobs_inputs = None
+                if job.previous_job:  # this means this job is part of a pipeline
+                    next_jobs_inputs = job.next_job_inputs_asdict()
+                    # a list of inputs makes the next jobs to be run in parallel
+                    if not isinstance(next_jobs_inputs, list):
+                        next_jobs_inputs = [next_jobs_inputs]
             except Exception as e:
                 _logger.info(f"Failed to run job with pk {pk}")
                 tb = traceback.format_exception(e)
-                await JobDBModel.amark_as_failed(pk, ".".join(tb))
-                _logger.info(f"Marked job with pk {pk} as 'failed' in db.")
-                if job.outputs_asdict():
-                    await JobDBModel.asave_job_outputs(
-                        pk=pk, job_outputs=job.outputs_asdict()
-                    )
-                self.job_queue.task_done()
-                self.total_jobs_processed += 1
+                completed = self.fail_job(job, ".".join(tb))
+            else:
+                completed = self.complete_successful_job(
+                    job, output_serialized, next_jobs_inputs
+                )
+            try:
+                await completed
+            except Exception:
+                # the job isn't failed for it, it's left "in progress" until its lease expires,
+                # which it does once we stop extending it, so another job runner reclaims it
+                _logger.exception(f"Failed to write finished job with pk {pk} to db")
+                self.claimed_jobs.discard(pk)
+            self.job_queue.task_done()
+            self.total_jobs_processed += 1
+
+    async def complete_successful_job(
+        self,
+        job: BaseJob,
+        outputs: dict,
+        next_jobs_inputs: Optional[list[dict]],
+    ):
+        assert job.db_model
+        made_new = await self.complete_job(
+            Completion(
+                pk=job.db_model.pk,
+                status=JobDBModel.JobStatus.DONE,
+                outputs=outputs,
+                pipeline_id=job.db_model.pipeline_id,
+            ),
+            next_jobs_inputs,
+        )
+        if made_new:
+            # the next jobs are ready to be claimed, so stop backing off
+            assert self.idle_poller
+            self.idle_poller.wake()
+
+    async def fail_job(self, job: BaseJob, error: str):
+        """
+        Retries a failed job later if it has retries left, see `BaseJob.max_retries`,
+        otherwise marks it as failed.
+        """
+        assert job.db_model
+        pk = job.db_model.pk
+        attempts = job.db_model.attempts
+        if attempts <= job.max_retries:
+            delay = job.retry_delay_seconds(attempts)
+            _logger.info(f"Retrying job with pk {pk} in {delay:.2f} seconds")
+            await JobDBModel.aretry_later(
+                pk, timezone.now() + timedelta(seconds=delay), error
+            )
+            self.claimed_jobs.discard(pk)
+            return
+        try:
+            outputs = job.outputs_asdict()
+        except Exception:
+            outputs = None  # serializing the outputs may be what failed the job
+        await self.complete_job(
+            Completion(
+                pk=pk,
+                status=JobDBModel.JobStatus.ERROR,
+                outputs=outputs,
+                error=error,
+                pipeline_id=job.db_model.pipeline_id,
+            )
+        )
+
+    async def complete_job(
+        self, completion: Completion, next_jobs_inputs: Optional[list[dict]] = None
+    ) -> int:
+        """
+        Writes a finished job to db. A pipeline job is written right away together
+        with its next jobs, other jobs go through the completion buffer if there's one.
+        Returns the number of jobs made "new" by writing it, 0 if it was buffered.
+        """
+        if self.completion_buffer and next_jobs_inputs is None:
+            await self.completion_buffer.add(completion)
+            return 0
+        made_new = await JobDBModel.acomplete_job(
+            completion.pk,
+            completion.status,
+            completion.outputs,
+            completion.error,
+            next_jobs_inputs,
+            completion.pipeline_id,
+        )
+        _logger.info(f"Updated job with pk {completion.pk} to '{completion.status}'")
+        self.claimed_jobs.discard(completion.pk)
+        return made_new
+
+    async def run_job(self, job: BaseJob):
+        """
+        Runs the job where its class' `execution` says. Thread and process pools are
+        created the first time a job needs them. Jobs run in a process don't share any
+        objects with the job runner, so their outputs and next job inputs are copied back.
+        """
+        loop = asyncio.get_running_loop()
+        if job.execution == Execution.EVENT_LOOP:
+            await job.run()
+        elif job.execution == Execution.THREAD:
+            if self.thread_pool is None:
+                # not `sync_to_async`'s thread which runs our db queries, so blocking jobs can't hold them up
+                self.thread_pool = ThreadPoolExecutor(
+                    max_workers=self.max_num_threads,
+                    thread_name_prefix="job-runner-thread",
+                )
+            await loop.run_in_executor(self.thread_pool, run_job_sync, job)
+        elif job.execution == Execution.PROCESS:
+            if self.process_pool is None:
+                # forking this process would copy the locks held by its threads and share its db connections
+                self.process_pool = ProcessPoolExecutor(
+                    max_workers=self.max_num_processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_job_process,
+                )
+            job.outputs, job.next_job_inputs = await loop.run_in_executor(
+                self.process_pool,
+                run_job_in_process,
+                type(job),
+                job.inputs,
+                job.outputs,
+            )
+        else:
+            raise ValueError(
+                f"Unknown execution `{job.execution}` for job `{job.name}`!"
+            )
+
+    async def extend_leases(self):
+        """
+        Heartbeat which keeps the leases of the jobs claimed by this runner from expiring,
+        so they're not reclaimed while they're waiting in the job queue or running.
+        """
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if self.claimed_jobs:
+                await JobDBModel.aextend_leases(
+                    list(self.claimed_jobs), self.lease_seconds
+                )
+
+    async def reclaim_expired_jobs(self):
+        """Makes jobs claimed by job runners which died without finishing them "new" again."""
+        while True:
+            reclaimed = await JobDBModel.areclaim_expired_jobs(self.max_attempts)
+            if reclaimed:
+                _logger.info(f"Reclaimed {reclaimed} jobs with expired leases")
+                assert self.idle_poller
+                self.idle_poller.wake()
+            await asyncio.sleep(self.reclaim_interval_seconds)
+
+    def stop(self):
+        """
+        Stops claiming jobs. Workers exit once they've run the jobs already claimed,
+        so `run` returns without leaving any jobs "in progress".
+        """
+        _logger.info("Stopping job runner")
+        self.stop_event.set()
+        # interrupt waiting for new jobs, so claiming stops right away
+        assert self.idle_poller
+        self.idle_poller.wake()
+        if self.new_jobs_listener:
+            self.new_jobs_listener.new_jobs.set()
 
     async def run(self):
         if self.max_num_workers < 1:
             raise ValueError("Max number of workers cannot be smaller than one!")
 
+        if self.drain_on_sigterm:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.stop)
+
+        if not self.listen_for_new_jobs:
+            await self.run_workers()
+            return
+
+        self.new_jobs_listener = NewJobsListener()
+        await self.new_jobs_listener.connect()
+        listener_task = asyncio.create_task(self.new_jobs_listener.listen())
+        try:
+            await self.run_workers()
+        finally:
+            listener_task.cancel()
+            await self.new_jobs_listener.close()
+
+    async def run_workers(self):
+        assert self.db_executor
+        # tasks created from here on run their db queries with this runner's db executor
+        db_executor_token = current_db_executor.set(self.db_executor)
+        background_tasks = []
+        if self.lease_seconds:
+            background_tasks.append(asyncio.create_task(self.extend_leases()))
+            if self.reclaim_interval_seconds:
+                background_tasks.append(
+                    asyncio.create_task(self.reclaim_expired_jobs())
+                )
+        if self.completion_buffer:
+            background_tasks.append(
+                asyncio.create_task(self.completion_buffer.flush_periodically())
+            )
+
+        try:
+            if job_registery.rate_limits:
+                await JobRateLimitDBModel.acreate_buckets(job_registery.rate_limits)
+            await self.run_main_tasks()
+        finally:
+            for task in background_tasks:
+                task.cancel()
+            if self.completion_buffer:
+                # don't lose the completions which weren't written to db yet, if that fails
+                # too, their jobs are left "in progress" until their leases expire
+                await self.completion_buffer.flush_logging_errors()
+            # jobs still running in the pools are abandoned like the cancelled async ones
+            for pool in (self.thread_pool, self.process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            current_db_executor.reset(db_executor_token)
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.db_executor.shutdown
+            )
+            _logger.info(f"DB stats: {self.db_executor.stats}")
+
+    async def run_main_tasks(self):
         if self.timeout_seconds:
             try:
                 async with asyncio.timeout(self.timeout_seconds):
@@ -209,6 +577,15 @@ async def run_num_jobs(
     num_jobs: int = 0,
     timeout: int = 0,
     skip_jobs: Optional[list[str]] = None,
+    batch_claim: bool = False,
+    listen_for_new_jobs: bool = False,
+    max_wait_seconds_between_queries: float = 5.0,
+    queues: Optional[dict[str, int]] = None,
+    lease_seconds: float = 60.0,
+    max_attempts: Optional[int] = None,
+    completion_batch_size: int = 0,
+    max_num_threads: int = 10,
+    max_num_db_threads: int = 0,
 ):
     _logger.info("Job runner started.")
     if not isinstance(timeout, int):
@@ -219,5 +596,14 @@ async def run_num_jobs(
         num_jobs_to_run=num_jobs,
         timeout_seconds=timeout,
         exclude_jobs=skip_jobs,
+        batch_claim=batch_claim,
+        listen_for_new_jobs=listen_for_new_jobs,
+        max_wait_seconds_between_queries=max_wait_seconds_between_queries,
+        queues=queues,
+        lease_seconds=lease_seconds,
+        max_attempts=max_attempts,
+        completion_batch_size=completion_batch_size,
+        max_num_threads=max_num_threads,
+        max_num_db_threads=max_num_db_threads,
     )
     await runner.run()
@@ -2,12 +2,17 @@ import asyncio
 from dataclasses import dataclass
 from typing import List, Optional
 
-from asgiref.sync import sync_to_async
 from django.db import transaction
-from django.utils.module_loading import import_module
 
-from .job import BaseJob, acreate_new, create_not_ready
-from .models import JobDBModel, PipelineDBModel
+from .db import run_in_db_thread
+from .job import BaseJob
+from .models import (
+    JobDBModel,
+    JobDependencyDBModel,
+    PipelineDBModel,
+    PipelineJobsDBModel,
+)
+from .notifications import notify_new_jobs
 from .registry import pipeline_registery
 
 
@@ -35,63 +40,205 @@ class StartPipeline(BaseJob):
             raise ValueError(
                 f"Pipeline class named '{pipeline_klass_name}' is not in any registered Django app!"
             )
-        module = import_module(
-            pipeline_registery.get_import_path_for_class_name(pipeline_klass_name)
-        )
-        pipeline_klass = getattr(module, pipeline_klass_name)
+        pipeline_klass = pipeline_registery.get(pipeline_klass_name)
 
         await self.run_db_queries_in_a_transaction(pipeline_klass)
 
-    @sync_to_async
-    def run_db_queries_in_a_transaction(self, pipeline_klass):
+    async def run_db_queries_in_a_transaction(self, pipeline_klass):
+        await run_in_db_thread(self.create_pipeline_run, pipeline_klass)
+
+    def create_pipeline_run(self, pipeline_klass):
         """
-        Creates a bunch of rows as shown below in db using a transaction.
-        1. Creates a pipeline row.
-        2. Creates a job row for each job in the pipeline class
-        3. Creates a pipeline job row to associate each job row with the pipeline row from step 1
-        4. Marks the first job as "new", so it can be picked up by the job runner.
-        Note that the rest of the jobs are in "not ready" status which means they're not picked up by the
-        job runner. The job runner is responsible for marking the next job in the pipeline as "new".
+        Creates a pipeline row, a job row for each job in the pipeline class and a pipeline job row
+        associating each job row with the pipeline row, using a transaction. See `create_pipeline_runs`.
         """
+        assert self.db_model
+
         with transaction.atomic():
-            pipeline = PipelineDBModel.create_new_in_db(pipeline_klass)
-
-            first_job: bool = True
-            # create "not ready" jobs
-            for job_klass in pipeline_klass.jobs:
-                if first_job:
-                    assert self.inputs
-                    if self.inputs.first_job_inputs:
-                        if hasattr(job_klass, "Inputs"):
-                            inputs = job_klass.Inputs(**self.inputs.first_job_inputs)
-                        else:
-                            raise ValueError(
-                                f"First job inputs were given to the pipeline, but the job class {pipeline_klass} has no `Inputs` class within it!"
-                            )
-
-                        job_instance: BaseJob = job_klass.create(inputs=inputs)
-                    else:
-                        job_instance: BaseJob = job_klass.create()
-                    first_job = False
-                    first_job_db_model: JobDBModel = create_not_ready(
-                        job_instance, self.db_model
-                    )
-                    pipeline.add_job(first_job_db_model)
-                    prev_job: JobDBModel = first_job_db_model
-                else:
-                    # Here we don't want to enforce that inputs are given to the job (i.e. `check_inputs=False`)
-                    # because at this point we don't know what the inputs are.
-                    # The inputs are added to job row by the job runner because once the jobs finishes running
-                    # we know the user has set the value of the next job's inputs.
-                    job_instance: BaseJob = job_klass.create(check_inputs=False)
-                    prev_job: JobDBModel = create_not_ready(job_instance, prev_job)
-                    pipeline.add_job(prev_job)
+            create_pipeline_runs(pipeline_klass, [self.db_model])
 
-            first_job_db_model.status = JobDBModel.JobStatus.NEW
-            first_job_db_model.save()
+
+def job_inputs_asdict(job_klass, inputs: Optional[dict]) -> dict:
+    if not inputs:
+        return {}
+    if not hasattr(job_klass, "Inputs"):
+        raise ValueError(
+            f"Inputs were given to the pipeline, but the job class {job_klass} has no `Inputs` class within it!"
+        )
+    return job_klass.create(inputs=job_klass.Inputs(**inputs)).inputs_asdict()
+
+
+def create_pipeline_runs(
+    pipeline_klass, start_jobs: list[JobDBModel]
+) -> list[PipelineDBModel]:
+    """
+    Creates a run of `pipeline_klass` for each `StartPipeline` job row in `start_jobs`, taking
+    the inputs and priority of that row. Call it in a transaction.
+    Rows of each kind are created with one `INSERT` for all runs, so creating 50k runs takes as many
+    statements as creating one:
+    1. A pipeline row per run.
+    2. A job row for each job in the pipeline class. The jobs of a chain are created one step
+    at a time for all runs, pointing to the job of the previous step through `previous_job`.
+    Only the first job is "new", the rest are "not ready" until the job runner finishes
+    the job before them, see `JobDBModel.complete_job`. The jobs of a DAG are created at once, those
+    waiting for other jobs are "not ready" until they're done, see `JobDBModel.release_dependents`.
+    3. A pipeline job row associating each job row with its pipeline row.
+    """
+    pipelines = PipelineDBModel.objects.bulk_create(
+        [
+            PipelineDBModel(
+                name=pipeline_klass.__name__,
+                status=PipelineDBModel.Status.NEW,
+                num_jobs=len(pipeline_klass.jobs),
+            )
+            for _ in start_jobs
+        ],
+        batch_size=10_000,
+    )
+    if pipeline_klass.is_dag():
+        runs = create_dag_jobs(pipeline_klass, start_jobs, pipelines)
+    else:
+        runs = create_chain_jobs(pipeline_klass, start_jobs, pipelines)
+    PipelineJobsDBModel.objects.bulk_create(
+        [
+            PipelineJobsDBModel(pipeline=pipeline, job=job)
+            for pipeline, jobs in zip(pipelines, runs)
+            for job in jobs
+        ],
+        batch_size=10_000,
+    )
+    notify_new_jobs()
+
+    return pipelines
+
+
+def create_chain_jobs(
+    pipeline_klass, start_jobs: list[JobDBModel], pipelines: list[PipelineDBModel]
+) -> list[list[JobDBModel]]:
+    runs: list[list[JobDBModel]] = [[] for _ in start_jobs]
+    previous_jobs = start_jobs
+    for step, job_klass in enumerate(pipeline_klass.jobs):
+        # the inputs of the jobs after the first one are added to their rows by the job runner, once
+        # the job before them finishes running and we know what the user has set as the next job's inputs
+        previous_jobs = JobDBModel.objects.bulk_create(
+            [
+                JobDBModel(
+                    name=job_klass.__name__,
+                    previous_job=previous_job,
+                    pipeline=pipeline,
+                    status=(
+                        JobDBModel.JobStatus.NEW
+                        if step == 0
+                        else JobDBModel.JobStatus.NOT_READY
+                    ),
+                    inputs=(
+                        job_inputs_asdict(
+                            job_klass, previous_job.inputs["first_job_inputs"]
+                        )
+                        if step == 0
+                        else {}
+                    ),
+                    outputs={},
+                    priority=previous_job.priority,
+                    queue=job_klass.queue,
+                )
+                for previous_job, pipeline in zip(previous_jobs, pipelines)
+            ],
+            batch_size=10_000,
+        )
+        for jobs, job in zip(runs, previous_jobs):
+            jobs.append(job)
+
+    return runs
+
+
+def create_dag_jobs(
+    pipeline_klass, start_jobs: list[JobDBModel], pipelines: list[PipelineDBModel]
+) -> list[list[JobDBModel]]:
+    """
+    Every job taking inputs gets the pipeline's inputs. Jobs which don't wait for any other job are "new",
+    the others are "not ready" and counted down as the jobs they wait for are done.
+    """
+    dependencies = {
+        job_klass: set(depends_on)
+        for job_klass, depends_on in pipeline_klass.dependencies.items()
+    }
+    waited_for = set().union(*dependencies.values())
+    to_create = [
+        JobDBModel(
+            name=job_klass.__name__,
+            pipeline=pipeline,
+            status=(
+                JobDBModel.JobStatus.NOT_READY
+                if dependencies.get(job_klass)
+                else JobDBModel.JobStatus.NEW
+            ),
+            inputs=(
+                job_inputs_asdict(job_klass, start_job.inputs["first_job_inputs"])
+                if hasattr(job_klass, "Inputs")
+                else {}
+            ),
+            outputs={},
+            priority=start_job.priority,
+            queue=job_klass.queue,
+            pending_dependencies=len(dependencies.get(job_klass, ())),
+            has_dependents=job_klass in waited_for,
+        )
+        for start_job, pipeline in zip(start_jobs, pipelines)
+        for job_klass in pipeline_klass.jobs
+    ]
+    jobs = JobDBModel.objects.bulk_create(to_create, batch_size=10_000)
+    num_jobs = len(pipeline_klass.jobs)
+    runs = [jobs[i : i + num_jobs] for i in range(0, len(jobs), num_jobs)]
+    to_create = []
+    for run in runs:
+        job_by_class = dict(zip(pipeline_klass.jobs, run))
+        to_create.extend(
+            JobDependencyDBModel(
+                job=job_by_class[job_klass], depends_on=job_by_class[klass]
+            )
+            for job_klass, depends_on in dependencies.items()
+            for klass in depends_on
+        )
+    JobDependencyDBModel.objects.bulk_create(to_create, batch_size=10_000)
+
+    return runs
+
+
+def trigger_pipelines(
+    pipeline_klass, list_of_inputs: list, priority: int = 0
+) -> list[PipelineDBModel]:
+    """
+    Creates a run of `pipeline_klass` for each of `list_of_inputs` right away, without
+    `StartPipeline` jobs having to be run first. Their rows are still created, as "done",
+    so the first job of each chain points to one through `previous_job`.
+    """
+    start_jobs = [
+        JobDBModel(
+            name=StartPipeline.__name__,
+            status=JobDBModel.JobStatus.DONE,
+            inputs=StartPipeline(
+                inputs=StartPipeline.Inputs(
+                    pipeline_name=pipeline_klass.__name__, first_job_inputs=inputs
+                )
+            ).inputs_asdict(),
+            outputs={},
+            priority=priority,
+            queue=StartPipeline.queue,
+        )
+        for inputs in list_of_inputs
+    ]
+    with transaction.atomic():
+        start_jobs = JobDBModel.objects.bulk_create(start_jobs, batch_size=10_000)
+        return create_pipeline_runs(pipeline_klass, start_jobs)
 
 
 class CheckPreviousJobsFinished(BaseJob):  # TODO add usage of this to README
+    """
+    Polls the previous jobs until they're done, holding a job runner worker meanwhile.
+    Prefer `JoinPreviousJobs`, which doesn't run until they're done.
+    """
+
     @dataclass
     class Inputs:
         previous_jobs_ids: List[int]
@@ -134,3 +281,23 @@ class CheckPreviousJobsFinished(BaseJob):  # TODO add usage of this to README
             all_done = True
 
         self.outputs = self.Outputs(finished_jobs_outputs=previous_jobs_outputs)
+
+
+class JoinPreviousJobs(BaseJob):
+    """
+    Gathers the outputs of the jobs it depends on, in the order they were created.
+    Create it with `create_join`/`acreate_join`, so it's only run once they're all done.
+    """
+
+    @dataclass
+    class Outputs:
+        finished_jobs_outputs: List
+
+    async def run(self):
+        assert self.db_model
+
+        self.outputs = self.Outputs(
+            finished_jobs_outputs=await JobDBModel.aget_dependencies_outputs(
+                self.db_model.pk
+            )
+        )
@@ -2,8 +2,25 @@ import asyncio
 
 from django.core.management.base import BaseCommand, CommandError
 
-from django_async_job_pipelines.job_runner import run_num_jobs
-from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.job_runner import Runner
+from django_async_job_pipelines.supervisor import Supervisor
+
+
+def parse_queues(value: str) -> dict[str, int]:
+    """
+    Parses comma separated queue names each with an optional weight,
+    e.g. "gpu:3,default" is `{"gpu": 3, "default": 1}`.
+    """
+    queues = dict()
+    for queue in value.split(","):
+        name, _, weight = queue.partition(":")
+        try:
+            queues[name] = int(weight) if weight else 1
+        except ValueError:
+            raise CommandError(
+                f"Weight of queue '{name}' should be an integer: {weight}"
+            )
+    return queues
 
 
 class Command(BaseCommand):
@@ -14,33 +31,113 @@ class Command(BaseCommand):
             type=int,
             help="Maximum number of `async` workers (not OS processes) which will be consuming jobs concurrently",
         )
+        parser.add_argument(
+            "--processes",
+            default=1,
+            type=int,
+            help="Number of job runner OS processes to fork. Crashed processes are restarted and SIGTERM makes all of them finish the jobs they've claimed and exit.",
+        )
+        parser.add_argument(
+            "--max_num_threads",
+            default=10,
+            type=int,
+            help="Size of the thread pool running `SyncBaseJob` jobs and jobs whose class sets `execution = Execution.THREAD`",
+        )
+        parser.add_argument(
+            "--max_num_db_threads",
+            default=0,
+            type=int,
+            help="Run the job runner's db queries in a pool of this many threads, each with its own db connection. Zero runs them on the single thread `sync_to_async` uses.",
+        )
+        parser.add_argument(
+            "--max_num_processes",
+            default=None,
+            type=int,
+            help="Size of the process pool running jobs whose class sets `execution = Execution.PROCESS`. Defaults to the number of CPUs.",
+        )
         parser.add_argument(
             "--exclude",
             default="",
             type=str,
             help="Comma separated job names (a job name is the name of the job `class`) to exclude from this job runner",
         )
+        parser.add_argument(
+            "--queues",
+            default="",
+            type=str,
+            help="Comma separated queue names to consume jobs from, each with an optional weight, e.g. `gpu:3,default`. Jobs are claimed from these queues in weighted round-robin order. By default jobs are consumed from all queues.",
+        )
+        parser.add_argument(
+            "--lease_seconds",
+            default=60.0,
+            type=float,
+            help="Jobs claimed by this job runner are reclaimed by other job runners if this job runner dies and doesn't extend their lease within this many seconds. Zero disables leases.",
+        )
+        parser.add_argument(
+            "--max_attempts",
+            default=0,
+            type=int,
+            help="Jobs whose lease expired after they were claimed this many times are marked as failed instead of being run again. Zero runs them again however many times they were claimed.",
+        )
+        parser.add_argument(
+            "--completion_batch_size",
+            default=0,
+            type=int,
+            help="Write finished jobs to the database in bulk once this many of them are buffered (or every 50 milliseconds). Zero writes each finished job right away.",
+        )
         parser.add_argument(
             "--timeout",
             default=0,
             type=int,
             help="This is used for testing purposes mainly. The jobs runner stops after this many seconds.",
         )
+        parser.add_argument(
+            "--batch_claim",
+            action="store_true",
+            help="Claim as many jobs as there are free workers with one database query instead of one job per query",
+        )
+        parser.add_argument(
+            "--listen",
+            action="store_true",
+            help="Wait for Postgres notifications about new jobs instead of polling the database (requires the `ASYNC_JOB_PIPELINES_NOTIFY` setting)",
+        )
+        parser.add_argument(
+            "--max_seconds_between_queries",
+            default=5.0,
+            type=float,
+            help="When there are no jobs to run, the job runner backs off exponentially between database queries up to this many seconds",
+        )
 
     def handle(self, *args, **options):
-        timeout = options["timeout"]
+        jobs_to_skip = None
         if options["exclude"]:
             jobs_to_skip = options["exclude"].split(",")
-            asyncio.run(
-                run_num_jobs(
-                    max_num_workers=int(options["max_num_workers"]),
-                    skip_jobs=jobs_to_skip,
-                    timeout=timeout,
-                ),
-            )
+        queues = None
+        if options["queues"]:
+            queues = parse_queues(options["queues"])
+        runner_kwargs = dict(
+            max_num_workers=int(options["max_num_workers"]),
+            exclude_jobs=jobs_to_skip,
+            timeout_seconds=options["timeout"],
+            batch_claim=options["batch_claim"],
+            listen_for_new_jobs=options["listen"],
+            max_wait_seconds_between_queries=options["max_seconds_between_queries"],
+            queues=queues,
+            lease_seconds=options["lease_seconds"],
+            max_attempts=options["max_attempts"] or None,
+            completion_batch_size=options["completion_batch_size"],
+            max_num_threads=options["max_num_threads"],
+            max_num_processes=options["max_num_processes"],
+            max_num_db_threads=options["max_num_db_threads"],
+        )
+        if options["processes"] > 1:
+            Supervisor(
+                num_processes=options["processes"],
+                runner_kwargs=runner_kwargs,
+                report=self.stdout.write,
+            ).run()
         else:
-            asyncio.run(
-                run_num_jobs(
-                    max_num_workers=int(options["max_num_workers"]), timeout=timeout
-                )
-            )
+            runner = Runner(drain_on_sigterm=True, **runner_kwargs)
+            asyncio.run(runner.run())
+            assert runner.db_executor
+            self.stdout.write(f"DB stats: {runner.db_executor.stats}")
@@ -0,0 +1,24 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from django_async_job_pipelines.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    help = "Creates the jobs of the periodic job classes, the ones setting `run_every`, every `run_every`. Several of these processes can run without creating a job twice."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout",
+            default=0,
+            type=int,
+            help="This is used for testing purposes mainly. The scheduler stops after this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler(timeout_seconds=options["timeout"])
+        self.stdout.write(
+            f"Scheduling periodic jobs: {', '.join(f'{j.__name__} every {j.run_every}' for j in scheduler.jobs)}"
+        )
+        asyncio.run(scheduler.run())
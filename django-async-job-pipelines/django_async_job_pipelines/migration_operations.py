@@ -0,0 +1,115 @@
+from django.db import NotSupportedError, models
+from django.db.migrations.operations import AddConstraint, AddIndex, RemoveIndex
+
+# Like `django.contrib.postgres.operations`, which we don't import since it needs psycopg installed,
+# even on databases which aren't Postgres.
+
+
+def concurrently(operation, schema_editor) -> bool:
+    """
+    Whether the index of `operation` is created or dropped concurrently, which only Postgres can do.
+    Postgres can't do it in a transaction, so migrations doing it set `atomic = False`.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f"The {type(operation).__name__} operation cannot be executed inside a transaction "
+            "(set atomic = False on the migration)."
+        )
+    return True
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    Creates the index with `CREATE INDEX CONCURRENTLY` on Postgres, so adding it to a busy jobs table
+    doesn't block job runners claiming and finishing jobs. Other databases create it as `AddIndex` does.
+    """
+
+    atomic = False
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not concurrently(self, schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not concurrently(self, schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class RemoveIndexConcurrently(RemoveIndex):
+    """Drops the index with `DROP INDEX CONCURRENTLY` on Postgres, see `AddIndexConcurrently`."""
+
+    atomic = False
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not concurrently(self, schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            from_model_state = from_state.models[app_label, self.model_name_lower]
+            index = from_model_state.get_index_by_name(self.name)
+            schema_editor.remove_index(model, index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not concurrently(self, schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            to_model_state = to_state.models[app_label, self.model_name_lower]
+            index = to_model_state.get_index_by_name(self.name)
+            schema_editor.add_index(model, index, concurrently=True)
+
+
+class AddUniqueConstraintConcurrently(AddConstraint):
+    """
+    Adds a partial `UniqueConstraint`, which Postgres enforces with a unique index, building the index
+    with `CREATE UNIQUE INDEX CONCURRENTLY` so adding it to a busy jobs table doesn't block writes to it.
+    Other databases add the constraint as `AddConstraint` does.
+    """
+
+    atomic = False
+
+    def __init__(self, model_name, constraint):
+        if (
+            not isinstance(constraint, models.UniqueConstraint)
+            or constraint.condition is None
+        ):
+            raise ValueError(
+                f"`{type(self).__name__}` only adds partial unique constraints, which are unique indexes."
+            )
+        super().__init__(model_name, constraint)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not concurrently(self, schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            statement = self.constraint.create_sql(model, schema_editor)
+            statement.template = statement.template.replace(
+                "CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1
+            )
+            schema_editor.execute(statement)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not concurrently(self, schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            statement = self.constraint.remove_sql(model, schema_editor)
+            statement.template = statement.template.replace(
+                "DROP INDEX", "DROP INDEX CONCURRENTLY", 1
+            )
+            schema_editor.execute(statement)
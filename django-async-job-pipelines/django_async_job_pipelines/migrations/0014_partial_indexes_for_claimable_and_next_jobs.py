@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:42
+
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0013_alter_pipelinejobsdbmodel_pipeline"),
+    ]
+
+    operations = [
+        migration_operations.AddIndexConcurrently(
+            model_name="jobdbmodel",
+            index=models.Index(
+                condition=models.Q(("status__in", ["NEW", "NOT_READY"])),
+                fields=["status", "id"],
+                name="async_job_claimable_idx",
+            ),
+        ),
+        migration_operations.AddIndexConcurrently(
+            model_name="jobdbmodel",
+            index=models.Index(
+                condition=models.Q(("status", "NOT_READY")),
+                fields=["previous_job"],
+                name="async_job_not_ready_next_idx",
+            ),
+        ),
+    ]
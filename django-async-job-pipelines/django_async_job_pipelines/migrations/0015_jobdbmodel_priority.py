@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:43
+
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        (
+            "django_async_job_pipelines",
+            "0014_partial_indexes_for_claimable_and_next_jobs",
+        ),
+    ]
+
+    operations = [
+        migration_operations.RemoveIndexConcurrently(
+            model_name="jobdbmodel",
+            name="async_job_claimable_idx",
+        ),
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="priority",
+            field=models.IntegerField(default=0),
+        ),
+        migration_operations.AddIndexConcurrently(
+            model_name="jobdbmodel",
+            index=models.Index(
+                condition=models.Q(("status__in", ["NEW", "NOT_READY"])),
+                fields=["status", "priority", "id"],
+                name="async_job_claimable_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:44
+
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0015_jobdbmodel_priority"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="queue",
+            field=models.CharField(default="default", max_length=100),
+        ),
+        migration_operations.AddIndexConcurrently(
+            model_name="jobdbmodel",
+            index=models.Index(
+                condition=models.Q(("status", "NEW")),
+                fields=["queue", "priority", "id"],
+                name="async_job_queue_claimable_idx",
+            ),
+        ),
+    ]
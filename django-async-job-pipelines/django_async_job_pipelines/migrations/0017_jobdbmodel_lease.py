@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:46
+
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0016_jobdbmodel_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="lease_expires_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migration_operations.AddIndexConcurrently(
+            model_name="jobdbmodel",
+            index=models.Index(
+                condition=models.Q(("status", "IN_PROGRESS")),
+                fields=["lease_expires_at"],
+                name="async_job_lease_idx",
+            ),
+        ),
+    ]
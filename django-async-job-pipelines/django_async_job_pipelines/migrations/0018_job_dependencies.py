@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_async_job_pipelines", "0017_jobdbmodel_lease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="has_dependents",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="pending_dependencies",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="JobDependencyDBModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "depends_on",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dependents",
+                        to="django_async_job_pipelines.jobdbmodel",
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dependencies",
+                        to="django_async_job_pipelines.jobdbmodel",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "async_job_dependency",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("job", "depends_on"), name="async_job_dependency_unique"
+                    )
+                ],
+            },
+        ),
+    ]
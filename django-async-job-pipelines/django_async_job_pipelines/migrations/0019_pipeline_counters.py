@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0018_job_dependencies"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="pipeline",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="django_async_job_pipelines.pipelinedbmodel",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pipelinedbmodel",
+            name="date_finished",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="pipelinedbmodel",
+            name="date_started",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="pipelinedbmodel",
+            name="num_done_jobs",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="pipelinedbmodel",
+            name="num_failed_jobs",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="pipelinedbmodel",
+            name="num_jobs",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migration_operations.AddIndexConcurrently(
+            model_name="jobdbmodel",
+            index=models.Index(
+                condition=models.Q(("pipeline__isnull", False)),
+                fields=["pipeline"],
+                name="async_job_pipeline_idx",
+            ),
+        ),
+    ]
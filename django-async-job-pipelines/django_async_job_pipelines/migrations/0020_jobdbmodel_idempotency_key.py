@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:21
+
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0019_pipeline_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migration_operations.AddUniqueConstraintConcurrently(
+            model_name="jobdbmodel",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("idempotency_key__isnull", False)),
+                fields=("idempotency_key",),
+                name="async_job_idempotency_key_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0020_jobdbmodel_idempotency_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="run_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migration_operations.AddIndexConcurrently(
+            model_name="jobdbmodel",
+            index=models.Index(
+                condition=models.Q(("status", "NEW")),
+                fields=["status", "run_at"],
+                name="async_job_run_at_idx",
+            ),
+        ),
+    ]
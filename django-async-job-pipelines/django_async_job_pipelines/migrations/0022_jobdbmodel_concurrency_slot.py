@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:29
+
+from django.db import migrations, models
+
+from django_async_job_pipelines import migration_operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0021_jobdbmodel_run_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobdbmodel",
+            name="concurrency_slot",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migration_operations.AddUniqueConstraintConcurrently(
+            model_name="jobdbmodel",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "IN_PROGRESS")),
+                fields=("name", "concurrency_slot"),
+                name="async_job_concurrency_slot_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_async_job_pipelines", "0022_jobdbmodel_concurrency_slot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobRateLimitDBModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200, unique=True)),
+                ("tokens", models.FloatField()),
+                ("date_refilled", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "async_job_rate_limit",
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def batches_of_pks(queryset):
+    """The PKs of `queryset` in batches of `BATCH_SIZE`, each fetched with its own query in PK order."""
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:BATCH_SIZE]
+        )
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def backfill_pipelines(apps, schema_editor):
+    """
+    Links existing jobs to their pipelines and computes the counters and status of existing pipelines,
+    see `0019_pipeline_counters`. The migration isn't atomic, so each batch is committed on its own
+    and job runners aren't locked out of the job table while it runs.
+    """
+    JobDBModel = apps.get_model("django_async_job_pipelines", "JobDBModel")
+    PipelineDBModel = apps.get_model("django_async_job_pipelines", "PipelineDBModel")
+    PipelineJobsDBModel = apps.get_model(
+        "django_async_job_pipelines", "PipelineJobsDBModel"
+    )
+
+    for pks in batches_of_pks(PipelineJobsDBModel.objects.all()):
+        JobDBModel.objects.bulk_update(
+            [
+                JobDBModel(pk=job_id, pipeline_id=pipeline_id)
+                for job_id, pipeline_id in PipelineJobsDBModel.objects.filter(
+                    pk__in=pks
+                ).values_list("job_id", "pipeline_id")
+            ],
+            ["pipeline"],
+        )
+
+    def count(**filters):
+        return Coalesce(
+            Subquery(
+                JobDBModel.objects.filter(pipeline=OuterRef("pk"), **filters)
+                .order_by()
+                .values("pipeline")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+
+    for pks in batches_of_pks(PipelineDBModel.objects.all()):
+        pipelines = PipelineDBModel.objects.filter(pk__in=pks)
+        pipelines.update(
+            num_jobs=count(),
+            num_done_jobs=count(status="DONE"),
+            num_failed_jobs=count(status="ERROR"),
+        )
+        pipelines.filter(num_failed_jobs__gt=0).update(status="ERROR")
+        pipelines.filter(
+            ~Q(num_jobs=0), num_failed_jobs=0, num_done_jobs=models.F("num_jobs")
+        ).update(status="DONE")
+        pipelines.filter(
+            status="NEW",
+            pk__in=JobDBModel.objects.filter(pipeline__in=pks)
+            .exclude(status__in=["NEW", "NOT_READY"])
+            .values("pipeline"),
+        ).update(status="IN_PROGRESS")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("django_async_job_pipelines", "0023_job_rate_limit"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_pipelines, migrations.RunPython.noop),
+    ]
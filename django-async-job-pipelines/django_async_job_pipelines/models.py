@@ -1,13 +1,28 @@
 import asyncio
 import logging
 import os
+from datetime import datetime, timedelta
 from typing import Iterable, Optional, Self
 
-from asgiref.sync import sync_to_async
-from django.db import models, transaction
-from django.utils.module_loading import import_module
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
 
+from .backoff import IdlePoller
+from .db import can_update_returning, run_in_db_thread
 from .job import BaseJob, create_new
+from .notifications import notifications_enabled, notify_new_jobs
 from .registry import job_registery
 
 
@@ -44,9 +59,81 @@ class JobDBModel(models.Model):
         max_length=20, choices=JobStatus.choices, default=JobStatus.NEW
     )
     error = models.TextField(null=True)
+    # jobs with a lower priority value are claimed first
+    priority = models.IntegerField(default=0)
+    queue = models.CharField(max_length=100, default="default")
+    # a job runner owns an "in progress" job until its lease expires,
+    # then the job can be reclaimed, i.e. made "new" again
+    lease_expires_at = models.DateTimeField(null=True)
+    # the number of times this job was claimed
+    attempts = models.PositiveIntegerField(default=0)
+    # a "new" job isn't claimed before this time
+    run_at = models.DateTimeField(default=timezone.now)
+    # a join job stays "not ready" until this many of the jobs it depends on are done
+    pending_dependencies = models.PositiveIntegerField(default=0)
+    # completing a job with dependents counts down their `pending_dependencies`
+    has_dependents = models.BooleanField(default=False)
+    # a job created again with a key which is taken isn't created, the existing job is returned instead
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    # an "in progress" job of a class setting `max_concurrency` holds this slot, see `claim_limited_jobs`
+    concurrency_slot = models.PositiveSmallIntegerField(null=True, blank=True)
+    # the pipeline run this job is part of, its counters are kept current as the job finishes
+    pipeline = models.ForeignKey(
+        "PipelineDBModel",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_index=False,  # see `async_job_pipeline_idx`
+    )
 
     class Meta:
         db_table = "async_job"
+        indexes = [
+            # partial indexes stay small as `done` jobs pile up in the table
+            models.Index(
+                fields=["status", "priority", "id"],
+                name="async_job_claimable_idx",
+                condition=models.Q(status__in=["NEW", "NOT_READY"]),
+            ),
+            models.Index(
+                fields=["queue", "priority", "id"],
+                name="async_job_queue_claimable_idx",
+                condition=models.Q(status="NEW"),
+            ),
+            models.Index(
+                fields=["lease_expires_at"],
+                name="async_job_lease_idx",
+                condition=models.Q(status="IN_PROGRESS"),
+            ),
+            models.Index(
+                fields=["previous_job"],
+                name="async_job_not_ready_next_idx",
+                condition=models.Q(status="NOT_READY"),
+            ),
+            models.Index(
+                fields=["status", "run_at"],
+                name="async_job_run_at_idx",
+                condition=models.Q(status="NEW"),
+            ),
+            models.Index(
+                fields=["pipeline"],
+                name="async_job_pipeline_idx",
+                condition=models.Q(pipeline__isnull=False),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["idempotency_key"],
+                name="async_job_idempotency_key_unique",
+                condition=models.Q(idempotency_key__isnull=False),
+            ),
+            models.UniqueConstraint(
+                fields=["name", "concurrency_slot"],
+                name="async_job_concurrency_slot_unique",
+                condition=models.Q(status="IN_PROGRESS"),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.id}: {self.name}, {self.status}"
@@ -92,11 +179,33 @@ class JobDBModel(models.Model):
         return cls.objects.filter(status=cls.JobStatus.ERROR).count()
 
     @classmethod
-    async def amark_as_failed(cls, pk: int, error_msg: str = ""):
-        await JobDBModel.objects.filter(pk=pk).aupdate(
-            status=cls.JobStatus.ERROR, error=error_msg
+    def retry_later(cls, pk: int, run_at: datetime, error: str) -> bool:
+        """
+        Makes a failed "in progress" job "new" again, claimable from `run_at` on,
+        recording its `error` in the same query. Returns whether the job was "in progress".
+        """
+        return bool(
+            cls.objects.filter(pk=pk, status=cls.JobStatus.IN_PROGRESS).update(
+                status=cls.JobStatus.NEW,
+                run_at=run_at,
+                error=error,
+                lease_expires_at=None,
+                date_updated=timezone.now(),
+            )
         )
 
+    @classmethod
+    async def aretry_later(cls, pk: int, run_at: datetime, error: str) -> bool:
+        return await run_in_db_thread(cls.retry_later, pk, run_at, error)
+
+    @classmethod
+    def mark_as_failed(cls, pk: int, error_msg: str = ""):
+        cls.objects.filter(pk=pk).update(status=cls.JobStatus.ERROR, error=error_msg)
+
+    @classmethod
+    async def amark_as_failed(cls, pk: int, error_msg: str = ""):
+        await run_in_db_thread(cls.mark_as_failed, pk, error_msg)
+
     @classmethod
     def get_new_jobs_for_processing(
         cls,
@@ -125,140 +234,519 @@ class JobDBModel(models.Model):
         cls,
         exclude: Optional[list[str]] = None,
         wait_seconds_between_queries: float = 0.3,
+        max_wait_seconds_between_queries: float = 5.0,
     ) -> int:
         """
         Picks one job which is in `new` status. Updates its status to `in progress`.
         Returns the job.
-        If it cannot pick a job and update, it blocks until it finds one.
+        If it cannot pick a job and update, it blocks until it finds one backing off
+        exponentially starting at `wait_seconds_between_queries`.
         """
+        idle_poller = IdlePoller(
+            min_seconds=wait_seconds_between_queries,
+            max_seconds=max_wait_seconds_between_queries,
+        )
         while True:
-            found_new: bool = False
-            pk: tuple[int]
-            if not exclude:
-                job = await sync_to_async(
-                    cls.get_job_for_processing_and_mark_as_in_progress
-                )()
-                if not job:
-                    await asyncio.sleep(wait_seconds_between_queries)
-                else:
-                    return job.pk
-                # async for pk in cls.objects.filter(
-                #     status=cls.JobStatus.NEW
-                # ).values_list("pk"):
-                #     found_new = True
-                #     res = await cls.objects.filter(
-                #         pk=pk[0], status=cls.JobStatus.NEW
-                #     ).aupdate(status=cls.JobStatus.IN_PROGRESS)
-                #     if not res:
-                #         continue
-                #     else:
-                #         return pk[0]
-                # if not found_new:
-                #     await asyncio.sleep(
-                #         wait_seconds_between_queries
-                #     )  # TODO NEXT make this a config, benchmark with different values
-            else:
-                logger.info(f"Fetching from db excluding {exclude} jobs")
-                async for pk in (
-                    cls.objects.filter(status=cls.JobStatus.NEW)
-                    .exclude(name__in=exclude)
-                    .values_list("pk")
+            pks = await cls.aclaim_jobs_for_processing(1, exclude=exclude)
+            if pks:
+                return pks[0]
+            await idle_poller.wait()
+
+    @classmethod
+    def new_jobs(
+        cls, exclude: Optional[list[str]] = None, queues: Optional[list[str]] = None
+    ) -> models.QuerySet:
+        queryset = cls.objects.filter(status=cls.JobStatus.NEW)
+        if queues:
+            queryset = queryset.filter(queue__in=queues)
+        if exclude:
+            queryset = queryset.exclude(name__in=exclude)
+        return queryset
+
+    @classmethod
+    def claimable_jobs(
+        cls, exclude: Optional[list[str]] = None, queue: Optional[str] = None
+    ) -> models.QuerySet:
+        """Jobs which can be picked up by a job runner, i.e. whose `run_at` has come, in the order they're claimed."""
+        return (
+            cls.new_jobs(exclude, [queue] if queue else None)
+            .filter(run_at__lte=timezone.now())
+            .order_by("priority", "pk")
+        )
+
+    @classmethod
+    def next_run_at(
+        cls, exclude: Optional[list[str]] = None, queues: Optional[list[str]] = None
+    ) -> Optional[datetime]:
+        """
+        When the next "new" job which isn't claimable yet can be claimed, `None` if there's no such job.
+        Uses the partial `async_job_run_at_idx` index.
+        """
+        return (
+            cls.new_jobs(exclude, queues)
+            .filter(run_at__gt=timezone.now())
+            .aggregate(next_run_at=Min("run_at"))["next_run_at"]
+        )
+
+    @classmethod
+    async def anext_run_at(
+        cls, exclude: Optional[list[str]] = None, queues: Optional[list[str]] = None
+    ) -> Optional[datetime]:
+        return await run_in_db_thread(cls.next_run_at, exclude, queues)
+
+    @classmethod
+    def claim_jobs_for_processing(
+        cls,
+        limit: int,
+        exclude: Optional[list[str]] = None,
+        queue: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> list[int]:
+        """
+        Picks up to `limit` jobs which are in `new` status and updates their status to
+        `in progress` using a single `UPDATE ... RETURNING` statement.
+        Returns the PKs of the claimed jobs which is an empty list if there are no jobs to claim.
+        Pipelines of claimed pipeline jobs are marked as started with one more query, see `PipelineDBModel.start`.
+        If `queue` is given, only jobs in that queue are claimed.
+        If `lease_seconds` is given, the claimed jobs are reclaimed by `reclaim_expired_jobs`
+        unless their lease is extended or they finish within that many seconds.
+        On databases supporting `FOR UPDATE SKIP LOCKED` (e.g. Postgres) concurrent job runners
+        skip the rows being claimed by each other instead of waiting for them or claiming them twice.
+        Jobs of classes setting `max_concurrency` or `max_jobs_per_second` are claimed in the same
+        (priority, id) order, as long as their class isn't throttled, see `claim_candidates`.
+        """
+        if limit < 1:
+            raise ValueError("Limit for claiming jobs must be greater than zero!")
+
+        now = timezone.now()
+        lease_expires_at = None
+        if lease_seconds:
+            lease_expires_at = now + timedelta(seconds=lease_seconds)
+
+        queryset = cls.claimable_jobs(exclude, queue)
+        if job_registery.limited_job_names:
+            rows = cls.claim_candidates(queryset, limit, now, lease_expires_at)
+        else:
+            rows = cls.claim_jobs_of(
+                queryset.values("pk")[:limit], now, lease_expires_at
+            )
+        PipelineDBModel.start({row[1] for row in rows if row[1] is not None})
+        return [row[0] for row in rows]
+
+    @classmethod
+    def claim_candidates(
+        cls,
+        queryset: models.QuerySet,
+        limit: int,
+        now: datetime,
+        lease_expires_at: Optional[datetime],
+    ) -> list[tuple[int, Optional[int]]]:
+        """
+        Claims the first `limit` claimable jobs of `queryset` when job classes setting `max_concurrency`
+        or `max_jobs_per_second` are registered. The candidates are selected with the claim index as usual,
+        and only the limited classes among them are looked up, see `free_slots_of_limited_jobs`.
+        If some of them are throttled, the candidates are selected again without them, so throttled jobs
+        don't hold up other jobs, which happens at most once per limited class.
+        Limited candidates are claimed with `claim_limited_jobs`, the rest with `claim_jobs_of`, and
+        the PKs and pipeline IDs of the claimed jobs are returned in the candidates' order.
+        Without limited candidates this takes a `SELECT` and an `UPDATE`.
+        """
+        limited_names = set(job_registery.limited_job_names)
+        free_slots: dict[str, list[Optional[int]]] = {}
+        while True:
+            throttled = [name for name, slots in free_slots.items() if not slots]
+            candidates = list(
+                queryset.exclude(name__in=throttled).values_list(
+                    "pk", "pipeline_id", "name"
+                )[:limit]
+            )
+            new_names = {
+                c[2] for c in candidates if c[2] in limited_names - free_slots.keys()
+            }
+            if not new_names:
+                break
+            free_slots.update(cls.free_slots_of_limited_jobs(new_names, now))
+            if all(free_slots[name] for name in new_names):
+                break
+
+        rows = cls.claim_limited_jobs(
+            [c for c in candidates if c[2] in free_slots],
+            free_slots,
+            now,
+            lease_expires_at,
+        )
+        unlimited_pks = [c[0] for c in candidates if c[2] not in free_slots]
+        if unlimited_pks:
+            rows.extend(
+                cls.claim_jobs_of(
+                    cls.objects.filter(
+                        pk__in=unlimited_pks, status=cls.JobStatus.NEW
+                    ).values("pk"),
+                    now,
+                    lease_expires_at,
+                )
+            )
+        order = {c[0]: i for i, c in enumerate(candidates)}
+        rows.sort(key=lambda row: order[row[0]])
+        return rows
+
+    @classmethod
+    def claim_jobs_of(
+        cls,
+        queryset: models.QuerySet,
+        now: datetime,
+        lease_expires_at: Optional[datetime],
+    ) -> list[tuple[int, Optional[int]]]:
+        """Claims the jobs whose PKs `queryset` selects, returns their PKs and pipeline IDs."""
+        rows = []
+        if not can_update_returning(connection):
+            # no `RETURNING` support, so fall back to claiming rows one by one
+            for pk, pipeline_id in queryset.values_list("pk", "pipeline_id"):
+                if cls.objects.filter(pk=pk, status=cls.JobStatus.NEW).update(
+                    status=cls.JobStatus.IN_PROGRESS,
+                    date_updated=now,
+                    lease_expires_at=lease_expires_at,
+                    attempts=models.F("attempts") + 1,
                 ):
-                    found_new = True
-                    res = (
-                        await cls.objects.filter(pk=pk[0], status=cls.JobStatus.NEW)
-                        .exclude(name__in=exclude)
-                        .aupdate(status=cls.JobStatus.IN_PROGRESS)
+                    rows.append((pk, pipeline_id))
+            return rows
+
+        select_sql, select_params = queryset.query.sql_with_params()
+        if connection.features.has_select_for_update_skip_locked:
+            select_sql += " FOR UPDATE SKIP LOCKED"
+        table = connection.ops.quote_name(cls._meta.db_table)
+        sql = (
+            f"UPDATE {table} SET status = %s, date_updated = %s, lease_expires_at = %s, "
+            f"attempts = attempts + 1 WHERE id IN ({select_sql}) RETURNING id, pipeline_id"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql,
+                [
+                    cls.JobStatus.IN_PROGRESS,
+                    connection.ops.adapt_datetimefield_value(now),
+                    connection.ops.adapt_datetimefield_value(lease_expires_at),
+                    *select_params,
+                ],
+            )
+            return cursor.fetchall()
+
+    @classmethod
+    def free_slots_of_limited_jobs(
+        cls, names: Iterable[str], now: datetime
+    ) -> dict[str, list[Optional[int]]]:
+        """
+        For each of the job classes `names` setting `max_concurrency` or `max_jobs_per_second`,
+        the slots its jobs can be claimed with right now, an empty list if the class is throttled.
+        A slot is a free `concurrency_slot` number, or `None` for classes without `max_concurrency`,
+        and there are no more slots than the class' bucket has tokens, see `JobRateLimitDBModel`.
+        Takes up to two queries, reading "in progress" jobs' slots through the index of
+        `async_job_concurrency_slot_unique` and the small table of buckets, never the "new" jobs.
+        """
+        names = set(names)
+        taken: dict[str, set[int]] = {}
+        for name, slot in (
+            cls.objects.filter(
+                name__in=[n for n in names if n in job_registery.concurrency_limits],
+                status=cls.JobStatus.IN_PROGRESS,
+            )
+            .exclude(concurrency_slot=None)
+            .values_list("name", "concurrency_slot")
+        ):
+            taken.setdefault(name, set()).add(slot)
+        tokens = JobRateLimitDBModel.available_tokens(
+            {
+                name: job_registery.rate_limits[name]
+                for name in names
+                if name in job_registery.rate_limits
+            },
+            now,
+        )
+        free_slots: dict[str, list[Optional[int]]] = {}
+        for name in names:
+            max_concurrency = job_registery.concurrency_limits.get(name)
+            if max_concurrency:
+                slots: list[Optional[int]] = [
+                    slot
+                    for slot in range(max_concurrency)
+                    if slot not in taken.get(name, set())
+                ]
+            else:
+                slots = [None] * tokens[name]
+            if name in tokens:
+                slots = slots[: tokens[name]]
+            free_slots[name] = slots
+        return free_slots
+
+    @classmethod
+    def claim_limited_jobs(
+        cls,
+        candidates: list[tuple[int, Optional[int], str]],
+        free_slots: dict[str, list[Optional[int]]],
+        now: datetime,
+        lease_expires_at: Optional[datetime],
+    ) -> list[tuple[int, Optional[int]]]:
+        """
+        Claims `candidates`, given as `(PK, pipeline ID, name)` of jobs of classes setting `max_concurrency`
+        or `max_jobs_per_second`, with the `free_slots` of their class, see `free_slots_of_limited_jobs`.
+        A claimed job of a class setting `max_concurrency` takes one of its class' `max_concurrency` slots, a number
+        stored in `concurrency_slot`. Slots are unique among "in progress" jobs of a class through the partial
+        `async_job_concurrency_slot_unique` constraint, so job runners claiming the same slot at the same time
+        can't both succeed, and a job frees its slot by leaving the "in progress" status however it does.
+        A job of a class setting `max_jobs_per_second` takes a token of its class' bucket, see `JobRateLimitDBModel`.
+        Candidates left without a slot or token aren't claimed, and tokens taken for candidates
+        which couldn't be claimed, e.g. claimed by another job runner meanwhile, are given back.
+        Returns the PKs and pipeline IDs of the claimed jobs.
+        """
+        by_name: dict[str, list[tuple[int, Optional[int]]]] = {}
+        for pk, pipeline_id, name in candidates:
+            by_name.setdefault(name, []).append((pk, pipeline_id))
+        claimed = []
+        for name, name_candidates in by_name.items():
+            num_unused_tokens = 0
+            slots = free_slots[name][: len(name_candidates)]
+            max_jobs_per_second = job_registery.rate_limits.get(name)
+            if max_jobs_per_second and slots:
+                num_tokens = JobRateLimitDBModel.take_tokens(
+                    name, max_jobs_per_second, len(slots), now
+                )
+                slots = slots[:num_tokens]
+            for slot, (pk, pipeline_id) in zip(slots, name_candidates):
+                try:
+                    with transaction.atomic():
+                        updated = cls.objects.filter(
+                            pk=pk, status=cls.JobStatus.NEW
+                        ).update(
+                            status=cls.JobStatus.IN_PROGRESS,
+                            concurrency_slot=slot,
+                            date_updated=now,
+                            lease_expires_at=lease_expires_at,
+                            attempts=models.F("attempts") + 1,
+                        )
+                except IntegrityError:
+                    # another job runner took the slot
+                    num_unused_tokens += int(bool(max_jobs_per_second))
+                    continue
+                if updated:
+                    claimed.append((pk, pipeline_id))
+                elif max_jobs_per_second:
+                    num_unused_tokens += 1
+            if num_unused_tokens:
+                JobRateLimitDBModel.give_back_tokens(
+                    name, max_jobs_per_second, num_unused_tokens
+                )
+        return claimed
+
+    @classmethod
+    async def aclaim_jobs_for_processing(
+        cls,
+        limit: int,
+        exclude: Optional[list[str]] = None,
+        queue: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> list[int]:
+        return await run_in_db_thread(
+            cls.claim_jobs_for_processing, limit, exclude, queue, lease_seconds
+        )
+
+    @classmethod
+    def extend_leases(cls, pks: Iterable[int], lease_seconds: float) -> int:
+        """Extends the leases of "in progress" jobs with the given PKs by `lease_seconds` from now."""
+        return cls.objects.filter(pk__in=pks, status=cls.JobStatus.IN_PROGRESS).update(
+            lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds)
+        )
+
+    @classmethod
+    async def aextend_leases(cls, pks: Iterable[int], lease_seconds: float) -> int:
+        return await run_in_db_thread(cls.extend_leases, pks, lease_seconds)
+
+    @classmethod
+    def reclaim_expired_jobs(cls, max_attempts: Optional[int] = None) -> int:
+        """
+        Makes "in progress" jobs whose lease expired "new" again, e.g. because the job runner
+        which claimed them was killed. Jobs which were claimed `max_attempts` times are marked
+        as failed instead. Returns the number of jobs reclaimed.
+        Both updates use the partial `async_job_lease_idx` index, so this is cheap to run often.
+        """
+        expired = cls.objects.filter(
+            status=cls.JobStatus.IN_PROGRESS, lease_expires_at__lt=timezone.now()
+        )
+        if max_attempts:
+            to_fail = expired.filter(attempts__gte=max_attempts)
+            with transaction.atomic():
+                pipeline_ids = list(
+                    to_fail.filter(pipeline__isnull=False).values_list(
+                        "pipeline_id", flat=True
                     )
-                    if not res:
-                        continue
-                    else:
-                        return pk[0]
-                if not found_new:
-                    await asyncio.sleep(wait_seconds_between_queries)
+                )
+                to_fail.update(
+                    status=cls.JobStatus.ERROR,
+                    lease_expires_at=None,
+                    error=f"Lease expired after {max_attempts} attempts.",
+                )
+                PipelineDBModel.count_finished_jobs_of(
+                    [(pk, cls.JobStatus.ERROR) for pk in pipeline_ids]
+                )
+        return expired.update(status=cls.JobStatus.NEW, lease_expires_at=None)
+
+    @classmethod
+    async def areclaim_expired_jobs(cls, max_attempts: Optional[int] = None) -> int:
+        return await run_in_db_thread(cls.reclaim_expired_jobs, max_attempts)
 
     @classmethod
     async def aget_new_jobs_for_processing(cls, limit: int) -> list[int]:
         if limit == 0:
             raise ValueError("Limit for getting new jobs must be greater than zero!")
-        return [
-            res[0]
-            async for res in cls.objects.filter(status=cls.JobStatus.NEW).values_list(
-                "pk"
-            )[:limit]
-        ]
+        return await run_in_db_thread(
+            list,
+            cls.objects.filter(status=cls.JobStatus.NEW).values_list("pk", flat=True)[
+                :limit
+            ],
+        )
 
     @classmethod
     async def aget(cls, _id: int) -> Self:
-        return cls.objects.get(pk=_id)
+        return await run_in_db_thread(cls.objects.get, pk=_id)
 
     @classmethod
     async def aget_by_id(cls, _id: int) -> BaseJob:
-        job = await cls.objects.select_related("previous_job").aget(id=_id)
-        module = import_module(job_registery.get_import_path_for_class_name(job.name))
-        klass = getattr(module, job.name)
-        if hasattr(klass, "Inputs"):
+        job = await run_in_db_thread(
+            cls.objects.select_related("previous_job").get, id=_id
+        )
+        registered = job_registery.get(job.name)
+        if registered.inputs_class is not None:
             if not job.inputs:
                 job.status = cls.JobStatus.ERROR
-                await job.asave()
+                await run_in_db_thread(job.save)
+                if job.pipeline_id is not None:
+                    await run_in_db_thread(
+                        PipelineDBModel.count_finished_jobs,
+                        job.pipeline_id,
+                        num_failed=1,
+                    )
                 raise ValueError(
                     "If job class has a `Inputs` class then its inputs should be given!"
                 )
-            inputs = klass.Inputs(**job.inputs)
+            inputs = registered.inputs_class(**job.inputs)
         else:
             inputs = None
-        if hasattr(klass, "Outputs"):
-            if not job.outputs:
-                outputs = None
-            else:
-                outputs = klass.Outputs(**job.outputs)
+        if registered.outputs_class is not None and job.outputs:
+            outputs = registered.outputs_class(**job.outputs)
         else:
             outputs = None
 
-        return klass.create(  # we don't persist next job inputs in db
+        return registered.klass.create(  # we don't persist next job inputs in db
             inputs=inputs,
             outputs=outputs,
             status=job.status,
             db_model=job,
             previous_job=job.previous_job,
+            check_inputs=False,  # checked above
         )
 
     @classmethod
     async def aupdate_new_to_in_progress_by_id(cls, pk: int) -> int:
-        return await cls.objects.filter(pk=pk, status=cls.JobStatus.NEW).aupdate(
-            status=cls.JobStatus.IN_PROGRESS
+        return await run_in_db_thread(
+            cls.objects.filter(pk=pk, status=cls.JobStatus.NEW).update,
+            status=cls.JobStatus.IN_PROGRESS,
         )
 
     @classmethod
-    async def aupdate_in_progress_to_done_by_id(
+    def update_in_progress_to_done_by_id(
         cls, pk: int, outputs: Optional[dict | list] = None
     ) -> int:
         if not outputs:
-            return await cls.objects.filter(
-                pk=pk, status=cls.JobStatus.IN_PROGRESS
-            ).aupdate(status=cls.JobStatus.DONE)
+            return cls.objects.filter(pk=pk, status=cls.JobStatus.IN_PROGRESS).update(
+                status=cls.JobStatus.DONE
+            )
         else:
-            return await cls.objects.filter(
-                pk=pk, status=cls.JobStatus.IN_PROGRESS
-            ).aupdate(status=cls.JobStatus.DONE, outputs=outputs)
+            return cls.objects.filter(pk=pk, status=cls.JobStatus.IN_PROGRESS).update(
+                status=cls.JobStatus.DONE, outputs=outputs
+            )
+
+    @classmethod
+    async def aupdate_in_progress_to_done_by_id(
+        cls, pk: int, outputs: Optional[dict | list] = None
+    ) -> int:
+        return await run_in_db_thread(cls.update_in_progress_to_done_by_id, pk, outputs)
+
+    @classmethod
+    def bulk_complete(cls, completions: Iterable["Completion"]) -> list[int]:
+        """
+        Writes the status, outputs and error of many finished jobs
+        using one `UPDATE` statement.
+        Only "in progress" jobs are written, locked until the transaction ends, so a duplicate or
+        stale completion, e.g. of a job reclaimed and run again, doesn't count a job's dependents
+        or pipeline twice. Returns the PKs of the written jobs.
+        """
+        by_pk: dict[int, "Completion"] = {}
+        for c in completions:
+            by_pk.setdefault(c.pk, c)
+        with transaction.atomic():
+            in_progress = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=by_pk, status=cls.JobStatus.IN_PROGRESS)
+                .values_list("pk", flat=True)
+            )
+            completed = [by_pk[pk] for pk in in_progress]
+            # like `complete_job`, outputs and error are only written if the completion has them
+            cls.objects.bulk_update(
+                [
+                    cls(
+                        pk=c.pk,
+                        status=c.status,
+                        outputs=c.outputs if c.outputs else F("outputs"),
+                        error=c.error if c.error is not None else F("error"),
+                    )
+                    for c in completed
+                ],
+                ["status", "outputs", "error"],
+            )
+            done = [c.pk for c in completed if c.status == cls.JobStatus.DONE]
+            if done:
+                cls.release_dependents(done)
+            PipelineDBModel.count_finished_jobs_of(
+                [(c.pipeline_id, c.status) for c in completed]
+            )
+        return in_progress
+
+    @classmethod
+    async def abulk_complete(cls, completions: Iterable["Completion"]) -> list[int]:
+        return await run_in_db_thread(cls.bulk_complete, completions)
+
+    @classmethod
+    def save_job_outputs(cls, pk: int, job_outputs: dict):
+        cls.objects.filter(pk=pk).update(outputs=job_outputs)
 
     @classmethod
     async def asave_job_outputs(cls, pk: int, job_outputs: dict):
-        await cls.objects.filter(pk=pk).aupdate(outputs=job_outputs)
+        await run_in_db_thread(cls.save_job_outputs, pk, job_outputs)
 
     @classmethod
     def create_new_in_db(
         cls,
         job,
         previous_job: Optional["JobDBModel"] = None,
+        priority: int = 0,
+        idempotency_key: Optional[str] = None,
+        run_at: Optional[datetime] = None,
     ) -> Self:
-        j = cls.objects.create(
+        j = cls(
             name=type(job).__name__,
             previous_job=previous_job,
             status=cls.JobStatus.NEW,
             inputs=job.inputs_asdict(),
             outputs=job.outputs_asdict(),
+            priority=priority,
+            queue=job.queue,
+            idempotency_key=idempotency_key,
+            run_at=run_at or timezone.now(),
         )
+        if idempotency_key is None:
+            j.save()
+        else:
+            (j,) = cls.insert_or_get_existing([j])
+        notify_new_jobs()
 
         return j
 
@@ -267,36 +755,90 @@ class JobDBModel(models.Model):
         cls,
         job,
         previous_job: Optional["JobDBModel"] = None,
+        priority: int = 0,
+        idempotency_key: Optional[str] = None,
+        run_at: Optional[datetime] = None,
     ) -> Self:
-        j = await cls.objects.acreate(
-            name=type(job).__name__,
-            previous_job=previous_job,
-            status=cls.JobStatus.NEW,
-            inputs=job.inputs_asdict(),
-            outputs=job.outputs_asdict(),
+        return await run_in_db_thread(
+            cls.create_new_in_db,
+            job,
+            previous_job,
+            priority,
+            idempotency_key,
+            run_at,
         )
 
-        return j
-
     @classmethod
     async def abulk_create_new_in_db(
         cls,
         jobs: Iterable["BaseJob"],
-    ) -> "JobDBModel":
+        priority: int = 0,
+        idempotency_keys: Optional[Iterable[Optional[str]]] = None,
+        run_at: Optional[datetime] = None,
+    ) -> list["JobDBModel"]:
+        """
+        `idempotency_keys` are the keys of `jobs` in the same order, `None` for jobs without one.
+        Returns the created job rows, or the existing ones for taken keys.
+        """
+        jobs = list(jobs)
+        if idempotency_keys is None:
+            idempotency_keys = [None] * len(jobs)
+        run_at = run_at or timezone.now()
         to_create = [
             cls(
                 name=type(j).__name__,
                 status=cls.JobStatus.NEW,
                 inputs=j.inputs_asdict(),
                 outputs=j.outputs_asdict(),
+                priority=priority,
+                queue=j.queue,
+                idempotency_key=key,
+                run_at=run_at,
+            )
+            for j, key in zip(jobs, idempotency_keys, strict=True)
+        ]
+        if any(key is not None for key in idempotency_keys):
+            created = await run_in_db_thread(cls.insert_or_get_existing, to_create)
+        else:
+            created = await run_in_db_thread(
+                cls.objects.bulk_create, to_create, batch_size=10_000
             )
+        if notifications_enabled():
+            await run_in_db_thread(notify_new_jobs)
+
+        return created
+
+    @classmethod
+    def insert_or_get_existing(cls, jobs: list[Self]) -> list[Self]:
+        """
+        Inserts the given unsaved job rows with `INSERT ... ON CONFLICT DO NOTHING`, then fetches the rows
+        with their idempotency keys with one more query. Returns the inserted rows, or the existing ones
+        for keys which were taken, in the given order.
+        """
+        keyed = [j for j in jobs if j.idempotency_key is not None]
+        with transaction.atomic():
+            unkeyed = [j for j in jobs if j.idempotency_key is None]
+            if unkeyed:
+                cls.objects.bulk_create(unkeyed, batch_size=10_000)
+            # primary keys aren't returned for ignored conflicts, so all keyed rows are fetched
+            cls.objects.bulk_create(keyed, batch_size=10_000, ignore_conflicts=True)
+            existing = {
+                j.idempotency_key: j
+                for j in cls.objects.filter(
+                    idempotency_key__in={j.idempotency_key for j in keyed}
+                )
+            }
+        return [
+            j if j.idempotency_key is None else existing[j.idempotency_key]
             for j in jobs
         ]
-        await cls.objects.abulk_create(to_create, batch_size=10_000)
 
     @classmethod
     def create_not_ready_in_db(
-        cls, job, previous_job: Optional["JobDBModel"] = None
+        cls,
+        job,
+        previous_job: Optional["JobDBModel"] = None,
+        priority: int = 0,
     ) -> "JobDBModel":
         j = cls.objects.create(
             name=type(job).__name__,
@@ -304,37 +846,339 @@ class JobDBModel(models.Model):
             status=cls.JobStatus.NOT_READY,
             inputs=job.inputs_asdict(),
             outputs=job.outputs_asdict(),
+            priority=priority,
+            queue=job.queue,
         )
 
         return j
 
     @classmethod
-    @sync_to_async
-    def ainit_next_job(
-        cls, current_job: "JobDBModel", next_job_inputs: Optional[dict] = None
-    ) -> bool:
-        # TODO create index for look up by `previous_job`?
-        next_job = (
-            cls.objects.select_for_update()
-            .filter(previous_job=current_job, status=cls.JobStatus.NOT_READY)
-            .first()
+    def complete_job(
+        cls,
+        pk: int,
+        status: str = JobStatus.DONE,
+        outputs: Optional[dict] = None,
+        error: Optional[str] = None,
+        next_jobs_inputs: Optional[list[dict]] = None,
+        pipeline_id: Optional[int] = None,
+    ) -> int:
+        """
+        Writes a finished job's status, outputs and error. For a "done" pipeline job pass
+        `next_jobs_inputs`, then its next job is made "new" in the same transaction, so a crash
+        can't leave a pipeline with both or neither of them running.
+        The next job is the "not ready" job pointing to this job. It gets the first of `next_jobs_inputs`
+        and, for fan-out, is cloned once for each of the rest of them with one `INSERT`.
+        Empty inputs leave the next job's inputs as they are.
+        Jobs depending on this job (see `create_join_in_db`) are counted down in the same transaction too,
+        and so is the job's pipeline if `pipeline_id` is given, see `PipelineDBModel.count_finished_jobs`.
+        A job is completed with one query, a pipeline step with three and a fan-out with five,
+        however many next jobs there are.
+        A job which isn't "in progress" anymore, e.g. completed twice or reclaimed and finished by another
+        job runner, changes nothing, whatever its completion's status.
+        Returns the number of jobs made "new".
+        """
+        finished = cls.objects.filter(pk=pk, status=cls.JobStatus.IN_PROGRESS)
+        fields = {"status": status}
+        if outputs:
+            fields["outputs"] = outputs
+        if error is not None:
+            fields["error"] = error
+        if pipeline_id is None:
+            if status != cls.JobStatus.DONE:
+                finished.update(**fields)
+                return 0
+            if next_jobs_inputs is None and finished.filter(
+                has_dependents=False
+            ).update(**fields):
+                return 0
+
+        with transaction.atomic():
+            made_new = 0
+            # `has_dependents` is read by the `UPDATE`, so a join created while this job ran isn't missed
+            completed = bool(finished.filter(has_dependents=False).update(**fields))
+            if not completed and finished.update(**fields):
+                completed = True
+                if status == cls.JobStatus.DONE:
+                    made_new += cls.release_dependents([pk])
+            if not completed:
+                # e.g. a stale completion of a job which was reclaimed and run again
+                return 0
+            num_cloned = 0
+            if status == cls.JobStatus.DONE and next_jobs_inputs is not None:
+                made_new_next, num_cloned = cls.make_next_jobs_new(pk, next_jobs_inputs)
+                made_new += made_new_next
+            if pipeline_id is not None:
+                PipelineDBModel.count_finished_jobs(
+                    pipeline_id,
+                    num_done=int(status == cls.JobStatus.DONE),
+                    num_failed=int(status == cls.JobStatus.ERROR),
+                    num_added=num_cloned,
+                )
+        return made_new
+
+    @classmethod
+    def make_next_jobs_new(
+        cls, pk: int, next_jobs_inputs: list[dict]
+    ) -> tuple[int, int]:
+        """
+        Makes the next jobs of the pipeline job with the given PK "new", see `complete_job`.
+        Returns the number of jobs made "new" and how many of them were cloned.
+        """
+        # the look up by `previous_job` and "not ready" status uses `async_job_not_ready_next_idx`
+        next_job = {"status": cls.JobStatus.NEW, "date_updated": timezone.now()}
+        if next_jobs_inputs[0]:
+            next_job["inputs"] = next_jobs_inputs[0]
+        to_clone = next_jobs_inputs
+        if cls.objects.filter(
+            previous_job_id=pk, status=cls.JobStatus.NOT_READY
+        ).update(**next_job):
+            to_clone = next_jobs_inputs[1:]
+        if to_clone:
+            # also finds the next job if it was made "new" before, e.g. this job is a clone from an earlier fan-out
+            template = cls.objects.filter(previous_job_id=pk).order_by("pk").first()
+            if not template:
+                return 0, 0  # last job of the pipeline
+            values = {
+                f.attname: getattr(template, f.attname)
+                for f in cls._meta.concrete_fields
+                if not f.primary_key
+            }
+            values["status"] = cls.JobStatus.NEW
+            cls.objects.bulk_create(
+                [
+                    cls(**{**values, "inputs": inputs or template.inputs})
+                    for inputs in to_clone
+                ],
+                batch_size=10_000,
+            )
+        notify_new_jobs()
+        return len(next_jobs_inputs), len(to_clone)
+
+    @classmethod
+    async def acomplete_job(
+        cls,
+        pk: int,
+        status: str = JobStatus.DONE,
+        outputs: Optional[dict] = None,
+        error: Optional[str] = None,
+        next_jobs_inputs: Optional[list[dict]] = None,
+        pipeline_id: Optional[int] = None,
+    ) -> int:
+        return await run_in_db_thread(
+            cls.complete_job, pk, status, outputs, error, next_jobs_inputs, pipeline_id
+        )
+
+    @classmethod
+    def release_dependents(cls, pks: list[int]) -> int:
+        """
+        Counts down `pending_dependencies` of the jobs depending on the just finished jobs with the given PKs,
+        and makes the ones with no pending dependencies left "new".
+        Call it in the transaction marking the jobs "done". Returns the number of jobs made "new".
+        """
+        dependents = JobDependencyDBModel.objects.filter(depends_on__in=pks)
+        finished_dependencies = Subquery(
+            dependents.filter(job=OuterRef("pk"))
+            .order_by()
+            .values("job")
+            .annotate(count=Count("pk"))
+            .values("count")
         )
-        if not next_job:
-            next_job = cls.objects.filter(previous_job=current_job).first()
-            if not next_job:
-                return False
-            next_job.pk = None
-            next_job.status = cls.JobStatus.NEW
-            if next_job_inputs:
-                next_job.inputs = next_job_inputs
-            next_job.save()
-            return True
+        if not cls.objects.filter(pk__in=dependents.values("job")).update(
+            pending_dependencies=F("pending_dependencies") - finished_dependencies
+        ):
+            return 0
+        made_new = cls.objects.filter(
+            pk__in=dependents.values("job"),
+            status=cls.JobStatus.NOT_READY,
+            pending_dependencies=0,
+        ).update(status=cls.JobStatus.NEW, date_updated=timezone.now())
+        if made_new:
+            notify_new_jobs()
+        return made_new
+
+    @classmethod
+    def create_join_in_db(
+        cls, job, previous_jobs_ids: Iterable[int], priority: int = 0
+    ) -> Self:
+        """
+        Creates a job which is "not ready" until all the jobs with the given PKs are done.
+        Each of them counts the join job's `pending_dependencies` down when it's completed, the last one
+        makes the join job "new", so nothing polls for the previous jobs meanwhile.
+        If a previous job fails the join job stays "not ready".
+        """
+        previous_jobs_ids = set(previous_jobs_ids)
         with transaction.atomic():
-            next_job.status = cls.JobStatus.NEW
-            if next_job_inputs:
-                next_job.inputs = next_job_inputs
-            next_job.save()
-            return True
+            # locking the previous jobs makes them wait for the dependencies to be saved before they can
+            # be completed, completed jobs aren't counted down again so they're left out of the count
+            statuses = dict(
+                cls.objects.select_for_update()
+                .filter(pk__in=previous_jobs_ids)
+                .values_list("pk", "status")
+            )
+            missing = previous_jobs_ids - statuses.keys()
+            if missing:
+                raise ValueError(
+                    f"Previous jobs with given IDs do not exist: {sorted(missing)}"
+                )
+            pending = sum(status != cls.JobStatus.DONE for status in statuses.values())
+            j = cls.objects.create(
+                name=type(job).__name__,
+                status=cls.JobStatus.NOT_READY if pending else cls.JobStatus.NEW,
+                inputs=job.inputs_asdict(),
+                outputs=job.outputs_asdict(),
+                priority=priority,
+                queue=job.queue,
+                pending_dependencies=pending,
+            )
+            JobDependencyDBModel.objects.bulk_create(
+                [
+                    JobDependencyDBModel(job=j, depends_on_id=pk)
+                    for pk in previous_jobs_ids
+                ],
+                batch_size=10_000,
+            )
+            cls.objects.filter(pk__in=previous_jobs_ids, has_dependents=False).update(
+                has_dependents=True
+            )
+            if not pending:
+                notify_new_jobs()
+
+        return j
+
+    @classmethod
+    async def acreate_join_in_db(
+        cls, job, previous_jobs_ids: Iterable[int], priority: int = 0
+    ) -> Self:
+        return await run_in_db_thread(
+            cls.create_join_in_db, job, previous_jobs_ids, priority
+        )
+
+    @classmethod
+    def get_dependencies_outputs(cls, pk: int) -> list:
+        """Outputs of the jobs the job with the given PK depends on, in the order they were created."""
+        return list(
+            cls.objects.filter(dependents__job_id=pk)
+            .order_by("pk")
+            .values_list("outputs", flat=True)
+        )
+
+    @classmethod
+    async def aget_dependencies_outputs(cls, pk: int) -> list:
+        return await run_in_db_thread(cls.get_dependencies_outputs, pk)
+
+
+class JobDependencyDBModel(models.Model):
+    """`job` waits for `depends_on` to be done, see `JobDBModel.create_join_in_db`."""
+
+    job = models.ForeignKey(
+        JobDBModel, on_delete=models.CASCADE, related_name="dependencies"
+    )
+    depends_on = models.ForeignKey(
+        JobDBModel, on_delete=models.CASCADE, related_name="dependents"
+    )
+
+    class Meta:
+        db_table = "async_job_dependency"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "depends_on"], name="async_job_dependency_unique"
+            ),
+        ]
+
+
+class JobRateLimitDBModel(models.Model):
+    """
+    Token bucket of a job class setting `max_jobs_per_second`. Claiming a job takes a token, and the bucket
+    refills at `max_jobs_per_second` tokens per second up to one second's worth of tokens, but at least one.
+    The bucket is refilled lazily by `take_tokens`, so there's no background process updating it.
+    Job runners create the buckets of all registered classes when they start, see `create_buckets`.
+    """
+
+    name = models.CharField(max_length=200, unique=True)
+    tokens = models.FloatField()
+    date_refilled = models.DateTimeField()
+
+    class Meta:
+        db_table = "async_job_rate_limit"
+
+    @classmethod
+    def available_tokens(
+        cls, rate_limits: dict[str, float], now: datetime
+    ) -> dict[str, int]:
+        """
+        The whole tokens the buckets of the given job classes, mapped to their `max_jobs_per_second`, have `now`.
+        Reads the buckets with one query without locking them, so it's a hint for which classes are throttled.
+        """
+        if not rate_limits:
+            return {}
+        tokens = {name: int(cls.capacity(rate)) for name, rate in rate_limits.items()}
+        for bucket in cls.objects.filter(name__in=rate_limits):
+            tokens[bucket.name] = int(
+                bucket.refilled_tokens(rate_limits[bucket.name], now)
+            )
+        return tokens
+
+    @staticmethod
+    def capacity(max_jobs_per_second: float) -> float:
+        return max(max_jobs_per_second, 1.0)
+
+    def refilled_tokens(self, max_jobs_per_second: float, now: datetime) -> float:
+        elapsed_seconds = max((now - self.date_refilled).total_seconds(), 0)
+        return min(
+            self.capacity(max_jobs_per_second),
+            self.tokens + elapsed_seconds * max_jobs_per_second,
+        )
+
+    @classmethod
+    def create_buckets(
+        cls, rate_limits: dict[str, float], now: Optional[datetime] = None
+    ):
+        """
+        Creates the full buckets of the given job classes, mapped to their `max_jobs_per_second`,
+        with one `INSERT`. Existing buckets are left as they are.
+        """
+        now = now or timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(name=name, tokens=cls.capacity(rate), date_refilled=now)
+                for name, rate in rate_limits.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    async def acreate_buckets(cls, rate_limits: dict[str, float]):
+        await run_in_db_thread(cls.create_buckets, rate_limits)
+
+    @classmethod
+    def take_tokens(
+        cls, name: str, max_jobs_per_second: float, num_tokens: int, now: datetime
+    ) -> int:
+        """
+        Takes up to `num_tokens` tokens of the bucket of job class `name`, locking only its row.
+        A missing bucket is created first, so it's locked like any other one.
+        Returns how many were taken, zero while the job class is throttled.
+        """
+        with transaction.atomic():
+            bucket = cls.objects.select_for_update().filter(name=name).first()
+            if bucket is None:
+                cls.create_buckets({name: max_jobs_per_second}, now)
+                bucket = cls.objects.select_for_update().get(name=name)
+            tokens = bucket.refilled_tokens(max_jobs_per_second, now)
+            taken = min(int(tokens), num_tokens)
+            bucket.tokens = tokens - taken
+            bucket.date_refilled = max(now, bucket.date_refilled)
+            bucket.save(update_fields=["tokens", "date_refilled"])
+        return taken
+
+    @classmethod
+    def give_back_tokens(cls, name: str, max_jobs_per_second: float, num_tokens: int):
+        """Puts back tokens taken for jobs which weren't claimed after all."""
+        cls.objects.filter(name=name).update(
+            tokens=Least(
+                F("tokens") + num_tokens, Value(cls.capacity(max_jobs_per_second))
+            )
+        )
 
 
 class PipelineJobsDBModel(models.Model):
@@ -366,6 +1210,15 @@ class PipelineDBModel(models.Model):
 
     name = models.TextField(max_length=200)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.NEW)
+    # the status, the counters and the dates are kept current as the pipeline's jobs are claimed
+    # and finish, so checking a pipeline reads only its row
+    num_jobs = models.PositiveIntegerField(default=0)
+    num_done_jobs = models.PositiveIntegerField(default=0)
+    num_failed_jobs = models.PositiveIntegerField(default=0)
+    # when the first job of this pipeline was claimed
+    date_started = models.DateTimeField(null=True)
+    # when the last job of this pipeline was done, or the first one failed
+    date_finished = models.DateTimeField(null=True)
 
     class Meta:
         db_table = "async_pipeline"
@@ -382,25 +1235,75 @@ class PipelineDBModel(models.Model):
 
         return j
 
+    @classmethod
+    def start(cls, pks: Iterable[int]):
+        """Marks the "new" pipelines with the given PKs as started, e.g. because a job of theirs was claimed."""
+        if not pks:
+            return
+        cls.objects.filter(pk__in=pks, status=cls.Status.NEW).update(
+            status=cls.Status.IN_PROGRESS, date_started=timezone.now()
+        )
+
+    @classmethod
+    def count_finished_jobs(
+        cls, pk: int, num_done: int = 0, num_failed: int = 0, num_added: int = 0
+    ):
+        """
+        Counts `num_done` and `num_failed` more finished jobs of the pipeline with the given PK, and
+        `num_added` more jobs (e.g. for fan-out), updating its status and dates with one `UPDATE`.
+        A pipeline is "done" once all its jobs are, and has "failed" once any of them does.
+        """
+        now = Value(timezone.now(), output_field=models.DateTimeField())
+        all_done = Q(
+            num_failed_jobs=0, num_done_jobs__gte=F("num_jobs") + num_added - num_done
+        )
+        if num_failed:
+            status = Value(cls.Status.ERROR)
+            date_finished = Coalesce(F("date_finished"), now)
+        else:
+            status = Case(
+                When(num_failed_jobs__gt=0, then=F("status")),
+                When(all_done, then=Value(cls.Status.DONE)),
+                default=Value(cls.Status.IN_PROGRESS),
+            )
+            date_finished = Case(When(all_done, then=now), default=F("date_finished"))
+        cls.objects.filter(pk=pk).update(
+            num_jobs=F("num_jobs") + num_added,
+            num_done_jobs=F("num_done_jobs") + num_done,
+            num_failed_jobs=F("num_failed_jobs") + num_failed,
+            status=status,
+            date_started=Coalesce(F("date_started"), now),
+            date_finished=date_finished,
+        )
+
+    @classmethod
+    def count_finished_jobs_of(cls, finished_jobs: Iterable[tuple[Optional[int], str]]):
+        """Counts finished jobs given as `(pipeline PK, job status)` pairs with one `UPDATE` per pipeline."""
+        counts: dict[int, list[int]] = {}
+        for pk, status in finished_jobs:
+            if pk is None:
+                continue
+            num_done, num_failed = counts.setdefault(pk, [0, 0])
+            counts[pk] = [
+                num_done + (status == JobDBModel.JobStatus.DONE),
+                num_failed + (status == JobDBModel.JobStatus.ERROR),
+            ]
+        for pk, (num_done, num_failed) in counts.items():
+            cls.count_finished_jobs(pk, num_done=num_done, num_failed=num_failed)
+
     @property
     def is_new(self) -> bool:
         return self.status == PipelineDBModel.Status.NEW
 
     @property
     def is_done(self) -> bool:
-        pipeline_jobs = PipelineJobsDBModel.get_jobs_for_pipeline(self.pk)
-        for pj_status in pipeline_jobs:
-            if pj_status != JobDBModel.JobStatus.DONE:
-                return False
-        return True
+        return self.status == PipelineDBModel.Status.DONE
 
     @property
     def errored(self) -> bool:
-        pipeline_jobs = PipelineJobsDBModel.get_jobs_for_pipeline(self.pk)
-        for pj_status in pipeline_jobs:
-            if pj_status == JobDBModel.JobStatus.ERROR:
-                return True
-        return False
+        return self.status == PipelineDBModel.Status.ERROR
 
     def add_job(self, job: JobDBModel) -> PipelineJobsDBModel:
+        JobDBModel.objects.filter(pk=job.pk).update(pipeline=self)
+        PipelineDBModel.objects.filter(pk=self.pk).update(num_jobs=F("num_jobs") + 1)
         return PipelineJobsDBModel.create(self, job)
@@ -0,0 +1,78 @@
+import asyncio
+
+from django.conf import settings
+from django.db import connection
+
+NEW_JOBS_CHANNEL = "async_job_new"
+
+
+def notifications_enabled() -> bool:
+    """
+    Notifications are opt-in using the `ASYNC_JOB_PIPELINES_NOTIFY` Django setting
+    and only work with Postgres since they're sent with `NOTIFY`.
+    """
+    return connection.vendor == "postgresql" and getattr(
+        settings, "ASYNC_JOB_PIPELINES_NOTIFY", False
+    )
+
+
+def notify_new_jobs():
+    """
+    Lets listening job runners know that there are new jobs to claim.
+    If this is called inside a transaction, the notification is delivered once the transaction commits.
+    """
+    if not notifications_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, '')", [NEW_JOBS_CHANNEL])
+
+
+class NewJobsListener:
+    """
+    Listens to the new jobs channel on a dedicated async `psycopg` connection
+    and sets `new_jobs` whenever a notification arrives.
+    Job runners wait on `new_jobs` instead of polling the database.
+    """
+
+    def __init__(self) -> None:
+        self.new_jobs = asyncio.Event()
+        self._connection = None
+
+    async def connect(self):
+        if connection.vendor != "postgresql":
+            raise ValueError("Listening for new jobs is only supported with Postgres!")
+
+        import psycopg
+
+        conn_params = connection.get_connection_params()
+        # these are meant for Django's sync connections
+        conn_params.pop("cursor_factory", None)
+        conn_params.pop("context", None)
+        self._connection = await psycopg.AsyncConnection.connect(
+            autocommit=True, **conn_params
+        )
+        await self._connection.execute(f"LISTEN {NEW_JOBS_CHANNEL}")
+
+    async def listen(self):
+        assert self._connection
+        async for _ in self._connection.notifies():
+            self.new_jobs.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Waits until a notification arrives or `timeout` seconds pass.
+        Returns `True` if a notification arrived.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                await self.new_jobs.wait()
+        except TimeoutError:
+            return False
+        finally:
+            self.new_jobs.clear()
+        return True
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
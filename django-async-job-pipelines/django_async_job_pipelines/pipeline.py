@@ -1,18 +1,56 @@
+from graphlib import CycleError, TopologicalSorter
 from typing import Optional
 
+from .db import run_in_db_thread
 from .job import acreate_new
-from .jobs import StartPipeline
+from .jobs import StartPipeline, trigger_pipelines
 from .registry import pipeline_registery
 
 
 class BasePipeline:
+    """
+    `jobs` run one after the other, each one's `next_job_inputs` being the next one's inputs.
+    Setting `dependencies` turns the pipeline into a DAG: it maps a job class to the job classes it waits for,
+    e.g. `{Merge: [ParseA, ParseB], ParseA: [Fetch], ParseB: [Fetch]}`. Each job runs once all
+    the jobs it waits for are done, jobs which don't wait for each other run in parallel.
+    Every job of a DAG taking inputs gets the pipeline's inputs, see `JobDBModel.aget_dependencies_outputs`
+    for reading the outputs of the jobs it waited for.
+    """
+
     jobs: list = []
+    dependencies: dict = {}
 
     def __init__(self, inputs=None) -> None:
         self.inputs = inputs
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not cls.dependencies:
+            return
+        if len(set(cls.jobs)) != len(cls.jobs):
+            raise TypeError(
+                f"Jobs of pipeline `{cls.__name__}` must be different classes to declare their dependencies!"
+            )
+        for job_klass, depends_on in cls.dependencies.items():
+            for klass in [job_klass, *depends_on]:
+                if klass not in cls.jobs:
+                    raise TypeError(
+                        f"`{klass.__name__}` is in the dependencies of pipeline `{cls.__name__}`, but not in its jobs!"
+                    )
+        try:
+            tuple(TopologicalSorter(cls.dependencies).static_order())
+        except CycleError as e:
+            raise TypeError(
+                f"Dependencies of pipeline `{cls.__name__}` have a cycle: {e.args[1]}"
+            )
+
     @classmethod
-    async def trigger(cls, inputs=None):
+    def is_dag(cls) -> bool:
+        return bool(cls.dependencies)
+
+    @classmethod
+    def check_inputs(cls, inputs=None):
+        """The first job, or the jobs of a DAG, take the inputs given to `trigger`."""
         if cls.__name__ not in pipeline_registery.pipeline_class_to_name_map:
             raise ValueError(
                 f"Pipeline class {cls.__name__} is not a registered pipeline probably because it is not defined in any `pipelines.py` module of a registerefd Django app."
@@ -20,6 +58,18 @@ class BasePipeline:
         if len(cls.jobs) == 0:
             raise ValueError("Pipeline has not jobs defined int it!")
 
+        if cls.is_dag():
+            takes_inputs = [j for j in cls.jobs if hasattr(j, "Inputs")]
+            if takes_inputs and not inputs:
+                raise ValueError(
+                    f"Jobs of the pipeline ({takes_inputs}) take `inputs`, but no `inputs` were given to `trigger`."
+                )
+            if not takes_inputs and inputs:
+                raise ValueError(
+                    "`inputs` were passed to `trigger`, but no job of the pipeline takes any `inputs`."
+                )
+            return
+
         first_job = cls.jobs[0]
         if hasattr(first_job, "Inputs"):
             if not inputs:
@@ -32,10 +82,34 @@ class BasePipeline:
                     f"`inputs` were passed to `trigger`, but the first job ({type(first_job)}) does not take any `inputs`."
                 )
 
+    @classmethod
+    async def trigger(cls, inputs=None, priority: int = 0):
+        """
+        All jobs of this pipeline run are created with the given `priority`.
+        Jobs with lower priority values are run first.
+        """
+        cls.check_inputs(inputs)
+
         return await acreate_new(
             StartPipeline(
                 inputs=StartPipeline.Inputs(
                     pipeline_name=cls.__name__, first_job_inputs=inputs
                 )
-            )
+            ),
+            priority=priority,
+        )
+
+    @classmethod
+    async def atrigger_many(cls, list_of_inputs: list, priority: int = 0) -> list:
+        """
+        Triggers a run of this pipeline for each of `list_of_inputs`, e.g. `[None] * 10` for a pipeline
+        not taking inputs. All pipeline, job and pipeline job rows are created right away
+        with a few bulk `INSERT`s, instead of a `StartPipeline` job creating them one by one for each run.
+        Returns the pipeline rows.
+        """
+        for inputs in list_of_inputs:
+            cls.check_inputs(inputs)
+
+        return await run_in_db_thread(
+            trigger_pipelines, cls, list_of_inputs, priority=priority
         )
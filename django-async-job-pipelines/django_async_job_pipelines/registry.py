@@ -1,11 +1,38 @@
 from dataclasses import dataclass, field
+from importlib import import_module
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class RegisteredJob:
+    """
+    A job class resolved once at startup, so running a job doesn't import anything.
+    `inputs_class` and `outputs_class` are `None` if the job class doesn't define them.
+    """
+
+    klass: type
+    inputs_class: Optional[type]
+    outputs_class: Optional[type]
+
+    @classmethod
+    def from_class(cls, klass: type) -> "RegisteredJob":
+        return cls(
+            klass=klass,
+            inputs_class=getattr(klass, "Inputs", None),
+            outputs_class=getattr(klass, "Outputs", None),
+        )
 
 
 @dataclass
 class JobRegistery:
     job_class_to_name_map: dict[str, str] = field(default_factory=dict)
+    registered_jobs: dict[str, RegisteredJob] = field(default_factory=dict)
+    # the `max_concurrency` of the job classes setting it
+    concurrency_limits: dict[str, int] = field(default_factory=dict)
+    # the `max_jobs_per_second` of the job classes setting it
+    rate_limits: dict[str, float] = field(default_factory=dict)
 
-    def add(self, class_name: str, app_name: str):
+    def add(self, class_name: str, app_name: str, klass: Optional[type] = None):
         if class_name in self.job_class_to_name_map:
             help = "Job class names must be unique!"
             previous = f"{self.job_class_to_name_map[class_name]}.{class_name}"
@@ -13,11 +40,47 @@ class JobRegistery:
                 f"`{class_name}` seems to be duplicated. It was already added by `{previous}`. {help}"
             )
 
+        max_concurrency = getattr(klass, "max_concurrency", None)
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(
+                f"`max_concurrency` of `{class_name}` must be at least one!"
+            )
+
+        max_jobs_per_second = getattr(klass, "max_jobs_per_second", None)
+        if max_jobs_per_second is not None and max_jobs_per_second <= 0:
+            raise ValueError(
+                f"`max_jobs_per_second` of `{class_name}` must be greater than zero!"
+            )
+
         self.job_class_to_name_map[class_name] = app_name
+        if klass is not None:
+            self.registered_jobs[class_name] = RegisteredJob.from_class(klass)
+        if max_concurrency is not None:
+            self.concurrency_limits[class_name] = max_concurrency
+        if max_jobs_per_second is not None:
+            self.rate_limits[class_name] = max_jobs_per_second
+
+    @property
+    def limited_job_names(self) -> list[str]:
+        """Names of the job classes setting `max_concurrency` and/or `max_jobs_per_second`."""
+        return sorted(self.concurrency_limits.keys() | self.rate_limits.keys())
 
     def get_import_path_for_class_name(self, class_name: str) -> str:
         return f"{self.job_class_to_name_map[class_name]}.jobs"
 
+    def get(self, class_name: str) -> RegisteredJob:
+        """
+        Returns the job class named `class_name` with its inputs and outputs classes.
+        Jobs added without a class are imported the first time they're needed.
+        """
+        try:
+            return self.registered_jobs[class_name]
+        except KeyError:
+            module = import_module(self.get_import_path_for_class_name(class_name))
+            registered = RegisteredJob.from_class(getattr(module, class_name))
+            self.registered_jobs[class_name] = registered
+            return registered
+
 
 job_registery = JobRegistery()
 
@@ -25,8 +88,9 @@ job_registery = JobRegistery()
 @dataclass
 class PipelineRegistery:
     pipeline_class_to_name_map: dict[str, str] = field(default_factory=dict)
+    pipeline_classes: dict[str, type] = field(default_factory=dict)
 
-    def add(self, class_name: str, app_name: str):
+    def add(self, class_name: str, app_name: str, klass: Optional[type] = None):
         if class_name in self.pipeline_class_to_name_map:
             help = "Job class names must be unique!"
             previous = f"{self.pipeline_class_to_name_map[class_name]}.{class_name}"
@@ -35,9 +99,23 @@ class PipelineRegistery:
             )
 
         self.pipeline_class_to_name_map[class_name] = app_name
+        if klass is not None:
+            self.pipeline_classes[class_name] = klass
 
     def get_import_path_for_class_name(self, class_name: str) -> str:
         return f"{self.pipeline_class_to_name_map[class_name]}.pipelines"
 
+    def get(self, class_name: str) -> type:
+        """
+        Returns the pipeline class named `class_name`.
+        Pipelines added without a class are imported the first time they're needed.
+        """
+        try:
+            return self.pipeline_classes[class_name]
+        except KeyError:
+            module = import_module(self.get_import_path_for_class_name(class_name))
+            self.pipeline_classes[class_name] = getattr(module, class_name)
+            return self.pipeline_classes[class_name]
+
 
 pipeline_registery = PipelineRegistery()
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+from django.utils import timezone
+
+from django_async_job_pipelines.job import BaseJob, abulk_create_new
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.registry import job_registery
+
+_logger = logging.getLogger(__name__)
+
+
+def periodic_jobs() -> list[type[BaseJob]]:
+    """The registered job classes setting `run_every`."""
+    return [
+        registered.klass
+        for registered in job_registery.registered_jobs.values()
+        if registered.klass.run_every is not None
+    ]
+
+
+def tick_of(run_every: timedelta, now: datetime) -> datetime:
+    """
+    The start of the `run_every` long interval `now` is in, intervals being counted from the Unix epoch,
+    so all schedulers agree on the ticks of a job whenever they were started.
+    """
+    seconds = run_every.total_seconds()
+    return datetime.fromtimestamp(now.timestamp() // seconds * seconds, tz=UTC)
+
+
+def idempotency_key(job_klass: type[BaseJob], tick: datetime) -> str:
+    return f"{job_klass.__name__}:{tick.isoformat()}"
+
+
+@dataclass
+class Scheduler:
+    """
+    Creates a job of each of `jobs` once per its `run_every`, by default for all registered job classes setting it.
+    Each job is created with an idempotency key made of its name and tick, so any number of
+    schedulers can run at the same time without creating a job twice. Ticks missed while
+    no scheduler was running are skipped, only the current tick's job is created.
+    """
+
+    jobs: list[type[BaseJob]] = field(default_factory=periodic_jobs)
+    timeout_seconds: float = 0
+
+    def __post_init__(self):
+        for job_klass in self.jobs:
+            if job_klass.run_every is None or job_klass.run_every <= timedelta(0):
+                raise ValueError(
+                    f"`run_every` of periodic job `{job_klass.__name__}` must be a positive `timedelta`!"
+                )
+
+    def due_jobs(self, now: datetime) -> tuple[list[BaseJob], list[str]]:
+        """An instance of each periodic job and its idempotency key for the tick `now` is in."""
+        jobs, keys = [], []
+        for job_klass in self.jobs:
+            assert job_klass.run_every
+            inputs = job_klass.Inputs() if hasattr(job_klass, "Inputs") else None
+            jobs.append(job_klass(inputs=inputs))
+            keys.append(idempotency_key(job_klass, tick_of(job_klass.run_every, now)))
+        return jobs, keys
+
+    def seconds_until_next_tick(self, now: datetime) -> float:
+        return min(
+            (tick_of(j.run_every, now) + j.run_every - now).total_seconds()
+            for j in self.jobs
+            if j.run_every
+        )
+
+    async def schedule(self, now: Optional[datetime] = None) -> list[JobDBModel]:
+        """Creates the jobs of the tick `now` is in with one bulk `INSERT`, if no scheduler has created them yet."""
+        jobs, keys = self.due_jobs(now or timezone.now())
+        return await abulk_create_new(jobs, idempotency_keys=keys)
+
+    async def run(self):
+        if not self.jobs:
+            _logger.info("There are no periodic jobs to schedule")
+            return
+        if not self.timeout_seconds:
+            await self.schedule_forever()
+            return
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                await self.schedule_forever()
+        except TimeoutError:
+            return
+
+    async def schedule_forever(self):
+        while True:
+            await self.schedule()
+            await asyncio.sleep(self.seconds_until_next_tick(timezone.now()))
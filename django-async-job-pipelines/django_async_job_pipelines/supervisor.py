@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import signal
+import time
+from dataclasses import dataclass, field
+from multiprocessing.process import BaseProcess
+from multiprocessing.sharedctypes import Synchronized
+from typing import Callable
+
+from django.db import connections
+
+from django_async_job_pipelines.job_runner import Runner
+
+
+def run_runner_process(runner_kwargs: dict, jobs_processed: Synchronized):
+    """
+    Runs a job runner in a child process of the supervisor.
+    The number of jobs processed so far is published in `jobs_processed`, so the supervisor can report throughput.
+    """
+    # the supervisor handles Ctrl-C and forwards SIGTERM, which makes the job runner drain its queue
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    asyncio.run(_run_runner(runner_kwargs, jobs_processed))
+
+
+async def _run_runner(runner_kwargs: dict, jobs_processed: Synchronized):
+    runner = Runner(drain_on_sigterm=True, **runner_kwargs)
+
+    async def publish_jobs_processed():
+        while True:
+            jobs_processed.value = runner.total_jobs_processed
+            await asyncio.sleep(1)
+
+    task = asyncio.create_task(publish_jobs_processed())
+    try:
+        await runner.run()
+    finally:
+        task.cancel()
+        jobs_processed.value = runner.total_jobs_processed
+
+
+@dataclass
+class Supervisor:
+    """
+    Forks `num_processes` job runner processes and restarts the ones which crash.
+    SIGTERM (or Ctrl-C) is forwarded to the job runners as SIGTERM, so they stop claiming jobs,
+    finish the ones they've claimed and exit. Aggregate throughput is reported every
+    `report_interval_seconds`.
+    `runner_kwargs` are passed to each job runner's `Runner`.
+    """
+
+    num_processes: int
+    runner_kwargs: dict = field(default_factory=dict)
+    report_interval_seconds: float = 10.0
+    check_interval_seconds: float = 0.5
+    target: Callable[[dict, Synchronized], None] = run_runner_process
+    report: Callable[[str], None] = print
+    processes: dict[int, tuple[BaseProcess, Synchronized]] = field(default_factory=dict)
+    finished_jobs_processed: int = 0
+    num_restarts: int = 0
+    stopping: bool = False
+
+    def __post_init__(self):
+        self.context = multiprocessing.get_context("fork")
+
+    @property
+    def total_jobs_processed(self) -> int:
+        return self.finished_jobs_processed + sum(
+            jobs_processed.value for _, jobs_processed in self.processes.values()
+        )
+
+    def start_process(self, index: int):
+        jobs_processed = self.context.Value("q", 0)
+        process = self.context.Process(
+            target=self.target,
+            args=(self.runner_kwargs, jobs_processed),
+            name=f"job-runner-{index}",
+        )
+        process.start()
+        self.processes[index] = (process, jobs_processed)
+
+    def check_processes(self):
+        """Collects exited job runner processes and restarts the ones which crashed."""
+        for index, (process, jobs_processed) in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            self.finished_jobs_processed += jobs_processed.value
+            del self.processes[index]
+            if process.exitcode != 0 and not self.stopping:
+                self.report(
+                    f"Job runner process {process.pid} exited with code {process.exitcode}, restarting it."
+                )
+                self.num_restarts += 1
+                self.start_process(index)
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for process, _ in self.processes.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM
+
+    def report_throughput(self, started_at: float):
+        elapsed = time.monotonic() - started_at
+        total = self.total_jobs_processed
+        rate = total / elapsed if elapsed else 0.0
+        self.report(
+            f"Processed {total} jobs in {elapsed:.1f}s ({rate:.1f} jobs/s) using {self.num_processes} processes, {self.num_restarts} restarts."
+        )
+
+    def run(self):
+        if self.num_processes < 1:
+            raise ValueError("Number of processes cannot be smaller than one!")
+
+        # forked job runners must open their own db connections
+        connections.close_all()
+        previous_handlers = {
+            sig: signal.signal(sig, self.stop)
+            for sig in (signal.SIGTERM, signal.SIGINT)
+        }
+        started_at = time.monotonic()
+        last_reported_at = started_at
+        try:
+            for index in range(self.num_processes):
+                self.start_process(index)
+            while self.processes:
+                time.sleep(self.check_interval_seconds)
+                self.check_processes()
+                if time.monotonic() - last_reported_at >= self.report_interval_seconds:
+                    self.report_throughput(started_at)
+                    last_reported_at = time.monotonic()
+        finally:
+            self.stop()  # no-op unless the supervisor itself failed
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+        self.report_throughput(started_at)
@@ -1,8 +1,16 @@
+import os
+import threading
 import time
 from dataclasses import dataclass
+from datetime import timedelta
 
 from django.core.handlers.asgi import asyncio
-from django_async_job_pipelines.job import BaseJob, abulk_create_new
+from django_async_job_pipelines.job import (
+    BaseJob,
+    Execution,
+    SyncBaseJob,
+    abulk_create_new,
+)
 from django_async_job_pipelines.models import JobDBModel
 
 
@@ -19,6 +27,50 @@ class JobMissingRunMethod(BaseJob):
     pass
 
 
+class JobInGPUQueue(BaseTestJob):
+    queue = "gpu"
+
+
+class JobRunInThread(BaseJob):
+    execution = Execution.THREAD
+
+    @dataclass
+    class Outputs:
+        thread_name: str
+
+    async def run(self):
+        self.outputs = self.Outputs(thread_name=threading.current_thread().name)
+
+
+class BlockingJob(SyncBaseJob):
+    @dataclass
+    class Outputs:
+        thread_name: str
+
+    def run(self):
+        time.sleep(0.2)
+        self.outputs = self.Outputs(thread_name=threading.current_thread().name)
+
+
+class CPUBoundJob(BaseJob):
+    execution = Execution.PROCESS
+
+    @dataclass
+    class Inputs:
+        n: int
+
+    @dataclass
+    class Outputs:
+        total: int
+        pid: int
+
+    async def run(self):
+        self.outputs = self.Outputs(
+            total=sum(i * i for i in range(self.inputs.n)), pid=os.getpid()
+        )
+        self.next_job_inputs = self.Inputs(n=self.inputs.n + 1)
+
+
 class JobWithSleep(BaseTestJob):
     async def run(self):
         await asyncio.sleep(0.1)
@@ -230,3 +282,84 @@ class JobWithInputsForMultipleNextJobs(BaseJob):
 
         def asdict(self):
             return {"id": self.id}
+
+
+class AddToPreviousJobsOutputs(BaseJob):
+    """Outputs the sum of the totals of the jobs it waited for in a DAG pipeline, plus `add`."""
+
+    add: int = 0
+
+    @dataclass
+    class Outputs:
+        total: int
+
+    async def run(self):
+        assert self.db_model
+        outputs = await JobDBModel.aget_dependencies_outputs(self.db_model.pk)
+        self.outputs = self.Outputs(total=sum(o["total"] for o in outputs) + self.add)
+
+
+class DAGRoot(AddToPreviousJobsOutputs):
+    add = 1
+
+
+class DAGLeftBranch(AddToPreviousJobsOutputs):
+    add = 10
+
+
+class DAGRightBranch(AddToPreviousJobsOutputs):
+    add = 100
+
+
+class DAGMerge(AddToPreviousJobsOutputs):
+    add = 1000
+
+
+class PeriodicJob(BaseJob):
+    run_every = timedelta(minutes=1)
+
+    async def run(self):
+        pass
+
+
+class JobSucceedingOnThirdAttempt(BaseJob):
+    max_retries = 2
+    retry_backoff_seconds = 0.1
+    retry_backoff_jitter = 0
+
+    async def run(self):
+        assert self.db_model
+        if self.db_model.attempts < 3:
+            raise RuntimeError(f"Attempt {self.db_model.attempts} failed")
+
+
+class JobFailingWithRetries(BaseJob):
+    max_retries = 1
+    retry_backoff_seconds = 0.1
+    retry_backoff_jitter = 0
+
+    async def run(self):
+        raise RuntimeError("Always fails")
+
+
+class JobWithConcurrencyLimit(BaseJob):
+    max_concurrency = 2
+    num_running = 0
+    max_num_running = 0
+
+    async def run(self):
+        cls = type(self)
+        cls.num_running += 1
+        cls.max_num_running = max(cls.max_num_running, cls.num_running)
+        await asyncio.sleep(0.2)
+        cls.num_running -= 1
+
+
+class RateLimitedJob(BaseJob):
+    """Stands in for a job calling a service with a quota, recording when each call was made."""
+
+    max_jobs_per_second = 5
+    call_times: list[float] = []
+
+    async def run(self):
+        type(self).call_times.append(time.monotonic())
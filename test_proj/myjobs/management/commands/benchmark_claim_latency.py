@@ -0,0 +1,108 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from django_async_job_pipelines.models import JobDBModel
+
+
+class Command(BaseCommand):
+    help = "Measures how long claiming a job takes as the number of `done` jobs in the table grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--done_rows",
+            default="10000,100000,1000000,10000000",
+            type=str,
+            help="Comma separated totals of `done` rows to measure claim latency at",
+        )
+        parser.add_argument(
+            "--new_rows",
+            default=1000,
+            type=int,
+        )
+        parser.add_argument(
+            "--claims",
+            default=200,
+            type=int,
+        )
+
+    def insert_done_rows(self, num_rows: int):
+        if connection.vendor == "postgresql":
+            # copy a template row server side, it's much faster than sending millions of rows
+            template = JobDBModel.objects.create(
+                name="JobForTests",
+                status=JobDBModel.JobStatus.DONE,
+                inputs={},
+                outputs={},
+            )
+            columns = ", ".join(
+                connection.ops.quote_name(f.column)
+                for f in JobDBModel._meta.concrete_fields
+                if not f.primary_key
+            )
+            table = connection.ops.quote_name(JobDBModel._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} "
+                    f"FROM {table}, generate_series(1, %s) WHERE id = %s",
+                    [num_rows - 1, template.pk],
+                )
+            return
+
+        batch_size = 10_000
+        inserted = 0
+        while inserted < num_rows:
+            to_insert = min(batch_size, num_rows - inserted)
+            JobDBModel.objects.bulk_create(
+                [
+                    JobDBModel(
+                        name="JobForTests",
+                        status=JobDBModel.JobStatus.DONE,
+                        inputs={},
+                        outputs={},
+                    )
+                    for _ in range(to_insert)
+                ]
+            )
+            inserted += to_insert
+
+    def measure_claims(self, num_claims: int) -> list[float]:
+        durations = []
+        claimed = []
+        for _ in range(num_claims):
+            start = time.perf_counter()
+            claimed.extend(JobDBModel.claim_jobs_for_processing(1))
+            durations.append(time.perf_counter() - start)
+        # put the claimed jobs back, so every measurement claims from the same number of new jobs
+        JobDBModel.objects.filter(pk__in=claimed).update(
+            status=JobDBModel.JobStatus.NEW, date_updated=timezone.now()
+        )
+        return durations
+
+    def handle(self, *args, **kwargs):
+        JobDBModel.objects.all().delete()
+        JobDBModel.objects.bulk_create(
+            [
+                JobDBModel(name="JobForTests", status=JobDBModel.JobStatus.NEW)
+                for _ in range(kwargs["new_rows"])
+            ]
+        )
+
+        done_rows = 0
+        for target in [int(n) for n in kwargs["done_rows"].split(",")]:
+            self.insert_done_rows(target - done_rows)
+            done_rows = target
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {JobDBModel._meta.db_table}")
+
+            durations = self.measure_claims(kwargs["claims"])
+            durations_ms = sorted(d * 1000 for d in durations)
+            p95 = durations_ms[int(len(durations_ms) * 0.95) - 1]
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{done_rows} done rows: median claim {statistics.median(durations_ms):.3f}ms, p95 {p95:.3f}ms"
+                )
+            )
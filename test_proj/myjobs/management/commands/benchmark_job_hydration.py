@@ -0,0 +1,76 @@
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.registry import job_registery
+
+
+def hydrate_by_importing(job: JobDBModel):
+    """How jobs were turned into job class instances before the registry kept the classes."""
+    module = import_module(job_registery.get_import_path_for_class_name(job.name))
+    klass = getattr(module, job.name)
+    inputs = klass.Inputs(**job.inputs) if hasattr(klass, "Inputs") else None
+    if hasattr(klass, "Outputs") and job.outputs:
+        outputs = klass.Outputs(**job.outputs)
+    else:
+        outputs = None
+    return klass.create(inputs=inputs, outputs=outputs, status=job.status, db_model=job)
+
+
+def hydrate_from_registry(job: JobDBModel):
+    """What `JobDBModel.aget_by_id` does once the row is fetched."""
+    registered = job_registery.get(job.name)
+    if registered.inputs_class is not None:
+        inputs = registered.inputs_class(**job.inputs)
+    else:
+        inputs = None
+    if registered.outputs_class is not None and job.outputs:
+        outputs = registered.outputs_class(**job.outputs)
+    else:
+        outputs = None
+    return registered.klass.create(
+        inputs=inputs,
+        outputs=outputs,
+        status=job.status,
+        db_model=job,
+        check_inputs=False,
+    )
+
+
+class Command(BaseCommand):
+    help = "Measures the per job overhead of turning a job row into a job class instance, without any db queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--jobs",
+            default=100_000,
+            type=int,
+        )
+
+    def measure(self, hydrate, jobs: list[JobDBModel]) -> float:
+        start = time.perf_counter()
+        for job in jobs:
+            hydrate(job)
+        return (time.perf_counter() - start) / len(jobs)
+
+    def handle(self, *args, **kwargs):
+        # rows aren't saved, only the python side of fetching a job is measured
+        jobs = [
+            JobDBModel(
+                name="JobWithInputsAndOutputs",
+                status=JobDBModel.JobStatus.NEW,
+                inputs={"id": i},
+                outputs={"id": i},
+            )
+            for i in range(kwargs["jobs"])
+        ]
+
+        for label, hydrate in [
+            ("import_module + getattr + hasattr", hydrate_by_importing),
+            ("registry lookup", hydrate_from_registry),
+        ]:
+            per_job = self.measure(hydrate, jobs)
+            self.stdout.write(
+                self.style.SUCCESS(f"{label}: {per_job * 1_000_000:.2f}us per job")
+            )
@@ -0,0 +1,63 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django_async_job_pipelines.models import JobDBModel, PipelineDBModel
+
+from myjobs.jobs import JobWithInputs
+from myjobs.pipelines import MultipleJobsPipeline
+
+
+async def trigger_one_by_one(list_of_inputs: list):
+    """What triggering pipelines takes without `atrigger_many`: a `trigger` call and a `StartPipeline` run each."""
+    for inputs in list_of_inputs:
+        start_job = await MultipleJobsPipeline.trigger(inputs)
+        job = await JobDBModel.aget_by_id(start_job.pk)
+        await job.run()
+
+
+async def trigger_many(list_of_inputs: list):
+    await MultipleJobsPipeline.atrigger_many(list_of_inputs)
+
+
+class Command(BaseCommand):
+    help = "Measures how long creating the rows of many pipeline runs takes, one by one and with `atrigger_many`. The created rows are deleted afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pipelines",
+            default=10_000,
+            type=int,
+        )
+
+    def measure(self, trigger, list_of_inputs: list) -> float:
+        last_job = JobDBModel.objects.order_by("-pk").values_list("pk", flat=True)
+        last_pipeline = PipelineDBModel.objects.order_by("-pk").values_list(
+            "pk", flat=True
+        )
+        last_job_pk, last_pipeline_pk = (
+            last_job.first() or 0,
+            last_pipeline.first() or 0,
+        )
+        start = time.perf_counter()
+        async_to_sync(trigger)(list_of_inputs)
+        duration = time.perf_counter() - start
+        PipelineDBModel.objects.filter(pk__gt=last_pipeline_pk).delete()
+        JobDBModel.objects.filter(pk__gt=last_job_pk).delete()
+        return duration
+
+    def handle(self, *args, **kwargs):
+        num_pipelines = kwargs["pipelines"]
+        list_of_inputs = [JobWithInputs.Inputs(id=i) for i in range(num_pipelines)]
+
+        for label, trigger in [
+            ("trigger + StartPipeline per pipeline", trigger_one_by_one),
+            ("atrigger_many", trigger_many),
+        ]:
+            duration = self.measure(trigger, list_of_inputs)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{label}: {num_pipelines} pipelines of {len(MultipleJobsPipeline.jobs)} jobs in {duration:.2f}s "
+                    f"({num_pipelines / duration:.0f} pipelines/s)"
+                )
+            )
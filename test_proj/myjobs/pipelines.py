@@ -3,6 +3,10 @@ from django_async_job_pipelines.pipeline import BasePipeline
 from .jobs import (
     AssertPipelieWorkedProperly,
     CreateJobs,
+    DAGLeftBranch,
+    DAGMerge,
+    DAGRightBranch,
+    DAGRoot,
     DeleteExistingJobs,
     JobForTests,
     JobWithInputs,
@@ -55,3 +59,17 @@ class TestPipelineWith10KJobs(BasePipeline):
 
 class PipelineWithOneJobProducingInputsForMultipleNextJobs(BasePipeline):
     jobs = [JobWithInputsForMultipleNextJobs, JobWithInputs]
+
+
+class DiamondPipeline(BasePipeline):
+    jobs = [DAGRoot, DAGLeftBranch, DAGRightBranch, DAGMerge]
+    dependencies = {
+        DAGLeftBranch: [DAGRoot],
+        DAGRightBranch: [DAGRoot],
+        DAGMerge: [DAGLeftBranch, DAGRightBranch],
+    }
+
+
+class DAGPipelineWithInputs(BasePipeline):
+    jobs = [JobWithInputs, DAGRoot, DAGMerge]
+    dependencies = {DAGMerge: [JobWithInputs, DAGRoot]}
@@ -1,6 +1,8 @@
+from typing import Callable
+
 import pytest
 from asgiref.sync import async_to_sync
-from django_async_job_pipelines.job import acreate_new
+from django_async_job_pipelines.job import BaseJob, abulk_create_new, acreate_new
 from django_async_job_pipelines.models import JobDBModel
 
 from myjobs.jobs import (
@@ -52,3 +54,13 @@ def job_producing_outputs(db) -> JobDBModel:
 def job_without_outputs_class(db) -> JobDBModel:
     job = JobWithoutOutputClass(inputs=JobWithoutOutputClass.Inputs(id=1))
     return async_to_sync(acreate_new)(job)
+
+
+@pytest.fixture
+def create_jobs(db) -> Callable[..., list[int]]:
+    """Creates the given jobs with one query, returns their PKs."""
+
+    def create(*jobs: BaseJob) -> list[int]:
+        return [j.pk for j in async_to_sync(abulk_create_new)(list(jobs))]
+
+    return create
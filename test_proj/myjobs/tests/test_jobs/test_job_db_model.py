@@ -1,7 +1,10 @@
 import asyncio
+from unittest.mock import patch
 
 import pytest
 from asgiref.sync import async_to_sync
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
 from django_async_job_pipelines.models import JobDBModel
 
 
@@ -77,3 +80,109 @@ class TestUpdateNewJobToInProgress:
             job_in_progress.pk
         )
         assert res == 0
+
+
+class TestCompletingJobs:
+    def test_done_job_is_written_with_one_query(self, job_in_progress):
+        with CaptureQueriesContext(connection) as queries:
+            JobDBModel.complete_job(job_in_progress.pk, outputs={"id": 1})
+
+        assert len(queries) == 1
+        job = JobDBModel.get(job_in_progress.pk)
+        assert job.is_done
+        assert job.outputs == {"id": 1}
+
+    def test_only_jobs_in_progress_are_marked_done(self, new_job):
+        JobDBModel.complete_job(new_job.pk)
+
+        assert JobDBModel.get(new_job.pk).is_new
+
+    def test_only_jobs_in_progress_are_marked_failed(self, new_job):
+        JobDBModel.complete_job(new_job.pk, status=JobDBModel.JobStatus.ERROR)
+
+        assert JobDBModel.get(new_job.pk).is_new
+
+    def test_failed_job_is_written_with_one_query(self, job_in_progress):
+        with CaptureQueriesContext(connection) as queries:
+            JobDBModel.complete_job(
+                job_in_progress.pk,
+                status=JobDBModel.JobStatus.ERROR,
+                outputs={"id": 1},
+                error="Traceback",
+            )
+
+        assert len(queries) == 1
+        job = JobDBModel.get(job_in_progress.pk)
+        assert job.errored
+        assert job.error == "Traceback"
+        assert job.outputs == {"id": 1}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCompletingPipelineJobs:
+    def make_pipeline_step(self) -> tuple[JobDBModel, JobDBModel]:
+        job = JobDBModel.objects.create(
+            name="JobWithInputsAndOutputs",
+            status=JobDBModel.JobStatus.IN_PROGRESS,
+            inputs={"id": 1},
+        )
+        next_job = JobDBModel.objects.create(
+            name="JobWithInputs",
+            previous_job=job,
+            status=JobDBModel.JobStatus.NOT_READY,
+            inputs={"id": 0},
+        )
+        return job, next_job
+
+    def test_done_and_next_job_are_written_with_two_queries(self):
+        job, next_job = self.make_pipeline_step()
+
+        with CaptureQueriesContext(connection) as queries:
+            made_new = JobDBModel.complete_job(
+                job.pk, outputs={"id": 1}, next_jobs_inputs=[{"id": 2}]
+            )
+
+        assert made_new == 1
+        statements = [
+            q["sql"]
+            for q in queries.captured_queries
+            if q["sql"] not in ("BEGIN", "COMMIT")  # logged by SQLite
+        ]
+        assert len(statements) == 2
+        assert JobDBModel.get(job.pk).is_done
+        next_job = JobDBModel.get(next_job.pk)
+        assert next_job.is_new
+        assert next_job.inputs == {"id": 2}
+
+    def test_empty_inputs_keep_next_job_inputs(self):
+        job, next_job = self.make_pipeline_step()
+
+        JobDBModel.complete_job(job.pk, next_jobs_inputs=[{}])
+
+        assert JobDBModel.get(next_job.pk).inputs == {"id": 0}
+
+    def test_nothing_is_written_if_the_transaction_fails(self):
+        job, next_job = self.make_pipeline_step()
+
+        with patch(
+            "django_async_job_pipelines.models.notify_new_jobs",
+            side_effect=DatabaseError,
+        ):
+            with pytest.raises(DatabaseError):
+                JobDBModel.complete_job(job.pk, next_jobs_inputs=[{"id": 2}])
+
+        assert JobDBModel.get(job.pk).is_in_progress
+        assert JobDBModel.get(next_job.pk).is_not_ready
+
+    def test_failed_pipeline_job_does_not_start_next_job(self):
+        job, next_job = self.make_pipeline_step()
+
+        JobDBModel.complete_job(
+            job.pk,
+            status=JobDBModel.JobStatus.ERROR,
+            error="Traceback",
+            next_jobs_inputs=[{"id": 2}],
+        )
+
+        assert JobDBModel.get(job.pk).errored
+        assert JobDBModel.get(next_job.pk).is_not_ready
@@ -0,0 +1,43 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.job import abulk_create_new, acreate_new
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.test_utils import run_jobs
+from myjobs.jobs import JobForTests, JobWithInputs
+from myjobs.pipelines import TwoJobsPipeline
+
+
+class TestJobPriorities:
+    def test_default_priority(self, new_job):
+        assert JobDBModel.get(new_job.pk).priority == 0
+
+    def test_lower_priority_value_is_claimed_first(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(3)], priority=10)
+        urgent_job = async_to_sync(acreate_new)(JobForTests(), priority=-1)
+
+        assert JobDBModel.claim_jobs_for_processing(1) == [urgent_job.pk]
+
+    def test_same_priority_is_claimed_in_creation_order(self, db):
+        first = async_to_sync(acreate_new)(JobForTests(), priority=1)
+        second = async_to_sync(acreate_new)(JobForTests(), priority=1)
+
+        assert JobDBModel.claim_jobs_for_processing(2) == [first.pk, second.pk]
+
+    def test_bulk_created_jobs_get_priority(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(3)], priority=5)
+
+        assert JobDBModel.objects.filter(priority=5).count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPipelinePriorities:
+    def test_all_pipeline_jobs_get_priority(self):
+        job = async_to_sync(TwoJobsPipeline.trigger)(
+            JobWithInputs.Inputs(id=1), priority=-5
+        )
+        assert JobDBModel.get(job.pk).priority == -5
+
+        run_jobs(1)
+
+        assert JobDBModel.objects.count() == 3
+        assert JobDBModel.objects.filter(priority=-5).count() == 3
@@ -0,0 +1,136 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.completion_buffer import Completion
+from django_async_job_pipelines.job import acreate_join, acreate_new, create_join
+from django_async_job_pipelines.jobs import JoinPreviousJobs
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.test_utils import run_jobs
+from myjobs.jobs import JobProducingOutputs, JobWithInputsAndOutputs
+
+
+def create_in_progress_jobs(num_jobs: int) -> list[int]:
+    return [
+        JobDBModel.objects.create(
+            name="JobProducingOutputs",
+            status=JobDBModel.JobStatus.IN_PROGRESS,
+            inputs={"id": i},
+        ).pk
+        for i in range(num_jobs)
+    ]
+
+
+class TestCreatingJoins:
+    def test_join_waits_for_previous_jobs(self, db):
+        previous_jobs_ids = create_in_progress_jobs(3)
+
+        join = create_join(JoinPreviousJobs(), previous_jobs_ids)
+
+        assert join.is_not_ready
+        assert join.pending_dependencies == 3
+        assert all(
+            JobDBModel.objects.filter(pk__in=previous_jobs_ids).values_list(
+                "has_dependents", flat=True
+            )
+        )
+
+    def test_done_previous_jobs_are_not_waited_for(self, job_in_progress):
+        JobDBModel.complete_job(job_in_progress.pk)
+        previous_jobs_ids = create_in_progress_jobs(1) + [job_in_progress.pk]
+
+        join = create_join(JoinPreviousJobs(), previous_jobs_ids)
+
+        assert join.is_not_ready
+        assert join.pending_dependencies == 1
+
+    def test_join_of_done_jobs_is_new(self, job_in_progress):
+        JobDBModel.complete_job(job_in_progress.pk)
+
+        join = create_join(JoinPreviousJobs(), [job_in_progress.pk])
+
+        assert join.is_new
+
+    def test_previous_job_does_not_exist(self, db):
+        with pytest.raises(ValueError, match="do not exist"):
+            create_join(JoinPreviousJobs(), [1_000_000])
+
+        assert not JobDBModel.objects.filter(name="JoinPreviousJobs").exists()
+
+
+class TestCompletingPreviousJobs:
+    def test_last_previous_job_makes_join_new(self, db):
+        first, second = create_in_progress_jobs(2)
+        join = create_join(JoinPreviousJobs(), [first, second])
+
+        assert JobDBModel.complete_job(first) == 0
+        assert JobDBModel.get(join.pk).is_not_ready
+        assert JobDBModel.complete_job(second) == 1
+
+        join = JobDBModel.get(join.pk)
+        assert join.is_new
+        assert join.pending_dependencies == 0
+
+    def test_failed_previous_job_keeps_join_not_ready(self, db):
+        (previous_job_id,) = create_in_progress_jobs(1)
+        join = create_join(JoinPreviousJobs(), [previous_job_id])
+
+        JobDBModel.complete_job(previous_job_id, status=JobDBModel.JobStatus.ERROR)
+
+        join = JobDBModel.get(join.pk)
+        assert join.is_not_ready
+        assert join.pending_dependencies == 1
+
+    def test_completing_in_bulk_counts_down_joins(self, db):
+        previous_jobs_ids = create_in_progress_jobs(3)
+        join = create_join(JoinPreviousJobs(), previous_jobs_ids)
+
+        JobDBModel.bulk_complete(
+            [
+                Completion(pk=pk, status=JobDBModel.JobStatus.DONE)
+                for pk in previous_jobs_ids
+            ]
+        )
+
+        assert JobDBModel.get(join.pk).is_new
+
+    def test_duplicate_completions_in_bulk_count_down_join_once(self, db):
+        first, second = create_in_progress_jobs(2)
+        join = create_join(JoinPreviousJobs(), [first, second])
+        completion = Completion(pk=first, status=JobDBModel.JobStatus.DONE)
+
+        assert JobDBModel.bulk_complete([completion, completion]) == [first]
+        assert JobDBModel.bulk_complete([completion]) == []
+
+        join = JobDBModel.get(join.pk)
+        assert join.is_not_ready
+        assert join.pending_dependencies == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunningJoins:
+    def test_join_gathers_previous_jobs_outputs(self):
+        previous_jobs = [
+            async_to_sync(acreate_new)(
+                JobProducingOutputs(inputs=JobProducingOutputs.Inputs(id=i))
+            )
+            for i in range(3)
+        ]
+        join = async_to_sync(acreate_join)(
+            JoinPreviousJobs(), [j.pk for j in previous_jobs]
+        )
+
+        run_jobs(4, timeout_seconds=2)
+
+        join = JobDBModel.get(join.pk)
+        assert join.is_done
+        assert join.outputs == {"finished_jobs_outputs": [{"id": 20}] * 3}
+
+    def test_join_is_not_run_while_previous_jobs_fail(self):
+        failing_job = async_to_sync(acreate_new)(
+            JobWithInputsAndOutputs(inputs=JobWithInputsAndOutputs.Inputs(id=1))
+        )
+        join = async_to_sync(acreate_join)(JoinPreviousJobs(), [failing_job.pk])
+
+        run_jobs(2, timeout_seconds=1)
+
+        assert JobDBModel.get(failing_job.pk).errored
+        assert JobDBModel.get(join.pk).is_not_ready
@@ -1,6 +1,8 @@
 import pytest
 from asgiref.sync import async_to_sync
-from django_async_job_pipelines.job import acreate_new
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_async_job_pipelines.job import abulk_create_new, acreate_new, create_new
 from django_async_job_pipelines.models import JobDBModel
 
 from myjobs.jobs import (
@@ -115,3 +117,66 @@ class TestAsyncCreateNewJobFunction:
 class TestSyncCreateNewJobFunction:
     # TODO fill this out
     pass
+
+
+class TestIdempotencyKeys:
+    def test_job_with_taken_key_is_not_created(self, db):
+        first = async_to_sync(acreate_new)(JobForTests(), idempotency_key="order-1")
+        second = async_to_sync(acreate_new)(JobForTests(), idempotency_key="order-1")
+
+        assert second.pk == first.pk
+        assert JobDBModel.objects.filter(idempotency_key="order-1").count() == 1
+
+    def test_sync_job_with_taken_key_is_not_created(self, db):
+        first = create_new(JobForTests(), idempotency_key="order-1")
+        second = create_new(JobForTests(), idempotency_key="order-1")
+
+        assert second.pk == first.pk
+
+    def test_done_job_with_taken_key_is_returned(self, job_in_progress):
+        JobDBModel.objects.filter(pk=job_in_progress.pk).update(
+            idempotency_key="order-1"
+        )
+        JobDBModel.complete_job(job_in_progress.pk)
+
+        job = async_to_sync(acreate_new)(JobForTests(), idempotency_key="order-1")
+
+        assert job.pk == job_in_progress.pk
+        assert job.is_done
+
+    def test_jobs_without_key_are_always_created(self, db):
+        async_to_sync(acreate_new)(JobForTests())
+        async_to_sync(acreate_new)(JobForTests())
+
+        assert JobDBModel.new_jobs_count() == 2
+
+    def test_bulk_create_returns_existing_jobs_for_taken_keys(self, db):
+        existing = async_to_sync(acreate_new)(JobForTests(), idempotency_key="order-1")
+
+        jobs = async_to_sync(abulk_create_new)(
+            [JobForTests(), JobForTests(), JobForTests(), JobForTests()],
+            idempotency_keys=["order-1", "order-2", None, "order-2"],
+        )
+
+        assert jobs[0].pk == existing.pk
+        assert jobs[1].pk == jobs[3].pk
+        assert jobs[2].pk not in (existing.pk, jobs[1].pk)
+        assert JobDBModel.new_jobs_count() == 3
+
+    def test_bulk_create_with_keys_takes_two_queries(self, db):
+        keys = [f"order-{i}" for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(abulk_create_new)(
+                [JobForTests() for _ in keys], idempotency_keys=keys
+            )
+
+        assert (
+            len([q for q in queries if q["sql"].startswith(("INSERT", "SELECT"))]) == 2
+        )
+        assert JobDBModel.new_jobs_count() == 50
+
+    def test_number_of_keys_must_match_number_of_jobs(self, db):
+        with pytest.raises(ValueError):
+            async_to_sync(abulk_create_new)(
+                [JobForTests(), JobForTests()], idempotency_keys=["order-1"]
+            )
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.db import can_update_returning
+from django_async_job_pipelines.job import abulk_create_new
+from django_async_job_pipelines.job_runner import run_num_jobs
+from django_async_job_pipelines.models import JobDBModel
+
+from myjobs.jobs import JobForTests, JobMissingRunMethod
+
+
+class TestClaimJobsForProcessing:
+    def test_claims_up_to_limit(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(5)])
+
+        pks = JobDBModel.claim_jobs_for_processing(3)
+
+        assert len(pks) == 3
+        assert JobDBModel.new_jobs_count() == 2
+        assert (
+            JobDBModel.objects.filter(
+                pk__in=pks, status=JobDBModel.JobStatus.IN_PROGRESS
+            ).count()
+            == 3
+        )
+
+    def test_claims_in_pk_order(self, new_job, new_job2):
+        assert JobDBModel.claim_jobs_for_processing(1) == [new_job.pk]
+        assert JobDBModel.claim_jobs_for_processing(1) == [new_job2.pk]
+
+    def test_no_new_jobs(self, job_in_progress):
+        assert JobDBModel.claim_jobs_for_processing(10) == []
+
+    def test_excluded_jobs_are_not_claimed(self, new_job, new_job_missing_run_method):
+        pks = JobDBModel.claim_jobs_for_processing(10, exclude=[new_job.name])
+
+        assert pks == [new_job_missing_run_method.pk]
+
+    def test_async_claim(self, new_job):
+        assert async_to_sync(JobDBModel.aclaim_jobs_for_processing)(10) == [new_job.pk]
+
+    def test_claims_row_by_row_without_update_returning(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(3)])
+
+        with patch(
+            "django_async_job_pipelines.models.can_update_returning",
+            return_value=False,
+        ):
+            pks = JobDBModel.claim_jobs_for_processing(2, lease_seconds=30)
+
+        assert len(pks) == 2
+        claimed = JobDBModel.objects.filter(pk__in=pks)
+        assert all(job.is_in_progress for job in claimed)
+        assert all(job.attempts == 1 for job in claimed)
+        assert all(job.lease_expires_at is not None for job in claimed)
+        assert JobDBModel.new_jobs_count() == 1
+
+
+class TestCanUpdateReturning:
+    @pytest.mark.parametrize(
+        "vendor, sqlite_version, expected",
+        [
+            ("postgresql", None, True),
+            ("sqlite", (3, 35, 0), True),
+            ("sqlite", (3, 34, 1), False),
+            ("mysql", None, False),  # MariaDB reports `can_return_columns_from_insert`
+        ],
+    )
+    def test_by_vendor(self, vendor, sqlite_version, expected):
+        conn = SimpleNamespace(
+            vendor=vendor,
+            Database=SimpleNamespace(sqlite_version_info=sqlite_version),
+            features=SimpleNamespace(can_return_columns_from_insert=True),
+        )
+
+        assert can_update_returning(conn) == expected
+
+
+class TestRunnerWithBatchClaim:
+    def test_all_jobs_get_processed(self, db):
+        total = 20
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(total)])
+
+        async_to_sync(run_num_jobs)(
+            max_num_workers=5, num_jobs=total, timeout=3, batch_claim=True
+        )
+
+        assert JobDBModel.new_jobs_count() == 0
+        assert JobDBModel.done_jobs_count() == total
+
+    def test_does_not_claim_more_than_num_jobs(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(10)])
+
+        async_to_sync(run_num_jobs)(
+            max_num_workers=5, num_jobs=3, timeout=3, batch_claim=True
+        )
+
+        assert JobDBModel.done_jobs_count() == 3
+        assert JobDBModel.new_jobs_count() == 7
+
+    def test_failing_jobs_with_excluded_jobs(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(2)])
+        async_to_sync(abulk_create_new)([JobMissingRunMethod() for _ in range(2)])
+
+        async_to_sync(run_num_jobs)(
+            max_num_workers=2,
+            timeout=2,
+            skip_jobs=["JobForTests"],
+            batch_claim=True,
+        )
+
+        assert JobDBModel.failed_jobs_count() == 2
+        assert JobDBModel.new_jobs_count() == 2
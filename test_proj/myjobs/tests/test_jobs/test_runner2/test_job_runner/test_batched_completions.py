@@ -0,0 +1,225 @@
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.db import DatabaseError
+from django_async_job_pipelines.completion_buffer import Completion, CompletionBuffer
+from django_async_job_pipelines.job import abulk_create_new
+from django_async_job_pipelines.job_runner import Runner, run_num_jobs
+from django_async_job_pipelines.models import JobDBModel
+
+from myjobs.jobs import JobForTests, JobMissingRunMethod, JobProducingOutputs
+
+
+class TestCompletionBuffer:
+    def test_flushes_once_full(self, new_job, new_job2):
+        JobDBModel.claim_jobs_for_processing(2)
+        flushed = []
+        buffer = CompletionBuffer(
+            max_size=2, flush_interval_seconds=10, on_flush=flushed.extend
+        )
+
+        async_to_sync(buffer.add)(
+            Completion(pk=new_job.pk, status=JobDBModel.JobStatus.DONE)
+        )
+        assert JobDBModel.get(new_job.pk).is_in_progress
+        assert flushed == []
+
+        async_to_sync(buffer.add)(
+            Completion(
+                pk=new_job2.pk, status=JobDBModel.JobStatus.ERROR, error="failed"
+            )
+        )
+        assert JobDBModel.get(new_job.pk).is_done
+        assert JobDBModel.get(new_job2.pk).errored
+        assert JobDBModel.get(new_job2.pk).error == "failed"
+        assert flushed == [new_job.pk, new_job2.pk]
+        assert buffer.completions == []
+
+    def test_flush_writes_outputs(self, job_producing_outputs):
+        JobDBModel.claim_jobs_for_processing(1)
+        buffer = CompletionBuffer(max_size=10, flush_interval_seconds=10)
+
+        async_to_sync(buffer.add)(
+            Completion(
+                pk=job_producing_outputs.pk,
+                status=JobDBModel.JobStatus.DONE,
+                outputs={"id": 3},
+            )
+        )
+        async_to_sync(buffer.flush)()
+
+        assert JobDBModel.get(job_producing_outputs.pk).outputs == {"id": 3}
+
+    def test_flush_writes_like_completing_job(self, new_job, new_job2):
+        # e.g. the error of a failed attempt recorded when the job was retried
+        JobDBModel.objects.update(outputs=None, error="earlier attempt failed")
+        JobDBModel.claim_jobs_for_processing(2)
+        buffer = CompletionBuffer(max_size=10, flush_interval_seconds=10)
+
+        async_to_sync(buffer.add)(
+            Completion(pk=new_job.pk, status=JobDBModel.JobStatus.DONE)
+        )
+        async_to_sync(buffer.flush)()
+        JobDBModel.complete_job(new_job2.pk)
+
+        buffered, unbuffered = JobDBModel.get(new_job.pk), JobDBModel.get(new_job2.pk)
+        assert buffered.outputs is None
+        assert buffered.error == "earlier attempt failed"
+        assert (buffered.outputs, buffered.error) == (
+            unbuffered.outputs,
+            unbuffered.error,
+        )
+
+    def test_flush_skips_jobs_which_are_not_in_progress(self, new_job):
+        buffer = CompletionBuffer(max_size=10, flush_interval_seconds=10)
+
+        async_to_sync(buffer.add)(
+            Completion(pk=new_job.pk, status=JobDBModel.JobStatus.DONE)
+        )
+        async_to_sync(buffer.flush)()
+
+        assert JobDBModel.get(new_job.pk).is_new
+
+    def test_failed_flush_keeps_completions_buffered(self, job_in_progress):
+        buffer = CompletionBuffer(max_size=1, flush_interval_seconds=10)
+        completion = Completion(pk=job_in_progress.pk, status=JobDBModel.JobStatus.DONE)
+
+        with patch.object(JobDBModel, "abulk_complete", side_effect=DatabaseError):
+            async_to_sync(buffer.add)(completion)
+
+        assert buffer.completions == [completion]
+        async_to_sync(buffer.flush)()
+        assert JobDBModel.get(job_in_progress.pk).is_done
+
+    def test_completion_failing_to_be_written_does_not_hold_up_others(
+        self, new_job, new_job2
+    ):
+        JobDBModel.claim_jobs_for_processing(2)
+        flushed = []
+        buffer = CompletionBuffer(
+            max_size=10, flush_interval_seconds=10, on_flush=flushed.extend
+        )
+        bulk_complete = JobDBModel.abulk_complete
+
+        async def abulk_complete(completions):
+            if any(c.pk == new_job.pk for c in completions):
+                raise DatabaseError()
+            return await bulk_complete(completions)
+
+        async_to_sync(buffer.add)(
+            Completion(pk=new_job.pk, status=JobDBModel.JobStatus.DONE)
+        )
+        async_to_sync(buffer.add)(
+            Completion(pk=new_job2.pk, status=JobDBModel.JobStatus.DONE)
+        )
+        with patch.object(JobDBModel, "abulk_complete", side_effect=abulk_complete):
+            async_to_sync(buffer.flush_logging_errors)()
+
+        assert JobDBModel.get(new_job2.pk).is_done
+        assert flushed == [new_job2.pk]
+        assert [c.pk for c in buffer.completions] == [new_job.pk]
+
+    def test_completion_is_dropped_after_max_write_attempts(self, job_in_progress):
+        dropped = []
+        buffer = CompletionBuffer(
+            max_size=10,
+            flush_interval_seconds=10,
+            max_write_attempts=2,
+            on_drop=dropped.extend,
+        )
+        async_to_sync(buffer.add)(
+            Completion(pk=job_in_progress.pk, status=JobDBModel.JobStatus.DONE)
+        )
+
+        with patch.object(JobDBModel, "abulk_complete", side_effect=DatabaseError):
+            async_to_sync(buffer.flush_logging_errors)()
+            assert dropped == []
+            async_to_sync(buffer.flush_logging_errors)()
+
+        assert dropped == [job_in_progress.pk]
+        assert buffer.completions == []
+        assert JobDBModel.get(job_in_progress.pk).is_in_progress
+
+    def test_periodic_flush_keeps_running_after_failure(self):
+        written = []
+
+        async def abulk_complete(completions):
+            written.append(completions)
+            if len(written) == 1:
+                raise DatabaseError()
+
+        async def flush_for_a_while(buffer: CompletionBuffer):
+            await buffer.add(Completion(pk=1, status=JobDBModel.JobStatus.DONE))
+            try:
+                async with asyncio.timeout(0.3):
+                    await buffer.flush_periodically()
+            except TimeoutError:
+                pass
+
+        buffer = CompletionBuffer(max_size=10, flush_interval_seconds=0.05)
+        with patch.object(JobDBModel, "abulk_complete", side_effect=abulk_complete):
+            async_to_sync(flush_for_a_while)(buffer)
+
+        assert len(written) == 2
+        assert buffer.completions == []
+
+
+class TestRunnerWithBatchedCompletions:
+    def test_all_completions_are_written(self, db):
+        async_to_sync(abulk_create_new)(
+            [
+                JobProducingOutputs(inputs=JobProducingOutputs.Inputs(id=i))
+                for i in range(7)
+            ]
+        )
+        async_to_sync(abulk_create_new)([JobMissingRunMethod() for _ in range(3)])
+
+        # 10 isn't a multiple of the batch size, so the last completions are flushed on shutdown
+        async_to_sync(run_num_jobs)(
+            max_num_workers=3, num_jobs=10, timeout=3, completion_batch_size=4
+        )
+
+        assert JobDBModel.done_jobs_count() == 7
+        assert JobDBModel.failed_jobs_count() == 3
+        assert all(
+            outputs == {"id": 20}
+            for outputs in JobDBModel.objects.filter(
+                status=JobDBModel.JobStatus.DONE
+            ).values_list("outputs", flat=True)
+        )
+        assert all(
+            "NotImplementedError" in error
+            for error in JobDBModel.objects.filter(
+                status=JobDBModel.JobStatus.ERROR
+            ).values_list("error", flat=True)
+        )
+
+    def test_failed_write_does_not_fail_job(self, db):
+        (job,) = async_to_sync(abulk_create_new)([JobForTests()])
+
+        with patch.object(JobDBModel, "abulk_complete", side_effect=DatabaseError):
+            async_to_sync(run_num_jobs)(
+                max_num_workers=1, num_jobs=1, timeout=1, completion_batch_size=1
+            )
+
+        assert JobDBModel.get(job.pk).is_in_progress
+
+    def test_lease_of_job_failing_to_be_written_is_not_extended(self, db):
+        (job,) = async_to_sync(abulk_create_new)([JobForTests()])
+        runner = Runner(max_num_workers=1, num_jobs_to_run=1, timeout_seconds=1)
+
+        with patch.object(JobDBModel, "acomplete_job", side_effect=DatabaseError):
+            async_to_sync(runner.run)()
+
+        assert JobDBModel.get(job.pk).is_in_progress
+        assert runner.claimed_jobs == set()
+
+    def test_completions_are_flushed_when_runner_times_out(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(2)])
+
+        async_to_sync(run_num_jobs)(
+            max_num_workers=2, timeout=1, completion_batch_size=100
+        )
+
+        assert JobDBModel.done_jobs_count() == 2
@@ -0,0 +1,118 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django_async_job_pipelines.job import BaseJob, abulk_create_new
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.test_utils import run_jobs
+
+from myjobs.jobs import JobForTests, JobWithConcurrencyLimit
+
+
+class TestClaimingJobsWithConcurrencyLimits:
+    def test_claims_up_to_limit(self, create_jobs):
+        create_jobs(*[JobWithConcurrencyLimit() for _ in range(5)])
+
+        claimed = JobDBModel.claim_jobs_for_processing(10)
+
+        assert len(claimed) == 2
+        assert sorted(
+            JobDBModel.objects.filter(pk__in=claimed).values_list(
+                "concurrency_slot", flat=True
+            )
+        ) == [0, 1]
+        assert JobDBModel.claim_jobs_for_processing(10) == []
+
+    def test_finished_job_frees_its_slot(self, create_jobs):
+        create_jobs(*[JobWithConcurrencyLimit() for _ in range(5)])
+        first, _ = JobDBModel.claim_jobs_for_processing(10)
+
+        JobDBModel.complete_job(first)
+
+        (claimed,) = JobDBModel.claim_jobs_for_processing(10)
+        assert (
+            JobDBModel.get(claimed).concurrency_slot
+            == JobDBModel.get(first).concurrency_slot
+        )
+
+    def test_other_jobs_are_claimed_alongside(self, create_jobs):
+        limited = create_jobs(*[JobWithConcurrencyLimit() for _ in range(3)])
+        other = create_jobs(JobForTests(), JobForTests())
+
+        claimed = JobDBModel.claim_jobs_for_processing(10)
+
+        assert sorted(claimed) == sorted(limited[:2] + other)
+
+    def test_claim_order_is_kept(self, create_jobs):
+        (other,) = create_jobs(JobForTests())
+        (limited,) = async_to_sync(abulk_create_new)(
+            [JobWithConcurrencyLimit()], priority=-1
+        )
+
+        assert JobDBModel.claim_jobs_for_processing(1) == [limited.pk]
+        assert JobDBModel.claim_jobs_for_processing(1) == [other]
+
+    def test_limited_jobs_do_not_jump_the_queue(self, create_jobs):
+        (other,) = async_to_sync(abulk_create_new)([JobForTests()], priority=-1)
+        limited = create_jobs(JobWithConcurrencyLimit())
+
+        assert JobDBModel.claim_jobs_for_processing(1) == [other.pk]
+        assert JobDBModel.claim_jobs_for_processing(1) == limited
+
+    def test_claim_without_limited_candidates_takes_one_more_query(self, create_jobs):
+        create_jobs(JobForTests(), JobForTests())
+        create_jobs(*[JobWithConcurrencyLimit() for _ in range(3)])
+
+        with CaptureQueriesContext(connection) as queries:
+            claimed = JobDBModel.claim_jobs_for_processing(2)
+
+        # selecting the candidates and claiming them, the limited jobs behind them aren't looked up
+        statements = [
+            q["sql"] for q in queries if q["sql"].startswith(("SELECT", "UPDATE"))
+        ]
+        assert len(statements) == 2
+        assert not any("DISTINCT" in sql for sql in statements)
+        assert len(claimed) == 2
+
+    def test_throttled_candidates_are_selected_again(self, create_jobs):
+        create_jobs(*[JobWithConcurrencyLimit() for _ in range(2)])
+        JobDBModel.claim_jobs_for_processing(2)
+        create_jobs(JobWithConcurrencyLimit())
+        other = create_jobs(JobForTests())
+
+        assert JobDBModel.claim_jobs_for_processing(1) == other
+
+    def test_excluded_limited_jobs_are_not_claimed(self, create_jobs):
+        create_jobs(JobWithConcurrencyLimit())
+
+        assert (
+            JobDBModel.claim_jobs_for_processing(
+                10, exclude=["JobWithConcurrencyLimit"]
+            )
+            == []
+        )
+
+    def test_slot_cannot_be_taken_twice(self, create_jobs):
+        first, second = create_jobs(
+            JobWithConcurrencyLimit(), JobWithConcurrencyLimit()
+        )
+        JobDBModel.objects.filter(pk=first).update(
+            status=JobDBModel.JobStatus.IN_PROGRESS, concurrency_slot=0
+        )
+
+        with pytest.raises(IntegrityError):
+            JobDBModel.objects.filter(pk=second).update(
+                status=JobDBModel.JobStatus.IN_PROGRESS, concurrency_slot=0
+            )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunningJobsWithConcurrencyLimits:
+    def test_limit_holds_with_more_workers(self, create_jobs):
+        JobWithConcurrencyLimit.max_num_running = 0
+        create_jobs(*[JobWithConcurrencyLimit() for _ in range(6)])
+
+        run_jobs(6, num_workers=6)
+
+        assert JobDBModel.done_jobs_count() == 6
+        assert JobWithConcurrencyLimit.max_num_running == 2
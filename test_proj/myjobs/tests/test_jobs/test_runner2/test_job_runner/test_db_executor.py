@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.db import (
+    DBExecutor,
+    current_db_executor,
+    run_in_db_thread,
+)
+from django_async_job_pipelines.job import abulk_create_new
+from django_async_job_pipelines.job_runner import Runner
+from django_async_job_pipelines.models import JobDBModel, PipelineDBModel
+
+from myjobs.jobs import JobForTests
+from myjobs.pipelines import PipelineTwoJobs
+
+
+def current_thread_name() -> str:
+    return threading.current_thread().name
+
+
+def sleep_and_get_thread_name() -> str:
+    time.sleep(0.1)
+    return current_thread_name()
+
+
+class TestDBExecutor:
+    def test_without_threads_runs_with_sync_to_async(self):
+        executor = DBExecutor()
+
+        thread_name = async_to_sync(executor.run)(current_thread_name)
+
+        assert not thread_name.startswith("job-runner-db")
+        assert executor.stats.num_calls == 1
+
+    def test_runs_in_thread_pool_concurrently(self):
+        executor = DBExecutor(max_num_threads=4)
+
+        async def run_concurrently():
+            return await asyncio.gather(
+                *(executor.run(sleep_and_get_thread_name) for _ in range(4))
+            )
+
+        start = time.perf_counter()
+        thread_names = async_to_sync(run_concurrently)()
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+
+        assert elapsed < 0.3
+        assert len(set(thread_names)) == 4
+        assert all(name.startswith("job-runner-db") for name in thread_names)
+        assert executor.stats.num_calls == 4
+        assert executor.stats.total_run_seconds >= 0.4
+
+    def test_calls_wait_for_a_free_thread(self):
+        executor = DBExecutor(max_num_threads=1)
+
+        async def run_concurrently():
+            await asyncio.gather(
+                *(executor.run(sleep_and_get_thread_name) for _ in range(3))
+            )
+
+        async_to_sync(run_concurrently)()
+        executor.shutdown()
+
+        assert executor.stats.max_wait_seconds >= 0.2
+        assert executor.stats.avg_wait_seconds >= 0.1
+
+    def test_run_in_db_thread_uses_current_executor(self):
+        executor = DBExecutor(max_num_threads=1)
+
+        async def run():
+            token = current_db_executor.set(executor)
+            try:
+                return await run_in_db_thread(current_thread_name)
+            finally:
+                current_db_executor.reset(token)
+
+        assert async_to_sync(run)().startswith("job-runner-db")
+        assert not async_to_sync(run_in_db_thread)(current_thread_name).startswith(
+            "job-runner-db"
+        )
+        executor.shutdown()
+
+
+class TestRunnerDBStats:
+    def test_runner_db_queries_are_counted(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(2)])
+        runner = Runner(max_num_workers=2, num_jobs_to_run=2, timeout_seconds=3)
+
+        async_to_sync(runner.run)()
+
+        assert JobDBModel.done_jobs_count() >= 2
+        # at least a claim, a fetch and a "done" update per job
+        assert runner.db_executor.stats.num_calls >= 6
+
+
+class TestQueriesGoThroughDBExecutor:
+    def run_with_executor(self, func, *args) -> DBExecutor:
+        executor = DBExecutor()
+
+        async def run():
+            token = current_db_executor.set(executor)
+            try:
+                await func(*args)
+            finally:
+                current_db_executor.reset(token)
+
+        async_to_sync(run)()
+        return executor
+
+    def test_creating_jobs(self, db):
+        executor = self.run_with_executor(JobDBModel.acreate_new_in_db, JobForTests())
+
+        assert executor.stats.num_calls == 1
+        assert JobDBModel.new_jobs_count() == 1
+
+    def test_creating_jobs_in_bulk(self, db):
+        executor = self.run_with_executor(
+            JobDBModel.abulk_create_new_in_db, [JobForTests(), JobForTests()]
+        )
+
+        assert executor.stats.num_calls == 1
+        assert JobDBModel.new_jobs_count() == 2
+
+    def test_starting_pipelines(self, db):
+        job_row = async_to_sync(PipelineTwoJobs.trigger)()
+        start_pipeline = async_to_sync(JobDBModel.aget_by_id)(job_row.pk)
+
+        executor = self.run_with_executor(start_pipeline.run)
+
+        assert executor.stats.num_calls == 1
+        assert PipelineDBModel.objects.count() == 1
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+from django_async_job_pipelines.job import abulk_create_new, acreate_new, create_new
+from django_async_job_pipelines.job_runner import Runner
+from django_async_job_pipelines.models import JobDBModel
+
+from myjobs.jobs import JobForTests
+
+
+class TestCreatingDelayedJobs:
+    def test_job_runs_right_away_by_default(self, new_job):
+        assert new_job.run_at <= timezone.now()
+
+    def test_delay(self, db):
+        before = timezone.now()
+
+        job = create_new(JobForTests(), delay=timedelta(minutes=5))
+
+        assert job.run_at >= before + timedelta(minutes=5)
+
+    def test_run_at(self, db):
+        run_at = timezone.now() + timedelta(hours=1)
+
+        job = async_to_sync(acreate_new)(JobForTests(), run_at=run_at)
+
+        assert JobDBModel.get(job.pk).run_at == run_at
+
+    def test_bulk_created_jobs_are_delayed(self, db):
+        run_at = timezone.now() + timedelta(hours=1)
+
+        jobs = async_to_sync(abulk_create_new)(
+            [JobForTests(), JobForTests()], run_at=run_at
+        )
+
+        assert all(JobDBModel.get(job.pk).run_at == run_at for job in jobs)
+
+    def test_run_at_and_delay_together(self, db):
+        with pytest.raises(ValueError, match="not both"):
+            create_new(JobForTests(), run_at=timezone.now(), delay=timedelta(minutes=5))
+
+
+class TestClaimingDelayedJobs:
+    def test_job_is_not_claimed_before_run_at(self, db):
+        create_new(JobForTests(), delay=timedelta(minutes=5))
+
+        assert JobDBModel.claim_jobs_for_processing(10) == []
+
+    def test_job_is_claimed_once_run_at_comes(self, db):
+        job = create_new(JobForTests(), delay=timedelta(minutes=5))
+        JobDBModel.objects.filter(pk=job.pk).update(
+            run_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        assert JobDBModel.claim_jobs_for_processing(10) == [job.pk]
+
+    def test_next_run_at(self, db):
+        create_new(JobForTests())
+        first = create_new(JobForTests(), delay=timedelta(minutes=5))
+        create_new(JobForTests(), delay=timedelta(minutes=10))
+
+        assert JobDBModel.next_run_at() == first.run_at
+        assert JobDBModel.next_run_at(exclude=[first.name]) is None
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunningDelayedJobs:
+    def test_runner_wakes_up_when_job_is_due(self):
+        job = create_new(JobForTests(), delay=timedelta(seconds=0.5))
+        runner = Runner(
+            max_num_workers=1,
+            timeout_seconds=3,
+            wait_seconds_between_queries=10,
+            max_wait_seconds_between_queries=10,
+            backoff_jitter=0,
+        )
+
+        async_to_sync(runner.run)()
+
+        assert JobDBModel.get(job.pk).is_done
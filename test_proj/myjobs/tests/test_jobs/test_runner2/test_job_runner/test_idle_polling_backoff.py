@@ -0,0 +1,101 @@
+import asyncio
+import time
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.backoff import IdlePoller, exponential_backoff
+from django_async_job_pipelines.job_runner import Runner
+from django_async_job_pipelines.models import JobDBModel
+
+
+class TestExponentialBackoff:
+    def test_grows_exponentially(self):
+        assert exponential_backoff(0, base_seconds=0.1, max_seconds=10) == 0.1
+        assert exponential_backoff(1, base_seconds=0.1, max_seconds=10) == 0.2
+        assert exponential_backoff(3, base_seconds=0.1, max_seconds=10) == 0.8
+
+    def test_capped_at_max(self):
+        assert exponential_backoff(100, base_seconds=0.1, max_seconds=10) == 10
+
+    def test_jitter_stays_within_bounds(self):
+        for _ in range(100):
+            delay = exponential_backoff(0, base_seconds=1, max_seconds=10, jitter=0.1)
+            assert 0.9 <= delay <= 1.1
+
+
+class TestIdlePoller:
+    def test_backs_off_until_reset(self):
+        poller = IdlePoller(min_seconds=0.1, max_seconds=0.5, jitter=0)
+
+        assert [poller.next_wait_seconds() for _ in range(5)] == [
+            0.1,
+            0.2,
+            0.4,
+            0.5,
+            0.5,
+        ]
+
+        poller.reset()
+        assert poller.next_wait_seconds() == 0.1
+
+    async def test_wake_interrupts_wait(self):
+        poller = IdlePoller(min_seconds=10, max_seconds=10, jitter=0)
+
+        start = time.perf_counter()
+        asyncio.get_running_loop().call_later(0.1, poller.wake)
+        await poller.wait()
+
+        assert time.perf_counter() - start < 1
+        assert poller.num_idle_polls == 0
+
+    async def test_wait_is_capped_at_max_seconds(self):
+        poller = IdlePoller(min_seconds=10, max_seconds=10, jitter=0)
+
+        start = time.perf_counter()
+        await poller.wait(max_seconds=0.1)
+
+        assert time.perf_counter() - start < 1
+
+
+class TestRunnerBacksOffWhenIdle:
+    def test_queries_slow_down_without_jobs(self, db):
+        runner = Runner(
+            max_num_workers=1,
+            timeout_seconds=2,
+            wait_seconds_between_queries=0.1,
+            max_wait_seconds_between_queries=10,
+            backoff_jitter=0,
+        )
+
+        async_to_sync(runner.run)()
+
+        # waited 0.1 + 0.2 + 0.4 + 0.8 and is now waiting 1.6 seconds
+        assert runner.idle_poller.num_idle_polls == 5
+        assert JobDBModel.new_jobs_count() == 0
+
+    def test_next_run_at_is_fetched_once_while_backing_off(self, db):
+        runner = Runner(
+            max_num_workers=1,
+            timeout_seconds=1,
+            wait_seconds_between_queries=0.05,
+            max_wait_seconds_between_queries=10,
+            backoff_jitter=0,
+        )
+
+        with mock.patch.object(
+            JobDBModel, "anext_run_at", wraps=JobDBModel.anext_run_at
+        ) as anext_run_at:
+            async_to_sync(runner.run)()
+
+        assert runner.idle_poller.num_idle_polls > 1
+        assert anext_run_at.call_count == 1
+
+
+class TestRunnerTimeouts:
+    def test_get_job_to_process_timeout_is_deprecated(self):
+        with pytest.warns(DeprecationWarning, match="get_job_to_process_timeout"):
+            runner = Runner(max_num_workers=1, get_job_to_process_timeout=1.0)
+
+        assert runner.get_job_to_process_timeout == 1.0
+        assert runner.get_job_from_queue_timeout == 0.1
@@ -0,0 +1,66 @@
+import os
+from unittest.mock import Mock, patch
+
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.db import init_job_process
+from django_async_job_pipelines.job import abulk_create_new, acreate_new
+from django_async_job_pipelines.job_runner import run_job_in_process, run_num_jobs
+from django_async_job_pipelines.models import JobDBModel
+
+from myjobs.jobs import CPUBoundJob, JobForTests, JobRunInThread
+
+
+class TestRunningJobsInThreads:
+    def test_job_runs_in_thread_pool(self, db):
+        job = async_to_sync(acreate_new)(JobRunInThread())
+
+        async_to_sync(run_num_jobs)(max_num_workers=1, num_jobs=1, timeout=3)
+
+        job = JobDBModel.get(job.pk)
+        assert job.is_done
+        assert job.outputs["thread_name"].startswith("job-runner-thread")
+
+
+class TestRunningJobsInProcesses:
+    def test_outputs_and_next_job_inputs_are_sent_back(self):
+        outputs, next_job_inputs = run_job_in_process(
+            CPUBoundJob, CPUBoundJob.Inputs(n=4), None
+        )
+
+        assert outputs == CPUBoundJob.Outputs(total=14, pid=os.getpid())
+        assert next_job_inputs == CPUBoundJob.Inputs(n=5)
+
+    def test_job_runs_in_process_pool(self, db):
+        job = async_to_sync(acreate_new)(CPUBoundJob(inputs=CPUBoundJob.Inputs(n=4)))
+
+        async_to_sync(run_num_jobs)(max_num_workers=1, num_jobs=1, timeout=5)
+
+        job = JobDBModel.get(job.pk)
+        assert job.is_done
+        assert job.outputs["total"] == 14
+        assert job.outputs["pid"] != os.getpid()
+
+    def test_mixing_execution_policies(self, db):
+        async_to_sync(abulk_create_new)(
+            [CPUBoundJob(inputs=CPUBoundJob.Inputs(n=i)) for i in range(3)]
+            + [JobRunInThread() for _ in range(3)]
+            + [JobForTests() for _ in range(3)]
+        )
+        done_before = JobDBModel.done_jobs_count()
+
+        async_to_sync(run_num_jobs)(max_num_workers=3, num_jobs=9, timeout=5)
+
+        assert JobDBModel.done_jobs_count() - done_before == 9
+
+
+class TestJobProcessInitializer:
+    def test_inherited_connections_are_dropped_without_closing(self):
+        connection = Mock()
+
+        with patch("django.setup"), patch(
+            "django_async_job_pipelines.db.connections.all", return_value=[connection]
+        ):
+            init_job_process()
+
+        assert connection.connection is None
+        connection.close.assert_not_called()
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+from django_async_job_pipelines.job import abulk_create_new
+from django_async_job_pipelines.job_runner import Runner, run_num_jobs
+from django_async_job_pipelines.models import JobDBModel
+
+from myjobs.jobs import JobForTests
+
+
+def expire_leases():
+    JobDBModel.objects.filter(status=JobDBModel.JobStatus.IN_PROGRESS).update(
+        lease_expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+
+class TestClaimingWithLease:
+    def test_claim_sets_lease_and_counts_attempts(self, new_job):
+        before = timezone.now()
+
+        JobDBModel.claim_jobs_for_processing(1, lease_seconds=30)
+
+        job = JobDBModel.get(new_job.pk)
+        assert job.attempts == 1
+        assert job.lease_expires_at >= before + timedelta(seconds=30)
+
+    def test_claim_without_lease(self, new_job):
+        JobDBModel.claim_jobs_for_processing(1)
+
+        assert JobDBModel.get(new_job.pk).lease_expires_at is None
+
+    def test_extend_leases(self, new_job):
+        JobDBModel.claim_jobs_for_processing(1, lease_seconds=1)
+
+        async_to_sync(JobDBModel.aextend_leases)([new_job.pk], 100)
+
+        lease_expires_at = JobDBModel.get(new_job.pk).lease_expires_at
+        assert lease_expires_at > timezone.now() + timedelta(seconds=90)
+
+
+class TestReclaimingExpiredJobs:
+    def test_expired_jobs_become_new(self, new_job, new_job2):
+        JobDBModel.claim_jobs_for_processing(2, lease_seconds=30)
+        JobDBModel.objects.filter(pk=new_job.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        assert async_to_sync(JobDBModel.areclaim_expired_jobs)() == 1
+
+        job = JobDBModel.get(new_job.pk)
+        assert job.is_new
+        assert job.lease_expires_at is None
+        assert job.attempts == 1
+        assert JobDBModel.get(new_job2.pk).is_in_progress
+
+    def test_jobs_without_lease_are_not_reclaimed(self, job_in_progress):
+        assert async_to_sync(JobDBModel.areclaim_expired_jobs)() == 0
+        assert JobDBModel.get(job_in_progress.pk).is_in_progress
+
+    def test_jobs_reaching_max_attempts_fail(self, new_job):
+        for _ in range(2):
+            JobDBModel.claim_jobs_for_processing(1, lease_seconds=30)
+            expire_leases()
+            async_to_sync(JobDBModel.areclaim_expired_jobs)(max_attempts=2)
+
+        job = JobDBModel.get(new_job.pk)
+        assert job.errored
+        assert job.attempts == 2
+        assert "Lease expired" in job.error
+
+
+class TestRunnerLeases:
+    def test_runner_reclaims_and_runs_jobs_of_dead_runners(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(3)])
+        JobDBModel.claim_jobs_for_processing(3, lease_seconds=30)
+        expire_leases()  # as if the runner which claimed them was killed
+
+        async_to_sync(run_num_jobs)(max_num_workers=3, num_jobs=3, timeout=3)
+
+        assert JobDBModel.done_jobs_count() == 3
+        assert set(JobDBModel.objects.values_list("attempts", flat=True)) == {2}
+
+    def test_runner_fails_jobs_reaching_max_attempts(self, new_job):
+        JobDBModel.claim_jobs_for_processing(1, lease_seconds=30)
+        expire_leases()
+
+        async_to_sync(run_num_jobs)(
+            max_num_workers=1, num_jobs=1, timeout=1, max_attempts=1
+        )
+
+        job = JobDBModel.get(new_job.pk)
+        assert job.errored
+        assert job.attempts == 1
+
+    def test_heartbeat_extends_leases_of_claimed_jobs(self, new_job):
+        runner = Runner(max_num_workers=1, lease_seconds=0.3)
+        JobDBModel.claim_jobs_for_processing(1, lease_seconds=0.3)
+        runner.claimed_jobs.add(new_job.pk)
+
+        async def run_heartbeat():
+            try:
+                async with asyncio.timeout(0.5):
+                    await runner.extend_leases()
+            except TimeoutError:
+                pass
+
+        async_to_sync(run_heartbeat)()
+
+        assert JobDBModel.get(new_job.pk).lease_expires_at > timezone.now()
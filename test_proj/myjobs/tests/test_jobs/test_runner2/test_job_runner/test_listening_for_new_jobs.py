@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.job_runner import run_num_jobs
+from django_async_job_pipelines.notifications import (
+    NewJobsListener,
+    notifications_enabled,
+    notify_new_jobs,
+)
+
+
+class TestNotifications:
+    def test_disabled_by_default(self, db):
+        assert not notifications_enabled()
+
+    def test_not_enabled_for_sqlite(self, db, settings):
+        settings.ASYNC_JOB_PIPELINES_NOTIFY = True
+        assert not notifications_enabled()
+        notify_new_jobs()  # no-op
+
+
+class TestNewJobsListener:
+    async def test_wait_returns_once_notified(self):
+        listener = NewJobsListener()
+        listener.new_jobs.set()
+
+        assert await listener.wait(timeout=1)
+        assert not listener.new_jobs.is_set()
+
+    async def test_wait_times_out(self):
+        listener = NewJobsListener()
+
+        assert not await listener.wait(timeout=0.1)
+
+    def test_listening_requires_postgres(self, db):
+        with pytest.raises(ValueError):
+            async_to_sync(run_num_jobs)(
+                max_num_workers=1, timeout=1, listen_for_new_jobs=True
+            )
@@ -0,0 +1,89 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.models import JobDBModel, PipelineDBModel
+from django_async_job_pipelines.pipeline import BasePipeline
+from django_async_job_pipelines.test_utils import run_jobs
+from myjobs.jobs import DAGLeftBranch, DAGMerge, DAGRoot, JobWithInputs
+from myjobs.pipelines import DAGPipelineWithInputs, DiamondPipeline
+
+
+def pipeline_jobs(pipeline_name: str) -> dict[str, JobDBModel]:
+    pipeline = PipelineDBModel.objects.get(name=pipeline_name)
+    return {link.job.name: link.job for link in pipeline.jobs.select_related("job")}
+
+
+class TestDeclaringDependencies:
+    def test_unknown_job_class(self):
+        with pytest.raises(TypeError, match="not in its jobs"):
+
+            class PipelineWithUnknownDependency(BasePipeline):
+                jobs = [DAGRoot, DAGMerge]
+                dependencies = {DAGMerge: [DAGLeftBranch]}
+
+    def test_same_job_class_twice(self):
+        with pytest.raises(TypeError, match="different classes"):
+
+            class PipelineWithSameJobTwice(BasePipeline):
+                jobs = [DAGRoot, DAGRoot, DAGMerge]
+                dependencies = {DAGMerge: [DAGRoot]}
+
+    def test_cycle(self):
+        with pytest.raises(TypeError, match="cycle"):
+
+            class PipelineWithCycle(BasePipeline):
+                jobs = [DAGRoot, DAGMerge]
+                dependencies = {DAGMerge: [DAGRoot], DAGRoot: [DAGMerge]}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunningDAGPipeline:
+    def test_jobs_are_created_waiting_for_their_dependencies(self):
+        async_to_sync(DiamondPipeline.trigger)()
+        run_jobs(1)  # the trigger job
+
+        jobs = pipeline_jobs("DiamondPipeline")
+        assert jobs["DAGRoot"].is_new
+        assert jobs["DAGLeftBranch"].is_not_ready
+        assert jobs["DAGLeftBranch"].pending_dependencies == 1
+        assert jobs["DAGRightBranch"].pending_dependencies == 1
+        assert jobs["DAGMerge"].pending_dependencies == 2
+        assert jobs["DAGMerge"].dependencies.count() == 2
+
+    def test_branches_start_after_root(self):
+        async_to_sync(DiamondPipeline.trigger)()
+        run_jobs(2)  # the trigger job and the root
+
+        jobs = pipeline_jobs("DiamondPipeline")
+        assert jobs["DAGRoot"].is_done
+        assert jobs["DAGLeftBranch"].is_new
+        assert jobs["DAGRightBranch"].is_new
+        assert jobs["DAGMerge"].is_not_ready
+
+    def test_all_jobs_run(self):
+        async_to_sync(DiamondPipeline.trigger)()
+        run_jobs(1 + len(DiamondPipeline.jobs), num_workers=2)
+
+        jobs = pipeline_jobs("DiamondPipeline")
+        assert jobs["DAGMerge"].is_done
+        assert jobs["DAGMerge"].outputs == {"total": (1 + 10) + (1 + 100) + 1000}
+        assert PipelineDBModel.objects.get(name="DiamondPipeline").is_done
+
+    def test_jobs_get_pipeline_inputs(self):
+        async_to_sync(DAGPipelineWithInputs.trigger)(inputs=JobWithInputs.Inputs(id=7))
+        run_jobs(1)
+
+        jobs = pipeline_jobs("DAGPipelineWithInputs")
+        assert jobs["JobWithInputs"].inputs == {"id": 7}
+        assert jobs["JobWithInputs"].is_new
+        assert jobs["DAGRoot"].is_new
+
+    def test_failed_job_keeps_its_dependents_not_ready(self):
+        async_to_sync(DAGPipelineWithInputs.trigger)(inputs=JobWithInputs.Inputs(id=7))
+        run_jobs(3, timeout_seconds=2)
+
+        jobs = pipeline_jobs("DAGPipelineWithInputs")
+        assert jobs["JobWithInputs"].errored
+        assert jobs["DAGRoot"].is_done
+        assert jobs["DAGMerge"].is_not_ready
+        assert jobs["DAGMerge"].pending_dependencies == 1
+        assert PipelineDBModel.objects.get(name="DAGPipelineWithInputs").errored
@@ -0,0 +1,62 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.job import abulk_create_new, acreate_new
+from django_async_job_pipelines.job_runner import Runner, run_num_jobs
+from django_async_job_pipelines.management.commands.consume_jobs_async import (
+    parse_queues,
+)
+from django_async_job_pipelines.models import JobDBModel
+
+from myjobs.jobs import JobForTests, JobInGPUQueue
+
+
+class TestJobQueues:
+    def test_queue_comes_from_job_class(self, db):
+        default_job = async_to_sync(acreate_new)(JobForTests())
+        gpu_job = async_to_sync(acreate_new)(JobInGPUQueue())
+
+        assert JobDBModel.get(default_job.pk).queue == "default"
+        assert JobDBModel.get(gpu_job.pk).queue == "gpu"
+
+    def test_claim_from_one_queue(self, db):
+        async_to_sync(acreate_new)(JobForTests())
+        gpu_job = async_to_sync(acreate_new)(JobInGPUQueue())
+
+        assert JobDBModel.claim_jobs_for_processing(10, queue="gpu") == [gpu_job.pk]
+        assert JobDBModel.claim_jobs_for_processing(10, queue="gpu") == []
+
+    def test_runner_only_consumes_subscribed_queues(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(3)])
+        async_to_sync(abulk_create_new)([JobInGPUQueue() for _ in range(3)])
+
+        async_to_sync(run_num_jobs)(max_num_workers=2, timeout=2, queues={"gpu": 1})
+
+        assert JobDBModel.objects.filter(queue="gpu", status="DONE").count() == 3
+        assert JobDBModel.objects.filter(queue="default", status="NEW").count() == 3
+
+
+class TestWeightedRoundRobin:
+    def test_claims_follow_queue_weights(self, db):
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(10)])
+        async_to_sync(abulk_create_new)([JobInGPUQueue() for _ in range(10)])
+        runner = Runner(max_num_workers=1, queues={"gpu": 2, "default": 1})
+
+        claimed = [async_to_sync(runner.claim_jobs)(1)[0] for _ in range(6)]
+
+        queues = [JobDBModel.get(pk).queue for pk in claimed]
+        assert queues == ["gpu", "gpu", "default", "gpu", "gpu", "default"]
+
+    def test_falls_back_to_other_queues_when_scheduled_one_is_empty(self, db):
+        default_job = async_to_sync(acreate_new)(JobForTests())
+        runner = Runner(max_num_workers=1, queues={"gpu": 5, "default": 1})
+
+        assert async_to_sync(runner.claim_jobs)(1) == [default_job.pk]
+
+    def test_weights_must_be_positive(self):
+        with pytest.raises(ValueError):
+            Runner(max_num_workers=1, queues={"gpu": 0})
+
+
+class TestParseQueues:
+    def test_names_with_and_without_weights(self):
+        assert parse_queues("gpu:3,default") == {"gpu": 3, "default": 1}
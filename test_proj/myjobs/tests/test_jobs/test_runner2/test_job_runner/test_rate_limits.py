@@ -0,0 +1,169 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from django_async_job_pipelines.models import JobDBModel, JobRateLimitDBModel
+from django_async_job_pipelines.test_utils import run_jobs
+
+from myjobs.jobs import JobForTests, RateLimitedJob
+
+
+class TestTokenBucket:
+    def test_new_bucket_is_full(self, db):
+        now = timezone.now()
+
+        assert JobRateLimitDBModel.take_tokens("Job", 5, 10, now) == 5
+        assert JobRateLimitDBModel.take_tokens("Job", 5, 10, now) == 0
+
+    def test_bucket_refills(self, db):
+        now = timezone.now()
+        JobRateLimitDBModel.take_tokens("Job", 5, 10, now)
+
+        assert (
+            JobRateLimitDBModel.take_tokens("Job", 5, 10, now + timedelta(seconds=0.4))
+            == 2
+        )
+
+    def test_bucket_does_not_refill_above_capacity(self, db):
+        now = timezone.now()
+        JobRateLimitDBModel.take_tokens("Job", 5, 1, now)
+
+        assert (
+            JobRateLimitDBModel.take_tokens("Job", 5, 10, now + timedelta(hours=1)) == 5
+        )
+
+    def test_slow_rate_has_one_token(self, db):
+        now = timezone.now()
+
+        assert JobRateLimitDBModel.take_tokens("Job", 0.1, 10, now) == 1
+        assert (
+            JobRateLimitDBModel.take_tokens("Job", 0.1, 10, now + timedelta(seconds=5))
+            == 0
+        )
+
+    def test_bucket_refills_over_time(self, db):
+        now = timezone.now()
+        JobRateLimitDBModel.take_tokens("Job", 5, 10, now)
+
+        taken = [
+            JobRateLimitDBModel.take_tokens(
+                "Job", 5, 10, now + timedelta(seconds=0.2 * i)
+            )
+            for i in range(1, 6)
+        ]
+
+        assert taken == [1, 1, 1, 1, 1]
+
+    def test_buckets_are_created_full_once(self, db):
+        now = timezone.now()
+        JobRateLimitDBModel.create_buckets({"Job": 5, "OtherJob": 0.5}, now)
+        JobRateLimitDBModel.take_tokens("Job", 5, 3, now)
+
+        JobRateLimitDBModel.create_buckets({"Job": 5}, now)
+
+        assert dict(JobRateLimitDBModel.objects.values_list("name", "tokens")) == {
+            "Job": 2,
+            "OtherJob": 1,
+        }
+
+    def test_bucket_created_meanwhile_is_not_refilled(self, db):
+        now = timezone.now()
+        first = JobRateLimitDBModel.objects.select_for_update().filter(name="Job").first
+
+        def bucket_created_by_another_runner():
+            found = first()
+            JobRateLimitDBModel.create_buckets({"Job": 5}, now)
+            JobRateLimitDBModel.objects.filter(name="Job").update(tokens=1)
+            return found
+
+        with mock.patch(
+            "django.db.models.query.QuerySet.first",
+            side_effect=bucket_created_by_another_runner,
+            autospec=False,
+        ):
+            assert JobRateLimitDBModel.take_tokens("Job", 5, 10, now) == 1
+
+    def test_give_back_tokens_up_to_capacity(self, db):
+        now = timezone.now()
+        JobRateLimitDBModel.take_tokens("Job", 5, 3, now)
+
+        JobRateLimitDBModel.give_back_tokens("Job", 5, 2)
+        assert JobRateLimitDBModel.objects.get(name="Job").tokens == 4
+        JobRateLimitDBModel.give_back_tokens("Job", 5, 2)
+        assert JobRateLimitDBModel.objects.get(name="Job").tokens == 5
+
+
+@pytest.mark.skipif(
+    not connection.features.has_select_for_update,
+    reason="SQLite locks the whole database instead of the bucket row",
+)
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentTokenBuckets:
+    def test_concurrent_takes_from_new_bucket_share_its_tokens(self):
+        now = timezone.now()
+
+        def take_tokens(_):
+            try:
+                return JobRateLimitDBModel.take_tokens("Job", 5, 2, now)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(4) as executor:
+            taken = list(executor.map(take_tokens, range(4)))
+
+        assert sum(taken) == 5
+        assert JobRateLimitDBModel.objects.count() == 1
+
+
+class TestClaimingRateLimitedJobs:
+    def test_claims_up_to_available_tokens(self, create_jobs):
+        create_jobs(*[RateLimitedJob() for _ in range(8)])
+
+        assert len(JobDBModel.claim_jobs_for_processing(10)) == 5
+        assert JobDBModel.claim_jobs_for_processing(10) == []
+
+    def test_throttled_jobs_do_not_hold_up_other_jobs(self, create_jobs):
+        create_jobs(*[RateLimitedJob() for _ in range(8)])
+        JobDBModel.claim_jobs_for_processing(10)
+        other = create_jobs(JobForTests())
+
+        assert JobDBModel.claim_jobs_for_processing(10) == other
+
+    def test_tokens_of_jobs_claimed_meanwhile_are_given_back(self, create_jobs):
+        pks = create_jobs(*[RateLimitedJob() for _ in range(3)])
+        candidates = [(pk, None, "RateLimitedJob") for pk in pks]
+        JobDBModel.objects.filter(pk=pks[0]).update(
+            status=JobDBModel.JobStatus.IN_PROGRESS
+        )
+
+        claimed = JobDBModel.claim_limited_jobs(
+            candidates, {"RateLimitedJob": [None] * 3}, timezone.now(), None
+        )
+
+        assert [pk for pk, _ in claimed] == pks[1:]
+        assert JobRateLimitDBModel.objects.get(name="RateLimitedJob").tokens == 3
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunningRateLimitedJobs:
+    def test_rate_holds_across_claims(self, create_jobs):
+        RateLimitedJob.call_times = []
+        create_jobs(*[RateLimitedJob() for _ in range(7)])
+
+        run_jobs(7, num_workers=7)
+
+        # 5 calls right away, the next 2 wait for the bucket to refill at 5 tokens per second
+        call_times = sorted(RateLimitedJob.call_times)
+        assert len(call_times) == 7
+        assert call_times[-1] - call_times[0] >= 0.35
+
+    def test_runner_creates_buckets_at_start(self, create_jobs):
+        create_jobs(JobForTests())
+
+        run_jobs(1)
+
+        bucket = JobRateLimitDBModel.objects.get(name="RateLimitedJob")
+        assert bucket.tokens == 5
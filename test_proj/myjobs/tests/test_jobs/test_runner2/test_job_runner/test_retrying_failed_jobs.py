@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+from django_async_job_pipelines.job import acreate_new
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.test_utils import run_jobs
+
+from myjobs.jobs import JobFailingWithRetries, JobSucceedingOnThirdAttempt
+
+
+class TestRetryDelay:
+    def test_grows_exponentially(self):
+        job = JobSucceedingOnThirdAttempt()
+
+        assert [job.retry_delay_seconds(attempt) for attempt in (1, 2, 3)] == [
+            0.1,
+            0.2,
+            0.4,
+        ]
+
+    def test_capped_at_max(self):
+        job = JobSucceedingOnThirdAttempt()
+
+        assert job.retry_delay_seconds(100) == job.max_retry_backoff_seconds
+
+
+class TestRetryingLater:
+    def test_in_progress_job_is_made_new(self, job_in_progress):
+        run_at = timezone.now() + timedelta(minutes=1)
+
+        assert JobDBModel.retry_later(job_in_progress.pk, run_at, "boom")
+
+        job = JobDBModel.get(job_in_progress.pk)
+        assert job.is_new
+        assert job.run_at == run_at
+        assert job.error == "boom"
+        assert job.lease_expires_at is None
+
+    def test_job_which_is_not_in_progress(self, new_job):
+        assert not JobDBModel.retry_later(new_job.pk, timezone.now(), "boom")
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunningJobsWithRetries:
+    def test_job_succeeds_after_retries(self):
+        job = async_to_sync(acreate_new)(JobSucceedingOnThirdAttempt())
+
+        run_jobs(3)
+
+        job = JobDBModel.get(job.pk)
+        assert job.is_done
+        assert job.attempts == 3
+
+    def test_job_fails_once_retries_are_exhausted(self):
+        job = async_to_sync(acreate_new)(JobFailingWithRetries())
+
+        run_jobs(2)
+
+        job = JobDBModel.get(job.pk)
+        assert job.errored
+        assert job.attempts == 2
+        assert "Always fails" in job.error
+
+    def test_retry_waits_for_backoff(self):
+        job = async_to_sync(acreate_new)(JobFailingWithRetries())
+
+        run_jobs(1)
+
+        job = JobDBModel.get(job.pk)
+        assert job.is_new
+        assert job.run_at > job.date_updated
@@ -0,0 +1,107 @@
+import asyncio
+import multiprocessing
+import os
+import time
+
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.job import abulk_create_new
+from django_async_job_pipelines.job_runner import Runner
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.supervisor import Supervisor
+
+from myjobs.jobs import JobWithSleep
+
+crashed = multiprocessing.get_context("fork").Value("b", 0)
+
+
+def crash_once(runner_kwargs, jobs_processed):
+    jobs_processed.value = 1
+    with crashed.get_lock():
+        already_crashed = crashed.value
+        crashed.value = 1
+    if not already_crashed:
+        os._exit(1)
+
+
+def run_until_terminated(runner_kwargs, jobs_processed):
+    # the default SIGTERM handler would kill the process with a non zero exit code
+    import signal
+
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    while True:
+        time.sleep(0.1)
+
+
+class TestGracefulStop:
+    def test_claimed_jobs_are_finished_after_stop(self, db):
+        async_to_sync(abulk_create_new)([JobWithSleep() for _ in range(10)])
+        done_before = JobDBModel.done_jobs_count()
+
+        async def run_and_stop():
+            runner = Runner(max_num_workers=2, batch_claim=True)
+            task = asyncio.create_task(runner.run())
+            await asyncio.sleep(0.15)
+            runner.stop()
+            async with asyncio.timeout(5):
+                await task
+            return runner
+
+        runner = async_to_sync(run_and_stop)()
+
+        assert runner.claiming_stopped
+        assert 0 < runner.total_jobs_processed < 10
+        assert JobDBModel.done_jobs_count() - done_before == runner.total_jobs_processed
+        assert not JobDBModel.objects.filter(
+            status=JobDBModel.JobStatus.IN_PROGRESS
+        ).exists()
+
+    def test_stop_interrupts_waiting_for_new_jobs(self, db):
+        async def run_and_stop():
+            runner = Runner(
+                max_num_workers=1,
+                wait_seconds_between_queries=10,
+                max_wait_seconds_between_queries=10,
+            )
+            task = asyncio.create_task(runner.run())
+            await asyncio.sleep(0.1)
+            runner.stop()
+            async with asyncio.timeout(2):
+                await task
+
+        async_to_sync(run_and_stop)()
+
+
+class TestSupervisor:
+    def test_crashed_processes_are_restarted(self):
+        reports = []
+        supervisor = Supervisor(
+            num_processes=1,
+            target=crash_once,
+            check_interval_seconds=0.05,
+            report=reports.append,
+        )
+
+        supervisor.run()
+
+        assert supervisor.num_restarts == 1
+        assert supervisor.total_jobs_processed == 2
+        assert "restarting it" in reports[0]
+        assert reports[-1].startswith("Processed 2 jobs")
+
+    def test_stop_terminates_processes_without_restarting_them(self):
+        supervisor = Supervisor(
+            num_processes=2,
+            target=run_until_terminated,
+            check_interval_seconds=0.05,
+            report=lambda _: None,
+        )
+        for index in range(supervisor.num_processes):
+            supervisor.start_process(index)
+
+        supervisor.stop()
+        for process, _ in supervisor.processes.values():
+            process.join(timeout=5)
+        supervisor.check_processes()
+
+        assert supervisor.processes == {}
+        assert supervisor.num_restarts == 0
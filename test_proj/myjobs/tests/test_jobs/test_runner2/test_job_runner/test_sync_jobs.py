@@ -0,0 +1,44 @@
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.job import Execution, SyncBaseJob, abulk_create_new
+from django_async_job_pipelines.job_runner import run_num_jobs
+from django_async_job_pipelines.models import JobDBModel
+
+from myjobs.jobs import BlockingJob, JobForTests
+
+
+class TestSyncBaseJob:
+    def test_sync_job_cannot_run_on_event_loop(self):
+        with pytest.raises(TypeError):
+
+            class BlockingJobOnEventLoop(SyncBaseJob):
+                execution = Execution.EVENT_LOOP
+
+    def test_sync_jobs_run_in_bounded_thread_pool(self, db):
+        async_to_sync(abulk_create_new)([BlockingJob() for _ in range(4)])
+
+        async_to_sync(run_num_jobs)(
+            max_num_workers=4, num_jobs=4, timeout=5, max_num_threads=2
+        )
+
+        jobs = JobDBModel.objects.filter(name="BlockingJob")
+        assert all(job.is_done for job in jobs)
+        thread_names = {job.outputs["thread_name"] for job in jobs}
+        assert len(thread_names) == 2
+        assert all(name.startswith("job-runner-thread") for name in thread_names)
+
+    def test_blocking_jobs_dont_block_async_jobs(self, db):
+        async_to_sync(abulk_create_new)([BlockingJob() for _ in range(2)])
+        async_to_sync(abulk_create_new)([JobForTests() for _ in range(20)])
+        done_before = JobDBModel.done_jobs_count()
+
+        start = time.perf_counter()
+        async_to_sync(run_num_jobs)(
+            max_num_workers=4, num_jobs=22, timeout=5, batch_claim=True
+        )
+
+        # the blocking jobs run concurrently with each other and the async jobs
+        assert time.perf_counter() - start < 0.2 * 2
+        assert JobDBModel.done_jobs_count() - done_before == 22
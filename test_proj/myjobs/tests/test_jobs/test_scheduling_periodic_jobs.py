@@ -0,0 +1,73 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django_async_job_pipelines.job import BaseJob
+from django_async_job_pipelines.models import JobDBModel
+from django_async_job_pipelines.scheduler import Scheduler, periodic_jobs, tick_of
+
+from myjobs.jobs import JobForTests, PeriodicJob
+
+NOW = datetime(2024, 5, 1, 12, 30, 45, tzinfo=UTC)
+
+
+class TestTicks:
+    def test_tick_is_start_of_interval(self):
+        assert tick_of(timedelta(minutes=1), NOW) == datetime(
+            2024, 5, 1, 12, 30, tzinfo=UTC
+        )
+        assert tick_of(timedelta(hours=1), NOW) == datetime(2024, 5, 1, 12, tzinfo=UTC)
+
+    def test_seconds_until_next_tick(self):
+        assert Scheduler(jobs=[PeriodicJob]).seconds_until_next_tick(NOW) == 15
+
+
+class TestDeclaringPeriodicJobs:
+    def test_registered_periodic_jobs_are_found(self):
+        assert periodic_jobs() == [PeriodicJob]
+
+    def test_job_without_run_every(self):
+        with pytest.raises(ValueError, match="positive"):
+            Scheduler(jobs=[JobForTests])
+
+    def test_job_with_zero_run_every(self):
+        class ZeroIntervalJob(BaseJob):
+            run_every = timedelta(0)
+
+        with pytest.raises(ValueError, match="positive"):
+            Scheduler(jobs=[ZeroIntervalJob])
+
+
+class TestSchedulingJobs:
+    def test_job_is_created_once_per_tick(self, db):
+        scheduler = Scheduler(jobs=[PeriodicJob])
+
+        (job,) = async_to_sync(scheduler.schedule)(NOW)
+        (same_job,) = async_to_sync(scheduler.schedule)(NOW + timedelta(seconds=10))
+
+        assert same_job.pk == job.pk
+        assert job.idempotency_key == "PeriodicJob:2024-05-01T12:30:00+00:00"
+        assert JobDBModel.new_jobs_count() == 1
+
+    def test_schedulers_running_together_create_job_once(self, db):
+        async_to_sync(Scheduler(jobs=[PeriodicJob]).schedule)(NOW)
+        async_to_sync(Scheduler(jobs=[PeriodicJob]).schedule)(NOW)
+
+        assert JobDBModel.new_jobs_count() == 1
+
+    def test_next_tick_creates_another_job(self, db):
+        scheduler = Scheduler(jobs=[PeriodicJob])
+
+        async_to_sync(scheduler.schedule)(NOW)
+        async_to_sync(scheduler.schedule)(NOW + timedelta(minutes=1))
+
+        assert JobDBModel.new_jobs_count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+class TestScheduleJobsCommand:
+    def test_command_creates_periodic_jobs(self):
+        call_command("schedule_jobs", timeout=1)
+
+        assert JobDBModel.objects.get().name == "PeriodicJob"
@@ -0,0 +1,177 @@
+from importlib import import_module
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.db import NotSupportedError, connection, models
+from django.db.migrations.operations import AddConstraint, AddIndex, RemoveIndex
+from django_async_job_pipelines.migration_operations import (
+    AddIndexConcurrently,
+    AddUniqueConstraintConcurrently,
+    RemoveIndexConcurrently,
+)
+from django_async_job_pipelines.models import JobDBModel, PipelineDBModel
+
+from myjobs.pipelines import PipelineTwoJobs
+
+INDEX = models.Index(fields=["status", "id"], name="async_job_test_idx")
+INDEX_OPERATIONS = (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+    AddUniqueConstraintConcurrently,
+)
+
+
+def schema_editor(vendor: str) -> mock.Mock:
+    editor = mock.Mock()
+    editor.connection.vendor = vendor
+    editor.connection.alias = "default"
+    editor.connection.in_atomic_block = False
+    return editor
+
+
+def postgres_schema_editor():
+    """A Postgres schema editor which doesn't connect, recording the statements it would execute."""
+    pytest.importorskip("psycopg")
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    settings = {**connection.settings_dict, "ENGINE": "django.db.backends.postgresql"}
+    editor = DatabaseWrapper(settings).schema_editor(atomic=False)
+    editor.execute = mock.Mock()
+    return editor
+
+
+def executed_sql(editor) -> list[str]:
+    return [str(call.args[0]) for call in editor.execute.call_args_list]
+
+
+def state() -> mock.Mock:
+    project_state = mock.Mock()
+    project_state.apps.get_model.return_value = JobDBModel
+    return project_state
+
+
+class TestIndexMigrations:
+    @pytest.mark.parametrize(
+        "migration",
+        [
+            "0014_partial_indexes_for_claimable_and_next_jobs",
+            "0015_jobdbmodel_priority",
+            "0016_jobdbmodel_queue",
+            "0017_jobdbmodel_lease",
+            "0019_pipeline_counters",
+            "0020_jobdbmodel_idempotency_key",
+            "0021_jobdbmodel_run_at",
+            "0022_jobdbmodel_concurrency_slot",
+        ],
+    )
+    def test_indexes_are_added_concurrently(self, migration: str):
+        module = import_module(f"django_async_job_pipelines.migrations.{migration}")
+        index_operations = [
+            op
+            for op in module.Migration.operations
+            if isinstance(op, (AddIndex, RemoveIndex, AddConstraint))
+        ]
+
+        assert not module.Migration.atomic
+        assert index_operations
+        assert all(isinstance(op, INDEX_OPERATIONS) for op in index_operations)
+
+    def test_postgres_creates_index_concurrently(self):
+        editor = schema_editor("postgresql")
+        op = AddIndexConcurrently(model_name="jobdbmodel", index=INDEX)
+
+        op.database_forwards("django_async_job_pipelines", editor, state(), state())
+
+        editor.add_index.assert_called_once_with(JobDBModel, INDEX, concurrently=True)
+
+    def test_postgres_drops_index_concurrently(self):
+        editor = schema_editor("postgresql")
+        op = RemoveIndexConcurrently(model_name="jobdbmodel", name=INDEX.name)
+        from_state = state()
+        from_state.models = {
+            ("django_async_job_pipelines", "jobdbmodel"): mock.Mock(
+                get_index_by_name=mock.Mock(return_value=INDEX)
+            )
+        }
+
+        op.database_forwards("django_async_job_pipelines", editor, from_state, state())
+
+        editor.remove_index.assert_called_once_with(
+            JobDBModel, INDEX, concurrently=True
+        )
+
+    def test_other_databases_create_index_as_usual(self):
+        editor = schema_editor("sqlite")
+        op = AddIndexConcurrently(model_name="jobdbmodel", index=INDEX)
+
+        op.database_forwards("django_async_job_pipelines", editor, state(), state())
+
+        editor.add_index.assert_called_once_with(JobDBModel, INDEX)
+
+    def test_postgres_refuses_to_create_index_concurrently_in_a_transaction(self):
+        editor = schema_editor("postgresql")
+        editor.connection.in_atomic_block = True
+        op = AddIndexConcurrently(model_name="jobdbmodel", index=INDEX)
+
+        with pytest.raises(NotSupportedError, match="atomic = False"):
+            op.database_forwards("django_async_job_pipelines", editor, state(), state())
+
+        editor.add_index.assert_not_called()
+
+    def test_postgres_builds_unique_index_concurrently(self):
+        editor = postgres_schema_editor()
+        (constraint,) = [
+            c
+            for c in JobDBModel._meta.constraints
+            if c.name == "async_job_idempotency_key_unique"
+        ]
+        op = AddUniqueConstraintConcurrently(
+            model_name="jobdbmodel", constraint=constraint
+        )
+
+        op.database_forwards("django_async_job_pipelines", editor, state(), state())
+        op.database_backwards("django_async_job_pipelines", editor, state(), state())
+
+        create_sql, drop_sql = executed_sql(editor)
+        assert create_sql.startswith(
+            'CREATE UNIQUE INDEX CONCURRENTLY "async_job_idempotency_key_unique"'
+        )
+        assert "WHERE" in create_sql
+        assert drop_sql.startswith("DROP INDEX CONCURRENTLY")
+
+    def test_only_partial_unique_constraints_are_added_concurrently(self):
+        with pytest.raises(ValueError, match="partial unique constraints"):
+            AddUniqueConstraintConcurrently(
+                model_name="jobdbmodel",
+                constraint=models.UniqueConstraint(fields=["name"], name="unique"),
+            )
+
+
+class TestBackfillingPipelineCounters:
+    def test_backfills_in_batches(self, db):
+        backfill = import_module(
+            "django_async_job_pipelines.migrations.0024_backfill_pipeline_counters"
+        )
+        pipelines = async_to_sync(PipelineTwoJobs.atrigger_many)([None, None, None])
+        done_job = JobDBModel.objects.filter(pipeline=pipelines[0]).first()
+        JobDBModel.objects.filter(pk=done_job.pk).update(
+            status=JobDBModel.JobStatus.DONE
+        )
+        # as before `0019_pipeline_counters`
+        JobDBModel.objects.update(pipeline=None)
+        PipelineDBModel.objects.update(num_jobs=0, num_done_jobs=0)
+
+        with mock.patch.object(backfill, "BATCH_SIZE", 2):
+            backfill.backfill_pipelines(apps, None)
+
+        assert JobDBModel.get(done_job.pk).pipeline_id == pipelines[0].pk
+        counters = PipelineDBModel.objects.order_by("pk").values_list(
+            "num_jobs", "num_done_jobs", "status"
+        )
+        assert list(counters) == [
+            (2, 1, PipelineDBModel.Status.IN_PROGRESS),
+            (2, 0, PipelineDBModel.Status.NEW),
+            (2, 0, PipelineDBModel.Status.NEW),
+        ]
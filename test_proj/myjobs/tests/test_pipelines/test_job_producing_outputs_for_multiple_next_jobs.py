@@ -1,5 +1,9 @@
+from unittest.mock import patch
+
 import pytest
 from asgiref.sync import async_to_sync
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
 from django_async_job_pipelines.models import JobDBModel
 from django_async_job_pipelines.test_utils import run_jobs
 from myjobs.jobs import JobWithInputsForMultipleNextJobs
@@ -19,3 +23,97 @@ class TestPipelineWithJobsProducingInputsForMultipleNextJobs:
         )  # 2 == trigger job + first job
         assert JobDBModel.done_jobs_count() == 2
         assert JobDBModel.new_jobs_count() == 10
+
+    def test_next_jobs_get_their_own_inputs(self):
+        JOBS_TO_MAKE = 200
+        async_to_sync(PipelineWithOneJobProducingInputsForMultipleNextJobs.trigger)(
+            inputs=JobWithInputsForMultipleNextJobs.Inputs(jobs_to_make=JOBS_TO_MAKE)
+        )
+        run_jobs(2)
+
+        next_jobs = JobDBModel.objects.filter(status=JobDBModel.JobStatus.NEW)
+        assert sorted(job.inputs["id"] for job in next_jobs) == list(
+            range(JOBS_TO_MAKE)
+        )
+        assert all(job.name == "JobWithInputs" for job in next_jobs)
+        fanning_out_job = JobDBModel.objects.get(
+            name="JobWithInputsForMultipleNextJobs"
+        )
+        assert fanning_out_job.is_done
+        assert fanning_out_job.outputs == {"id": 20}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCompletingJobsWithNextJobs:
+    def make_job_with_next_job(self) -> JobDBModel:
+        job = JobDBModel.objects.create(
+            name="JobWithInputsForMultipleNextJobs",
+            status=JobDBModel.JobStatus.IN_PROGRESS,
+        )
+        JobDBModel.objects.create(
+            name="JobWithInputs",
+            previous_job=job,
+            status=JobDBModel.JobStatus.NOT_READY,
+            priority=3,
+        )
+        return job
+
+    def test_number_of_queries_does_not_depend_on_number_of_next_jobs(self):
+        num_queries = []
+        # few enough next jobs for one `INSERT` even with SQLite's limit on query parameters
+        for num_next_jobs in (2, 50):
+            job = self.make_job_with_next_job()
+            with CaptureQueriesContext(connection) as queries:
+                JobDBModel.complete_job(
+                    job.pk, next_jobs_inputs=[{"id": i} for i in range(num_next_jobs)]
+                )
+            num_queries.append(len(queries))
+            assert (
+                JobDBModel.objects.filter(
+                    previous_job=job, status=JobDBModel.JobStatus.NEW, priority=3
+                ).count()
+                == num_next_jobs
+            )
+
+        assert num_queries[0] == num_queries[1]
+
+    def test_nothing_is_written_if_initializing_next_jobs_fails(self):
+        job = self.make_job_with_next_job()
+
+        with patch.object(JobDBModel.objects, "bulk_create", side_effect=DatabaseError):
+            with pytest.raises(DatabaseError):
+                JobDBModel.complete_job(job.pk, next_jobs_inputs=[{"id": 1}, {"id": 2}])
+
+        assert JobDBModel.get(job.pk).is_in_progress
+        assert JobDBModel.not_ready_jobs_count() == 1
+
+    def test_completing_step_twice_does_not_clone_next_jobs_again(self):
+        job = self.make_job_with_next_job()
+        next_jobs_inputs = [{"id": 1}, {"id": 2}]
+
+        assert JobDBModel.complete_job(job.pk, next_jobs_inputs=next_jobs_inputs) == 2
+        assert JobDBModel.complete_job(job.pk, next_jobs_inputs=next_jobs_inputs) == 0
+
+        assert (
+            sorted(
+                JobDBModel.objects.filter(previous_job=job).values_list(
+                    "inputs", flat=True
+                ),
+                key=lambda inputs: inputs["id"],
+            )
+            == next_jobs_inputs
+        )
+
+    def test_last_job_of_pipeline_is_marked_done(self):
+        job = JobDBModel.objects.create(
+            name="JobWithInputs", status=JobDBModel.JobStatus.IN_PROGRESS
+        )
+
+        assert (
+            JobDBModel.complete_job(job.pk, outputs={"id": 1}, next_jobs_inputs=[{}])
+            == 0
+        )
+
+        job = JobDBModel.get(job.pk)
+        assert job.is_done
+        assert job.outputs == {"id": 1}
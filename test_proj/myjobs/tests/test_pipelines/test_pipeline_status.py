@@ -0,0 +1,148 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django_async_job_pipelines.completion_buffer import Completion
+from django_async_job_pipelines.models import JobDBModel, PipelineDBModel
+from django_async_job_pipelines.test_utils import run_jobs
+from myjobs.jobs import JobWithInputs, JobWithInputsForMultipleNextJobs
+from myjobs.pipelines import (
+    MultipleJobsPipeline,
+    PipelineMultipleJobsOneInMiddleFails,
+    PipelineTwoJobs,
+    PipelineWithOneJobProducingInputsForMultipleNextJobs,
+)
+
+
+def trigger_many(pipeline_klass, list_of_inputs: list) -> list[PipelineDBModel]:
+    return async_to_sync(pipeline_klass.atrigger_many)(list_of_inputs)
+
+
+class TestPipelineCounters:
+    def test_new_pipeline(self, db):
+        (pipeline,) = trigger_many(MultipleJobsPipeline, [JobWithInputs.Inputs(id=1)])
+
+        pipeline.refresh_from_db()
+        assert pipeline.is_new
+        assert pipeline.num_jobs == len(MultipleJobsPipeline.jobs)
+        assert pipeline.num_done_jobs == pipeline.num_failed_jobs == 0
+        assert pipeline.date_started is None
+        assert pipeline.date_finished is None
+
+    def test_claiming_a_job_starts_the_pipeline(self, db):
+        (pipeline,) = trigger_many(PipelineTwoJobs, [None])
+
+        JobDBModel.claim_jobs_for_processing(1)
+
+        pipeline.refresh_from_db()
+        assert pipeline.status == PipelineDBModel.Status.IN_PROGRESS
+        assert pipeline.date_started is not None
+
+    def test_added_jobs_are_counted(self, db):
+        (pipeline,) = trigger_many(PipelineTwoJobs, [None])
+
+        PipelineDBModel.count_finished_jobs(pipeline.pk, num_done=1, num_added=3)
+
+        pipeline.refresh_from_db()
+        assert pipeline.num_jobs == 5
+        assert pipeline.num_done_jobs == 1
+        assert pipeline.status == PipelineDBModel.Status.IN_PROGRESS
+
+    def test_job_completed_twice_is_counted_once(self, db):
+        (pipeline,) = trigger_many(PipelineTwoJobs, [None])
+        (pk,) = JobDBModel.claim_jobs_for_processing(1)
+
+        for _ in range(2):
+            JobDBModel.complete_job(pk, next_jobs_inputs=[{}], pipeline_id=pipeline.pk)
+
+        pipeline.refresh_from_db()
+        assert pipeline.num_jobs == 2
+        assert pipeline.num_done_jobs == 1
+        assert JobDBModel.new_jobs_count() == 1
+
+    def test_stale_failure_does_not_overwrite_done_job(self, db):
+        (pipeline,) = trigger_many(PipelineTwoJobs, [None])
+        (pk,) = JobDBModel.claim_jobs_for_processing(1)
+        JobDBModel.complete_job(pk, next_jobs_inputs=[{}], pipeline_id=pipeline.pk)
+
+        # e.g. from a job runner whose lease of the job expired before it failed
+        made_new = JobDBModel.complete_job(
+            pk,
+            status=JobDBModel.JobStatus.ERROR,
+            error="Traceback",
+            pipeline_id=pipeline.pk,
+        )
+
+        assert made_new == 0
+        job = JobDBModel.get(pk)
+        assert job.is_done
+        assert job.error is None
+        pipeline.refresh_from_db()
+        assert pipeline.num_done_jobs == 1
+        assert pipeline.num_failed_jobs == 0
+        assert pipeline.status == PipelineDBModel.Status.IN_PROGRESS
+
+    def test_jobs_completed_in_bulk_are_counted(self, db):
+        pipelines = trigger_many(PipelineTwoJobs, [None, None])
+        jobs = JobDBModel.objects.filter(pipeline__in=pipelines)
+        jobs.update(status=JobDBModel.JobStatus.IN_PROGRESS)
+
+        JobDBModel.bulk_complete(
+            [
+                Completion(
+                    pk=job.pk,
+                    status=JobDBModel.JobStatus.DONE,
+                    pipeline_id=job.pipeline_id,
+                )
+                for job in jobs
+            ]
+        )
+
+        for pipeline in pipelines:
+            pipeline.refresh_from_db()
+            assert pipeline.is_done
+            assert pipeline.num_done_jobs == 2
+            assert pipeline.date_finished is not None
+
+    def test_checking_status_makes_no_queries(self, db, django_assert_num_queries):
+        (pipeline,) = trigger_many(PipelineTwoJobs, [None])
+
+        with django_assert_num_queries(0):
+            assert not pipeline.is_done
+            assert not pipeline.errored
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunningPipelines:
+    def test_done_pipeline(self):
+        trigger_many(PipelineTwoJobs, [None])
+
+        run_jobs(2)
+
+        pipeline = PipelineDBModel.objects.get()
+        assert pipeline.is_done
+        assert pipeline.num_done_jobs == 2
+        assert pipeline.num_failed_jobs == 0
+        assert pipeline.date_started <= pipeline.date_finished
+
+    def test_failed_pipeline(self):
+        trigger_many(PipelineMultipleJobsOneInMiddleFails, [None])
+
+        run_jobs(2, timeout_seconds=2)
+
+        pipeline = PipelineDBModel.objects.get()
+        assert pipeline.errored
+        assert pipeline.num_done_jobs == 1
+        assert pipeline.num_failed_jobs == 1
+        assert pipeline.date_finished is not None
+
+    def test_fan_out_adds_jobs_to_pipeline(self):
+        async_to_sync(PipelineWithOneJobProducingInputsForMultipleNextJobs.trigger)(
+            inputs=JobWithInputsForMultipleNextJobs.Inputs(jobs_to_make=5)
+        )
+
+        run_jobs(2)
+
+        pipeline = PipelineDBModel.objects.get()
+        assert pipeline.num_jobs == 1 + 5
+        assert pipeline.num_done_jobs == 1
+        assert pipeline.status == PipelineDBModel.Status.IN_PROGRESS
+        assert JobDBModel.objects.filter(pipeline=pipeline).count() == 1 + 5
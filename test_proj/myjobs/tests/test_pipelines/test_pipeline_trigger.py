@@ -1,10 +1,19 @@
 import pytest
 from asgiref.sync import async_to_sync
-from django_async_job_pipelines.models import JobDBModel
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_async_job_pipelines.models import (
+    JobDBModel,
+    JobDependencyDBModel,
+    PipelineDBModel,
+)
 from django_async_job_pipelines.pipeline import BasePipeline
+from django_async_job_pipelines.test_utils import run_jobs
 
 from myjobs.jobs import JobForTests, JobWithInputs
 from myjobs.pipelines import (
+    DiamondPipeline,
+    MultipleJobsPipeline,
     OneJobPipelineWithInputs,
     OneJobPipelineWithoutInputs,
     PipelineWithoutJobs,
@@ -61,3 +70,86 @@ class TestFirstJobDoesNotTakeInputs:
             "first_job_inputs": None,
             "pipeline_name": "OneJobPipelineWithoutInputs",
         }
+
+
+def count_queries(func, *args, **kwargs) -> int:
+    with CaptureQueriesContext(connection) as queries:
+        func(*args, **kwargs)
+    # leaves out transaction statements, e.g. savepoints inside the test's transaction
+    return len(
+        [
+            q
+            for q in queries
+            if q["sql"].startswith(("SELECT", "INSERT", "UPDATE", "DELETE"))
+        ]
+    )
+
+
+class TestTriggeringManyPipelines:
+    def test_runs_are_created_right_away(self, db):
+        pipelines = async_to_sync(MultipleJobsPipeline.atrigger_many)(
+            [JobWithInputs.Inputs(id=i) for i in range(3)], priority=5
+        )
+
+        assert len(pipelines) == 3
+        for i, pipeline in enumerate(pipelines):
+            jobs = [
+                link.job for link in pipeline.jobs.select_related("job").order_by("pk")
+            ]
+            assert [j.name for j in jobs] == [
+                klass.__name__ for klass in MultipleJobsPipeline.jobs
+            ]
+            assert jobs[0].is_new
+            assert jobs[0].inputs == {"id": i}
+            assert jobs[0].previous_job.name == "StartPipeline"
+            assert jobs[0].previous_job.is_done
+            assert all(j.is_not_ready for j in jobs[1:])
+            assert [j.previous_job_id for j in jobs[1:]] == [j.pk for j in jobs[:-1]]
+            assert all(j.priority == 5 for j in jobs)
+
+    def test_number_of_queries_does_not_grow_with_number_of_runs(self, db):
+        few = count_queries(
+            async_to_sync(MultipleJobsPipeline.atrigger_many),
+            [JobWithInputs.Inputs(id=i) for i in range(2)],
+        )
+        many = count_queries(
+            async_to_sync(MultipleJobsPipeline.atrigger_many),
+            [JobWithInputs.Inputs(id=i) for i in range(20)],
+        )
+
+        # a pipeline, a start job and a pipeline job insert plus one insert per step
+        assert few == many == 3 + len(MultipleJobsPipeline.jobs)
+
+    def test_dag_runs_are_created_right_away(self, db):
+        pipelines = async_to_sync(DiamondPipeline.atrigger_many)([None, None])
+
+        assert len(pipelines) == 2
+        for pipeline in pipelines:
+            jobs = {
+                link.job.name: link.job for link in pipeline.jobs.select_related("job")
+            }
+            assert jobs["DAGRoot"].is_new
+            assert jobs["DAGMerge"].pending_dependencies == 2
+            assert set(
+                JobDependencyDBModel.objects.filter(job=jobs["DAGMerge"]).values_list(
+                    "depends_on", flat=True
+                )
+            ) == {jobs["DAGLeftBranch"].pk, jobs["DAGRightBranch"].pk}
+
+    def test_invalid_inputs_create_nothing(self, db):
+        with pytest.raises(ValueError):
+            async_to_sync(OneJobPipelineWithInputs.atrigger_many)(
+                [JobWithInputs.Inputs(id=1), None]
+            )
+
+        assert not PipelineDBModel.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_triggered_pipelines_run(self):
+        async_to_sync(OneJobPipelineWithoutInputs.atrigger_many)([None] * 3)
+        done_before = JobDBModel.done_jobs_count()
+
+        run_jobs(3)
+
+        assert JobDBModel.done_jobs_count() - done_before == 3
+        assert all(p.is_done for p in PipelineDBModel.objects.all())
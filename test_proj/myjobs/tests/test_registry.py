@@ -1,10 +1,23 @@
 import pytest
-from django_async_job_pipelines.registry import job_registery, pipeline_registery
+from django_async_job_pipelines.job import BaseJob
+from django_async_job_pipelines.registry import (
+    JobRegistery,
+    job_registery,
+    pipeline_registery,
+)
 
-NUM_BUILT_IN_JOBS = 2
-NUM_TEST_JOBS = 15
+from myjobs.jobs import (
+    JobForTests,
+    JobWithConcurrencyLimit,
+    JobWithInputsAndOutputs,
+    RateLimitedJob,
+)
+from myjobs.pipelines import OneJobPipeline
+
+NUM_BUILT_IN_JOBS = 3
+NUM_TEST_JOBS = 29
 NUM_BUILT_IN_PIPELINES = 0
-NUM_TEST_PIPELINES = 10
+NUM_TEST_PIPELINES = 12
 
 
 class TestJobRegistery:
@@ -20,6 +33,48 @@ class TestJobRegistery:
         with pytest.raises(KeyError):
             job_registery.get_import_path_for_class_name("blahblah")
 
+    def test_registry_keeps_resolved_job_classes(self):
+        registered = job_registery.get("JobWithInputsAndOutputs")
+
+        assert registered.klass is JobWithInputsAndOutputs
+        assert registered.inputs_class is JobWithInputsAndOutputs.Inputs
+        assert registered.outputs_class is JobWithInputsAndOutputs.Outputs
+        assert len(job_registery.registered_jobs) == len(
+            job_registery.job_class_to_name_map
+        )
+
+    def test_job_without_inputs_and_outputs_classes(self):
+        registered = job_registery.get("JobForTests")
+
+        assert registered.klass is JobForTests
+        assert registered.inputs_class is None
+        assert registered.outputs_class is None
+
+    def test_non_existing_job_class_raises_exception(self):
+        with pytest.raises(KeyError):
+            job_registery.get("blahblah")
+
+    def test_job_limits_are_registered(self):
+        assert job_registery.concurrency_limits == {"JobWithConcurrencyLimit": 2}
+        assert job_registery.rate_limits == {"RateLimitedJob": 5}
+        assert job_registery.limited_job_names == [
+            "JobWithConcurrencyLimit",
+            "RateLimitedJob",
+        ]
+
+    @pytest.mark.parametrize(
+        "limit, error",
+        [
+            ("max_concurrency", "at least one"),
+            ("max_jobs_per_second", "greater than zero"),
+        ],
+    )
+    def test_job_limits_below_one_job(self, limit: str, error: str):
+        klass = type("JobWithZeroLimit", (BaseJob,), {limit: 0})
+
+        with pytest.raises(ValueError, match=error):
+            JobRegistery().add("JobWithZeroLimit", "myjobs", klass)
+
     def test_built_in_jobs_are_picked_up(self):
         # TODO implement this test
         pass
@@ -37,3 +92,6 @@ class TestPipelineRegistery:
     def test_non_existing_pipeline_is_not_in_registry_and_raises_exception(self):
         with pytest.raises(KeyError):
             pipeline_registery.get_import_path_for_class_name("blahblah")
+
+    def test_registry_keeps_resolved_pipeline_classes(self):
+        assert pipeline_registery.get("OneJobPipeline") is OneJobPipeline